@@ -1,14 +1,26 @@
 # Esse agente será responsável por:
 # - Recebe uma pergunta do usuário
+# - Vetoriza a pergunta com o mesmo modelo que indexou os chunks
 # - Busca contextos relevantes no vetor store (RAG)
+# - Reordena os candidatos com um cross-encoder (opcional)
 # - Chama o LLM com a pergunta + contexto
 # - Retorna resposta estruturada
 
 from abc import ABC, abstractmethod # Importa ABC para criar uma classe abstrata
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict, Any, Optional
 
+from app.agents.context import ContextPacker, PackedContext
+from app.vectorstore.collections import DEFAULT_COLLECTION
+from app.vectorstore.filters import Filter, filter_key
+from app.services.answer_cache import CachedAnswer, SemanticAnswerCache
 from app.services.llm import LLMService
-from app.vectorstore.store import VectorStore 
+from app.vectorstore.store import SEARCH_MODES, VectorStore 
+
+if TYPE_CHECKING:
+    from app.agents.map_reduce import MapReduceSummarizer
+    from app.document_pipeline.embeddings import EmbeddingsGenerator
+    from app.services.reranker import CrossEncoderReranker
 
 class BaseAgent(ABC):
     """
@@ -25,69 +37,321 @@ class BaseAgent(ABC):
         self,
         llm_service: LLMService,
         vector_store: VectorStore,
-        top_k: int = 5
+        embedder: "EmbeddingsGenerator",
+        top_k: int = 5,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        context_packer: Optional[ContextPacker] = None,
+        retrieval_mode: str = "vector",
+        collection: str = DEFAULT_COLLECTION,
+        reranker: Optional["CrossEncoderReranker"] = None,
+        rerank_candidates: int = 30
     ):
+        """
+        Args:
+            embedder (EmbeddingsGenerator): Modelo que vetorizou os chunks do
+                store; as perguntas precisam do mesmo espaço vetorial
+            answer_cache (SemanticAnswerCache): Se informado, perguntas
+                semelhantes a uma já respondida (com o mesmo corpus) reaproveitam
+                a resposta, sem busca nem chamada ao LLM
+            context_packer (ContextPacker): Monta o contexto dentro do orçamento
+                de tokens (padrão: orçamento do modelo de chat)
+            retrieval_mode (str): "vector" | "hybrid" | "prefilter"
+                (ver VectorStore.search)
+            collection (str): Coleção de vector_store (separa o cache de respostas)
+            reranker (CrossEncoderReranker): Se informado, a busca traz
+                rerank_candidates trechos e o cross-encoder mantém os top_k
+            rerank_candidates (int): Candidatos buscados para o re-ranking
+        """
+        if retrieval_mode not in SEARCH_MODES:
+            raise ValueError(f"Modo de busca inválido: {retrieval_mode}")
+
         self.llm_service = llm_service
         self.vector_store = vector_store
+        self.embedder = embedder
         self.top_k = top_k
+        self.retrieval_mode = retrieval_mode
+        self.collection = collection
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.answer_cache = answer_cache
+        self.context_packer = context_packer or ContextPacker.for_model(
+            getattr(llm_service, "chat_model", None)
+        )
+        self.last_context: Optional[PackedContext] = None # Tokens de contexto da última execução
 
     # ==========================
     # PUBLIC API
     # ==========================
 
-    def run(self, query: str) -> str:
+    def run(self, query: Optional[str] = None, filter: Optional[Filter] = None) -> str:
         """
         Executa o agente:
         - Embedding da query
+        - Consulta ao cache de respostas
         - Busca de contexto
         - Geração da resposta
+
+        Args:
+            query (str): Pergunta/foco (padrão: default_query())
+            filter (Dict): Restringe a busca por metadata, ex.:
+                {"filename": "contrato.pdf"} ou {"tenant": "juridico"}
         """
 
-        query_embedding = self.llm.embed_text(query)
+        query = query or self.default_query()
 
-        results = self.vector_store.similarity_search(
-            query_embedding=query_embedding,
-            top_k=self.top_k
+        query_embedding = self._embed_query(query)
+
+        namespace = self._cache_namespace(filter) # Versão do corpus antes da busca
+        cached = self._cache_get(namespace, query_embedding)
+        if cached is not None:
+            return cached.answer
+
+        results = self._search(query, query_embedding, filter)
+
+        answer = self.llm_service.generate(
+            system_prompt=self.system_prompt(),
+            prompt=self._prompt_for(query, results)
         )
 
-        context = self._build_context(results)
+        self._cache_put(namespace, query, query_embedding, answer, results)
+        return answer
 
-        prompt = self._build_prompt(
-            query = query,
-            context = context
+    async def arun(self, query: Optional[str] = None, filter: Optional[Filter] = None) -> str:
+        """
+        Versão assíncrona de run: as chamadas ao LLM não ocupam threads e a
+        busca vetorial (CPU) roda fora do event loop.
+        """
+
+        query = query or self.default_query()
+
+        query_embedding = await asyncio.to_thread(self._embed_query, query)
+
+        namespace = self._cache_namespace(filter) # Versão do corpus antes da busca
+        cached = self._cache_get(namespace, query_embedding)
+        if cached is not None:
+            return cached.answer
+
+        results = await self._asearch(query, query_embedding, filter)
+
+        answer = await self.llm_service.agenerate(
+            system_prompt=self.system_prompt(),
+            prompt=self._prompt_for(query, results)
         )
 
-        return self.llm.generate(
+        self._cache_put(namespace, query, query_embedding, answer, results)
+        return answer
+
+    async def arun_corpus(self, summarizer: "MapReduceSummarizer") -> str:
+        """
+        Executa o agente sobre o corpus inteiro (resumo map-reduce) em vez
+        dos top_k trechos recuperados. Usa default_query() como foco.
+        """
+
+        query = self.default_query()
+        context = await summarizer.summarize(focus=query)
+
+        if not context:
+            raise ValueError("Nenhum documento indexado.")
+
+        return await self.llm_service.agenerate(
             system_prompt=self.system_prompt(),
-            prompt=prompt
+            prompt=self.build_prompt(query=query, context=context)
         )
+
+    async def astream(
+        self,
+        query: Optional[str] = None,
+        filter: Optional[Filter] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Executa o agente em streaming. Emite eventos {"event", "data"}:
+        - "sources": metadados dos trechos recuperados (logo após a busca)
+        - "token": cada trecho de texto gerado pelo LLM
+        - "done": fim da resposta ({"context_tokens": n}; None no acerto do cache)
+
+        Num acerto do cache de respostas, a resposta inteira vem num único "token".
+        """
+
+        query = query or self.default_query()
+
+        query_embedding = await asyncio.to_thread(self._embed_query, query)
+
+        namespace = self._cache_namespace(filter) # Versão do corpus antes da busca
+        cached = self._cache_get(namespace, query_embedding)
+        if cached is not None:
+            yield {"event": "sources", "data": cached.sources}
+            yield {"event": "token", "data": cached.answer}
+            yield {"event": "done", "data": None}
+            return
+
+        results = await self._asearch(query, query_embedding, filter)
+
+        yield {"event": "sources", "data": self._sources(results)}
+
+        tokens = []
+        async for token in self.llm_service.astream(
+            system_prompt=self.system_prompt(),
+            prompt=self._prompt_for(query, results)
+        ):
+            tokens.append(token)
+            yield {"event": "token", "data": token}
+
+        self._cache_put(namespace, query, query_embedding, "".join(tokens).strip(), results)
+
+        yield {"event": "done", "data": {"context_tokens": self.last_context.tokens_used}}
     
     # ==========================
     # INTERNAL METHODS
     # ==========================
 
-    def _build_context(self, results: List[Dict[str, Any]]) -> str:
+    def _embed_query(self, query: str) -> List[float]:
+        """
+        Embedding da pergunta com o modelo dos chunks (CPU: nos caminhos
+        assíncronos roda fora do event loop).
+        """
+        return self.embedder.embed_texts([query])[0]
+
+    def _search(
+        self,
+        query: str,
+        query_embedding: List[float],
+        filter: Optional[Filter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca os top_k trechos; com reranker, busca rerank_candidates e
+        deixa o cross-encoder escolher os top_k (dentro do orçamento dele).
+        """
+        fetch = max(self.top_k, self.rerank_candidates) if self.reranker is not None else self.top_k
+
+        results = self.vector_store.search(
+            query=query,
+            query_embedding=query_embedding,
+            top_k=fetch,
+            mode=self.retrieval_mode,
+            filter=filter
+        )
+
+        if self.reranker is not None:
+            results = self.reranker.rerank(query, results, self.top_k)
+        return results
+
+    def _search_many(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        filter: Optional[Filter] = None
+    ) -> List[List[Dict[str, Any]]]:
         """
-        Constrói o contexto textual a partir dos documentos recuperados.
+        _search para um lote de queries (uma busca matricial no store).
         """
+        fetch = max(self.top_k, self.rerank_candidates) if self.reranker is not None else self.top_k
 
-        contexts = []
+        results = self.vector_store.search_many(
+            queries,
+            query_embeddings,
+            top_k=fetch,
+            mode=self.retrieval_mode,
+            filter=filter
+        )
 
-        for r in results:
-            text = r.get("text")
-            metadata =r.get("metadata", {})
+        if self.reranker is not None:
+            results = [self.reranker.rerank(query, docs, self.top_k) for query, docs in zip(queries, results)]
+        return results
 
-            source = metadata.get("source", "document") # Nome do documento/fonte
-            page = metadata.get("page") # Número da página, se disponível
+    async def _asearch(
+        self,
+        query: str,
+        query_embedding: List[float],
+        filter: Optional[Filter] = None
+    ) -> List[Dict[str, Any]]:
+        # Busca e cross-encoder são CPU: rodam fora do event loop
+        return await asyncio.to_thread(self._search, query, query_embedding, filter)
 
-            header = f"[Fonte: {source}"
-            if page is not None:
-                header += f", Página: {page}" # Adiciona número da página se disponível
-            header += "]"
+    def _cache_namespace(self, filter: Optional[Filter] = None) -> Optional[tuple]:
+        """
+        Respostas só são reaproveitadas pelo mesmo agente e coleção, com os
+        mesmos parâmetros de busca (inclusive re-ranking e filtro) e a mesma versão do
+        corpus (sempre o último item). Calculado antes da busca e usado
+        também no put: uma resposta gerada enquanto o corpus mudou fica na
+        versão que a busca viu. None sem cache de respostas.
+        """
+        if self.answer_cache is None:
+            return None
+        return (
+            type(self).__name__,
+            self.collection,
+            self.top_k,
+            self.retrieval_mode,
+            self.reranker.model_name if self.reranker is not None else None,
+            filter_key(filter),
+            self.vector_store.version
+        )
 
-            contexts.append(f"{header}\n{text}") # Adiciona fonte e texto
+    def _cache_get(
+        self,
+        namespace: Optional[tuple],
+        query_embedding: List[float]
+    ) -> Optional[CachedAnswer]:
+        if namespace is None:
+            return None
+        return self.answer_cache.get(namespace, query_embedding)
 
-        return "\n\n".join(contexts) 
+    def _cache_put(
+        self,
+        namespace: Optional[tuple],
+        query: str,
+        query_embedding: List[float],
+        answer: str,
+        results: List[Dict[str, Any]]
+    ):
+        if namespace is None:
+            return
+        self.answer_cache.put(
+            namespace,
+            query_embedding,
+            CachedAnswer(answer=answer, sources=self._sources(results), question=query)
+        )
+
+    @staticmethod
+    def _sources(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Metadados dos documentos recuperados (sem o texto), para o cliente
+        exibir as fontes antes da resposta.
+        """
+        return [
+            {
+                "source": r.get("metadata", {}).get("filename"),
+                "page": r.get("metadata", {}).get("page"),
+                "chunk_id": r.get("chunk_id"),
+                "score": r.get("score"),
+            }
+            for r in results
+        ]
+
+    def _prompt_for(self, query: str, results: List[Dict[str, Any]]) -> str:
+        """
+        Prompt final a partir dos documentos recuperados.
+        """
+        return self.build_prompt(
+            query = query,
+            context = self._build_context(results)
+        )
+
+    def _build_context(self, results: List[Dict[str, Any]]) -> str:
+        """
+        Constrói o contexto textual a partir dos documentos recuperados,
+        dentro do orçamento de tokens do packer (ver context.py).
+        As estatísticas ficam em self.last_context.
+        """
+
+        self.last_context = self.context_packer.pack(results)
+        return self.last_context.text
+
+    def default_query(self) -> str:
+        """
+        Query usada na busca quando nenhuma é informada (ex.: resumo, insights).
+        """
+        raise ValueError("Este agente exige uma pergunta.")
     
     # ==========================
     # ABSTRACT METHODS
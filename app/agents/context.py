@@ -0,0 +1,233 @@
+# Empacotamento do contexto do RAG dentro de um orçamento de tokens:
+# - Chunks vizinhos/sobrepostos do mesmo documento são fundidos (o overlap
+#   do TextChunker não é pago duas vezes)
+# - Trechos quase duplicados (ex.: o mesmo aviso legal em vários arquivos)
+#   são descartados
+# - O orçamento é preenchido de forma gulosa, do maior score para o menor
+#
+# Usado por BaseAgent._build_context; os tokens usados ficam em
+# PackedContext.tokens_used para acompanhar o custo por requisição.
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+import logging
+import zlib
+
+from app.services.tokenizer import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+# Tokens de contexto por modelo (uma fração da janela: contexto maior custa
+# mais e raramente melhora a resposta)
+MODEL_CONTEXT_BUDGETS = {
+    "gpt-4o": 12000,
+    "gpt-4o-mini": 8000,
+    "gpt-4.1": 12000,
+    "gpt-4.1-mini": 8000,
+    "gpt-3.5-turbo": 3000,
+}
+DEFAULT_CONTEXT_BUDGET = 4000
+
+MAX_OVERLAP_CHARS = 400 # Maior overlap procurado ao fundir chunks vizinhos
+MIN_OVERLAP_CHARS = 16 # Abaixo disso a coincidência é tratada como acaso
+SHINGLE_SIZE = 5 # Palavras por shingle na detecção de quase duplicatas
+
+
+@dataclass
+class _Segment:
+    source: str
+    page: Optional[int]
+    chunk_ids: List[int]
+    text: str
+    score: float
+    shingles: Set[int] = field(default_factory=set)
+
+
+@dataclass
+class PackedContext:
+    """
+    Contexto final e estatísticas do empacotamento.
+    """
+    text: str
+    tokens_used: int
+    token_budget: int
+    chunks_used: int
+    chunks_merged: int
+    duplicates_dropped: int
+    chunks_dropped: int
+
+
+class ContextPacker:
+    """
+    Monta o contexto do prompt a partir dos resultados da busca.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = DEFAULT_CONTEXT_BUDGET,
+        model: Optional[str] = None,
+        duplicate_threshold: float = 0.9
+    ):
+        """
+        Args:
+            token_budget (int): Tokens máximos do contexto
+            model (str): Modelo usado para contar tokens
+            duplicate_threshold (float): Similaridade de Jaccard (shingles de
+                palavras) a partir da qual um trecho é considerado duplicado
+        """
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        self.count_tokens: Callable[[str], int] = get_token_counter(model)
+
+    @classmethod
+    def for_model(cls, model: Optional[str], token_budget: int = 0) -> "ContextPacker":
+        """
+        Packer com o orçamento padrão do modelo (token_budget > 0 sobrescreve).
+        """
+        budget = token_budget or MODEL_CONTEXT_BUDGETS.get(model or "", DEFAULT_CONTEXT_BUDGET)
+        return cls(token_budget=budget, model=model)
+
+    def pack(self, results: List[Dict[str, Any]]) -> PackedContext:
+        """
+        Args:
+            results (List[Dict]): Saída de similarity_search (texto, metadados, score)
+
+        Returns:
+            PackedContext: Contexto formatado e estatísticas
+        """
+        segments = self._merge(results)
+        merged = len(results) - len(segments)
+
+        unique = self._drop_duplicates(segments)
+        duplicates = len(segments) - len(unique)
+
+        parts: List[str] = []
+        used = 0
+        chunks_used = 0
+        chunks_dropped = 0
+        for segment in unique: # Já ordenados por score
+            part = self._format(segment)
+            tokens = self.count_tokens(part) + (2 if parts else 0) # Separador "\n\n"
+            if used + tokens > self.token_budget:
+                chunks_dropped += len(segment.chunk_ids)
+                continue
+            parts.append(part)
+            used += tokens
+            chunks_used += len(segment.chunk_ids)
+
+        packed = PackedContext(
+            text="\n\n".join(parts),
+            tokens_used=used,
+            token_budget=self.token_budget,
+            chunks_used=chunks_used,
+            chunks_merged=merged,
+            duplicates_dropped=duplicates,
+            chunks_dropped=chunks_dropped
+        )
+
+        logger.info(
+            f"Contexto: {packed.tokens_used}/{packed.token_budget} tokens, "
+            f"{packed.chunks_used} chunks ({packed.chunks_merged} fundidos, "
+            f"{packed.duplicates_dropped} duplicados, {packed.chunks_dropped} fora do orçamento)."
+        )
+        return packed
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _merge(self, results: List[Dict[str, Any]]) -> List[_Segment]:
+        """
+        Funde chunks consecutivos (chunk_id n, n+1) do mesmo documento,
+        removendo o texto repetido pelo overlap. Retorna segmentos por score.
+        """
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for result in results:
+            metadata = result.get("metadata") or {}
+            source = metadata.get("source", metadata.get("filename", "document"))
+            by_source.setdefault(source, []).append(result)
+
+        segments: List[_Segment] = []
+        for source, items in by_source.items():
+            items.sort(key=lambda r: (r.get("chunk_id") is None, r.get("chunk_id") or 0))
+            current: Optional[_Segment] = None
+
+            for item in items:
+                chunk_id = item.get("chunk_id")
+                text = item.get("text") or ""
+                score = float(item.get("score", 0.0))
+
+                if (
+                    current is not None
+                    and chunk_id is not None
+                    and current.chunk_ids[-1] is not None
+                    and chunk_id == current.chunk_ids[-1] + 1
+                ):
+                    current.text = self._concat(current.text, text)
+                    current.chunk_ids.append(chunk_id)
+                    current.score = max(current.score, score)
+                    continue
+
+                current = _Segment(
+                    source=source,
+                    page=(item.get("metadata") or {}).get("page"),
+                    chunk_ids=[chunk_id],
+                    text=text,
+                    score=score
+                )
+                segments.append(current)
+
+        segments.sort(key=lambda s: s.score, reverse=True)
+        return segments
+
+    @classmethod
+    def _concat(cls, left: str, right: str) -> str:
+        overlap = cls._overlap(left, right)
+        return left + right[overlap:] if overlap else f"{left} {right}"
+
+    @staticmethod
+    def _overlap(left: str, right: str) -> int:
+        """
+        Tamanho do maior sufixo de left que é prefixo de right (0 se menor
+        que MIN_OVERLAP_CHARS).
+        """
+        for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+
+    def _drop_duplicates(self, segments: List[_Segment]) -> List[_Segment]:
+        """
+        Mantém o trecho de maior score entre quase duplicatas.
+        """
+        kept: List[_Segment] = []
+        for segment in segments:
+            segment.shingles = self._shingles(segment.text)
+            if any(self._jaccard(segment.shingles, other.shingles) >= self.duplicate_threshold for other in kept):
+                continue
+            kept.append(segment)
+        return kept
+
+    @staticmethod
+    def _shingles(text: str) -> Set[int]:
+        words = text.lower().split()
+        if len(words) <= SHINGLE_SIZE:
+            return {zlib.crc32(" ".join(words).encode("utf-8"))}
+        return {
+            zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+            for i in range(len(words) - SHINGLE_SIZE + 1)
+        }
+
+    @staticmethod
+    def _jaccard(a: Set[int], b: Set[int]) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    @staticmethod
+    def _format(segment: _Segment) -> str:
+        header = f"[Fonte: {segment.source}"
+        if segment.page is not None:
+            header += f", Página: {segment.page}" # Adiciona número da página se disponível
+        header += "]"
+        return f"{header}\n{segment.text}"
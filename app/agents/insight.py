@@ -19,7 +19,10 @@ class InsightAgent(BaseAgent):
             "sempre com base estrita no conteúdo fornecido."
         ) 
     
-    def build_prompt(self, context: str) -> str:
+    def default_query(self) -> str:
+        return "riscos, oportunidades, pontos de atenção e recomendações"
+
+    def build_prompt(self, query: str, context: str) -> str:
         """
         Constrói o prompt final para geração de insights.
         """
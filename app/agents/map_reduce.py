@@ -0,0 +1,292 @@
+# Resumo hierárquico (map-reduce) do corpus inteiro, em vez de top-k RAG:
+# - Map: chunks consecutivos de cada documento são agrupados até o orçamento
+#   de tokens do modelo e resumidos em paralelo
+# - Reduce: os resumos são reagrupados pelo mesmo orçamento e resumidos de
+#   novo, nível a nível, até sobrar um por documento e depois um para o corpus
+# - Cache: cada nó é identificado pelo hash do seu conteúdo (hashes dos chunks
+#   ou chaves dos filhos) + foco + modelo. Ao adicionar um arquivo, só os
+#   ramos dele e os níveis acima no corpus são recalculados
+#
+# Usado por SummarizerAgent e InsightAgent no modo "map_reduce" das rotas.
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+
+from app.services.llm import LLMService
+from app.services.tokenizer import get_token_counter
+from app.vectorstore.catalog import hash_chunk
+from app.vectorstore.store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "Você é um analista sênior que condensa documentos corporativos e técnicos "
+    "sem perder fatos, números, decisões, riscos e conclusões. "
+    "Use apenas o conteúdo fornecido."
+)
+
+
+def pack_by_tokens(
+    texts: Sequence[str],
+    budget: int,
+    count_tokens: Callable[[str], int]
+) -> List[List[int]]:
+    """
+    Agrupa índices de textos consecutivos sem ultrapassar budget tokens por
+    grupo (um texto maior que o orçamento fica sozinho no seu grupo).
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and used + tokens > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += tokens
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+class SummaryCache:
+    """
+    Resumos intermediários por chave de conteúdo (SQLite, em memória ou disco).
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path) if path else ":memory:", check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, summary: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)",
+                (key, summary)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MapReduceSummarizer:
+    """
+    Resume o corpus inteiro do VectorStore em árvore, com cache por nó.
+    """
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        vector_store: VectorStore,
+        cache: Optional[SummaryCache] = None,
+        token_budget: int = 6000,
+        summary_max_tokens: int = 500
+    ):
+        """
+        Args:
+            llm_service (LLMService): Cliente LLM (concorrência limitada pelo
+                semáforo do próprio serviço)
+            vector_store (VectorStore): Fonte dos chunks
+            cache (SummaryCache): Cache dos resumos intermediários
+            token_budget (int): Tokens de entrada por chamada (map e reduce)
+            summary_max_tokens (int): Tokens de saída de cada resumo
+        """
+        self.llm_service = llm_service
+        self.vector_store = vector_store
+        self.cache = cache if cache is not None else SummaryCache()
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.count_tokens = get_token_counter(llm_service.chat_model)
+
+        self._stats = {"nodes": 0, "cached": 0}
+
+    async def summarize(self, focus: str) -> str:
+        """
+        Resumo do corpus orientado por focus (ex.: "riscos e oportunidades").
+
+        Returns:
+            str: Resumo final (vazio se o store não tiver documentos)
+        """
+        self._stats = {"nodes": 0, "cached": 0}
+        documents = await asyncio.to_thread(self._load_documents)
+
+        if not documents:
+            return ""
+
+        names = sorted(documents)
+        document_nodes = await asyncio.gather(*[
+            self._summarize_document(name, documents[name], focus)
+            for name in names
+        ])
+
+        texts = [f"[Documento: {name}]\n{summary}" for name, (_, summary) in zip(names, document_nodes)]
+        keys = [key for key, _ in document_nodes]
+        _, summary = await self._reduce(keys, texts, focus, label="corpus")
+
+        logger.info(
+            f"Resumo map-reduce: {len(names)} documentos, {self._stats['nodes']} nós "
+            f"({self._stats['cached']} do cache)."
+        )
+        return summary
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _load_documents(self) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        filename -> [(hash, texto)] dos chunks vivos, na ordem do documento.
+        """
+        rows = defaultdict(list)
+        for idx, doc in self.vector_store.iter_documents():
+            metadata = doc.get("metadata") or {}
+            text = doc.get("text", "")
+            order = (metadata.get("page") or 0, doc.get("chunk_id") or 0, idx)
+            chunk_hash = metadata.get("chunk_hash") or hash_chunk(text)
+            rows[metadata.get("filename", "document")].append((order, chunk_hash, text))
+
+        return {
+            name: [(chunk_hash, text) for _, chunk_hash, text in sorted(chunks)]
+            for name, chunks in rows.items()
+        }
+
+    async def _summarize_document(
+        self,
+        name: str,
+        chunks: List[Tuple[str, str]],
+        focus: str
+    ) -> Tuple[str, str]:
+        """
+        Map sobre os grupos de chunks do documento e reduce até um resumo.
+        Retorna (chave, resumo).
+        """
+        texts = [text for _, text in chunks]
+        groups = pack_by_tokens(texts, self.token_budget, self.count_tokens)
+
+        leaves = await asyncio.gather(*[
+            self._node(
+                kind="map",
+                child_keys=[chunks[i][0] for i in group],
+                content="\n\n".join(texts[i] for i in group),
+                focus=focus,
+                label=name
+            )
+            for group in groups
+        ])
+
+        return await self._reduce(
+            [key for key, _ in leaves],
+            [summary for _, summary in leaves],
+            focus,
+            label=name
+        )
+
+    async def _reduce(
+        self,
+        keys: List[str],
+        summaries: List[str],
+        focus: str,
+        label: str
+    ) -> Tuple[str, str]:
+        """
+        Combina resumos nível a nível até restar um só.
+        """
+        while len(summaries) > 1:
+            groups = pack_by_tokens(summaries, self.token_budget, self.count_tokens)
+            if len(groups) == len(summaries): # Nenhum par cabe junto: força pares
+                groups = [list(range(i, min(i + 2, len(summaries)))) for i in range(0, len(summaries), 2)]
+
+            nodes = await asyncio.gather(*[
+                self._node(
+                    kind="reduce",
+                    child_keys=[keys[i] for i in group],
+                    content="\n\n---\n\n".join(summaries[i] for i in group),
+                    focus=focus,
+                    label=label
+                )
+                for group in groups
+            ])
+            keys = [key for key, _ in nodes]
+            summaries = [summary for _, summary in nodes]
+
+        return keys[0], summaries[0]
+
+    async def _node(
+        self,
+        kind: str,
+        child_keys: List[str],
+        content: str,
+        focus: str,
+        label: str
+    ) -> Tuple[str, str]:
+        """
+        Resume um nó da árvore (ou o lê do cache). Retorna (chave, resumo).
+        """
+        key = hashlib.sha256("\0".join([
+            kind, self.llm_service.chat_model, str(self.summary_max_tokens), focus, *child_keys
+        ]).encode("utf-8")).hexdigest()
+
+        self._stats["nodes"] += 1
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            self._stats["cached"] += 1
+            return key, cached
+
+        summary = await self.llm_service.agenerate(
+            system_prompt=SYSTEM_PROMPT,
+            prompt=self._prompt(kind, content, focus, label),
+            max_tokens=self.summary_max_tokens
+        )
+
+        await asyncio.to_thread(self.cache.put, key, summary)
+        return key, summary
+
+    @staticmethod
+    def _prompt(kind: str, content: str, focus: str, label: str) -> str:
+        if kind == "map":
+            return f"""
+TRECHO DO DOCUMENTO "{label}":
+{content}
+
+TAREFA:
+Resuma o trecho acima preservando fatos, números, decisões, riscos e
+conclusões. Dê atenção especial a: {focus}.
+Não invente informações.
+
+RESUMO:
+"""
+        return f"""
+RESUMOS PARCIAIS ({label}):
+{content}
+
+TAREFA:
+Combine os resumos parciais acima em um único resumo coeso, sem repetições,
+preservando fatos, números e conclusões. Dê atenção especial a: {focus}.
+Não invente informações.
+
+RESUMO:
+"""
@@ -3,8 +3,15 @@
 # - Buscar contexto relevante no VectorStore
 # - Responder: (com base exclusiva nos documentos | sem alucinação | citando implicitamente o conteúdo analisado)
 # Ser útil tanto para: documentos técnicos quanto corporativos
+# - Responder checklists inteiros (arun_many): um embedding e uma busca para
+#   todas as perguntas, completions concorrentes com fan-out limitado
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
 
 from app.agents.base import BaseAgent
+from app.agents.context import PackedContext
+from app.vectorstore.filters import Filter
 
 class QAAgent(BaseAgent):
     """
@@ -12,6 +19,91 @@ class QAAgent(BaseAgent):
     Responde apenas com base no conteúdo fornecido via RAG.
     """
 
+    async def arun_many(
+        self,
+        questions: List[str],
+        filter: Optional[Filter] = None,
+        max_concurrency: int = 8
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Responde um lote de perguntas sobre o mesmo conjunto de documentos:
+        - Embeddings de todas as perguntas num único forward do modelo
+        - Busca de todas numa única busca matricial (ver VectorStore.search_many)
+        - Perguntas que recuperam os mesmos trechos compartilham o contexto
+          montado (e o prefixo do prompt)
+        - Até max_concurrency completions simultâneas
+
+        Emite um dict por pergunta, na ordem em que as respostas ficam
+        prontas: {"index", "question", "response", "sources",
+        "context_tokens", "cached"} ou, se a pergunta falhar,
+        {"index", "question", "error"}.
+        """
+        embeddings = await asyncio.to_thread(self.embedder.embed_texts, questions)
+        namespace = self._cache_namespace(filter) # Versão do corpus antes da busca
+
+        pending = []
+        for index, (question, embedding) in enumerate(zip(questions, embeddings)):
+            cached = self._cache_get(namespace, embedding)
+            if cached is None:
+                pending.append(index)
+                continue
+            yield {
+                "index": index,
+                "question": question,
+                "response": cached.answer,
+                "sources": cached.sources,
+                "context_tokens": None,
+                "cached": True,
+            }
+
+        if not pending:
+            return
+
+        results = await asyncio.to_thread(
+            self._search_many,
+            [questions[i] for i in pending],
+            [embeddings[i] for i in pending],
+            filter
+        )
+
+        contexts: Dict[tuple, PackedContext] = {}
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def answer(index: int, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+            question = questions[index]
+            try:
+                key = tuple((doc.get("metadata", {}).get("filename"), doc.get("chunk_id")) for doc in docs)
+                if key not in contexts:
+                    contexts[key] = self.context_packer.pack(docs)
+                packed = contexts[key]
+
+                async with semaphore:
+                    response = await self.llm_service.agenerate(
+                        system_prompt=self.system_prompt(),
+                        prompt=self.build_prompt(query=question, context=packed.text)
+                    )
+
+                self._cache_put(namespace, question, embeddings[index], response, docs)
+                return {
+                    "index": index,
+                    "question": question,
+                    "response": response,
+                    "sources": self._sources(docs),
+                    "context_tokens": packed.tokens_used,
+                    "cached": False,
+                }
+
+            except Exception as e:
+                return {"index": index, "question": question, "error": str(e)}
+
+        tasks = [asyncio.create_task(answer(index, docs)) for index, docs in zip(pending, results)]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield await done
+        finally:
+            for task in tasks: # Cliente desconectou: não gasta mais chamadas ao LLM
+                task.cancel()
+
     def system_prompt(self) -> str:
         return (
             "Você é um assistente especializado em responder perguntas "
@@ -19,6 +19,9 @@ class SummarizerAgent(BaseAgent):
             "evitando detalhes irrelevantes e linguagem excessivamente técnica."
         )
     
+    def default_query(self) -> str:
+        return "principais temas, conclusões e dados do documento"
+
     def build_prompt(self, query: str, context: str) -> str:
         """
         Constrói o prompt final para resumo.
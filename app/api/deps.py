@@ -3,30 +3,149 @@
 # - Observabilidade
 # - Escalabilidade
 # - Testes
+#
+# Todas as dependências vêm do ResourceRegistry criado no lifespan
+# (app/main.py): nada pesado é instanciado por request.
 
-from fastapi import Depends
+from typing import Iterator
+
+from fastapi import Depends, HTTPException, Query, Request
+
+from app.core.registry import ResourceRegistry
 from app.services.llm import LLMService
 from app.vectorstore.store import VectorStore
+from app.vectorstore.collections import DEFAULT_COLLECTION, CollectionManager, CollectionNotFoundError
+from app.document_pipeline.parser import DocumentParser
+from app.document_pipeline.chunker import TextChunker
+from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.services.jobs import IngestionJobManager
+from app.services.compaction import CompactionService
+from app.agents.qa import QAAgent
+from app.agents.summarizer import SummarizerAgent
+from app.agents.insight import InsightAgent
+from app.agents.map_reduce import MapReduceSummarizer
+
+# =========================
+# Registry Dependency
+# =========================
+
+def get_registry(request: Request) -> ResourceRegistry:
+    """
+    Dependency que fornece o registry de recursos do processo.
+    """
+    return request.app.state.registry
 
 # =========================
 # LLM Dependency
 # =========================
 
-def llm_client():
+def llm_client(registry: ResourceRegistry = Depends(get_registry)) -> LLMService:
     """
     Dependency que fornece o cliente LLM.
     Facilita testes e troca futura de provider.
     """
 
-    return LLMService()
+    return registry.llm
 
 # =========================
 # Vector Store Dependency
 # =========================
 
-def vector_store():
+def collection_name(
+    collection: str = Query(DEFAULT_COLLECTION, description="Coleção (namespace) do vector store")
+) -> str:
+    return collection
+
+def collection_manager(registry: ResourceRegistry = Depends(get_registry)) -> CollectionManager:
+    return registry.collections
+
+def vector_store(
+    collection: str = Depends(collection_name),
+    registry: ResourceRegistry = Depends(get_registry)
+) -> Iterator[VectorStore]:
     """
-    Dependency que fornece o Vector Store.
+    Dependency que fornece o Vector Store da coleção pedida (?collection=).
     Mantém desacoplamento entre API e armazenamento.
+    O backend (memória ou disco) vem de Settings.VECTOR_STORE_BACKEND.
+    O store fica reservado até o fim da resposta (inclusive streaming):
+    uma compactação ou evict concorrente não o fecha no meio da busca.
+    """
+    try:
+        with registry.collections.reader(collection) as store:
+            yield store
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+# =========================
+# Document Pipeline Dependencies
+# =========================
+
+def document_parser(registry: ResourceRegistry = Depends(get_registry)) -> DocumentParser:
+    return registry.parser
+
+def text_chunker(registry: ResourceRegistry = Depends(get_registry)) -> TextChunker:
+    return registry.chunker
+
+def embeddings_generator(
+    registry: ResourceRegistry = Depends(get_registry)
+) -> EmbeddingsGenerator:
+    return registry.embedder
+
+def job_manager(
+    registry: ResourceRegistry = Depends(get_registry)
+) -> IngestionJobManager:
+    return registry.jobs
+
+def compaction_service(
+    registry: ResourceRegistry = Depends(get_registry)
+) -> CompactionService:
+    return registry.compactor
+
+def corpus_summarizer(
+    store: VectorStore = Depends(vector_store),
+    registry: ResourceRegistry = Depends(get_registry)
+) -> MapReduceSummarizer:
+    return registry.summarizer_for(store)
+
+# =========================
+# Agents Dependencies
+# =========================
+
+def agent_options(registry: ResourceRegistry, collection: str) -> dict:
+    """
+    Parâmetros compartilhados pelos agentes (busca, contexto e cache).
     """
-    return VectorStore()
\ No newline at end of file
+    return {
+        "collection": collection,
+        "embedder": registry.embedder,
+        "top_k": registry.settings.RAG_TOP_K,
+        "retrieval_mode": registry.settings.RETRIEVAL_MODE,
+        "answer_cache": registry.answer_cache,
+        "context_packer": registry.context_packer,
+        "reranker": registry.reranker,
+        "rerank_candidates": registry.settings.CROSS_ENCODER_CANDIDATES,
+    }
+
+def qa_agent(
+    llm: LLMService = Depends(llm_client),
+    store: VectorStore = Depends(vector_store),
+    collection: str = Depends(collection_name),
+    registry: ResourceRegistry = Depends(get_registry)
+) -> QAAgent:
+    return QAAgent(llm_service=llm, vector_store=store, **agent_options(registry, collection))
+
+def summarizer_agent(
+    llm: LLMService = Depends(llm_client),
+    store: VectorStore = Depends(vector_store),
+    collection: str = Depends(collection_name),
+    registry: ResourceRegistry = Depends(get_registry)
+) -> SummarizerAgent:
+    return SummarizerAgent(llm_service=llm, vector_store=store, **agent_options(registry, collection))
+
+def insight_agent(
+    llm: LLMService = Depends(llm_client),
+    store: VectorStore = Depends(vector_store),
+    collection: str = Depends(collection_name),
+    registry: ResourceRegistry = Depends(get_registry)
+) -> InsightAgent:
+    return InsightAgent(llm_service=llm, vector_store=store, **agent_options(registry, collection))
@@ -2,33 +2,58 @@
 # Fazer perguntas (Q&A) sobre documentos indexados
 # Gerar resumo executivo
 # Manter endpoints claros e versionáveis
+# Handlers async: cada chamada ao LLM é um await, não uma thread presa
+# Variantes /stream: Server-Sent Events com as fontes primeiro e depois os
+# tokens conforme o provider os emite (TTFB = latência da busca)
+# mode=map_reduce em /summary e /insights: resumo hierárquico do corpus inteiro
+# /qa/batch: checklist de perguntas, respostas em SSE na ordem de conclusão
 
-from fastapi import APIRouter, HTTPException
+from typing import AsyncIterator, Dict, Any, Literal, Optional
+import json
+import logging
+import time
 
-from app.api.schemas.agents_schema import QuestionRequest, AgentResponse
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+
+from app.api.schemas.agents_schema import BatchQuestionRequest, QuestionRequest, AgentResponse
+from app.api.deps import get_registry, qa_agent, summarizer_agent, insight_agent, corpus_summarizer
 from app.agents.summarizer import SummarizerAgent
 from app.agents.qa import QAAgent
 from app.agents.insight import InsightAgent
+from app.agents.base import BaseAgent
+from app.agents.map_reduce import MapReduceSummarizer
+from app.core.registry import ResourceRegistry
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/agents", tags=["Agents"])
 
+SummaryMode = Literal["rag", "map_reduce"]
+
 # =====================
 # Endpoints
 # =====================
 
 @router.post("/summary", response_model=AgentResponse)
-def summaruze_document():
+async def summaruze_document(
+    mode: SummaryMode = "rag",
+    agent: SummarizerAgent = Depends(summarizer_agent),
+    summarizer: MapReduceSummarizer = Depends(corpus_summarizer)
+):
     """
     Gera um resumo executivo dos documentos indexados.
     Ideal para leitura rápida por gestores.
+
+    - mode=rag: a partir dos trechos mais relevantes (top_k)
+    - mode=map_reduce: a partir do corpus inteiro (resumo hierárquico em cache)
     """
 
     try:
-        agent = SummarizerAgent()
-        result = agent.run()
+        result = await (agent.arun_corpus(summarizer) if mode == "map_reduce" else agent.arun())
 
-        return {"response": result}
+        return response_for(agent, result)
     
     except Exception as e:
         raise HTTPException(
@@ -37,16 +62,23 @@ def summaruze_document():
         )
     
 @router.post("/qa", response_model=AgentResponse)
-def question_answering(payload: QuestionRequest):
+async def question_answering(
+    payload: QuestionRequest,
+    agent: QAAgent = Depends(qa_agent)
+):
     """
     Responde perguntas com base nos documentos processados.
+    Com filter, só os chunks cujos metadados batem são considerados
+    (ex.: um documento ou um tenant).
     """
 
     try:
-        agent = QAAgent()
-        result = agent.run(question = payload.question)
+        result = await agent.arun(query = payload.question, filter = payload.filter)
+
+        return response_for(agent, result)
 
-        return {"response": result}
+    except ValueError as e: # Filtro inválido
+        raise HTTPException(status_code=400, detail=str(e))
     
     except Exception as e: 
         raise HTTPException(
@@ -55,17 +87,21 @@ def question_answering(payload: QuestionRequest):
         )
 
 @router.post("/insights", response_model=AgentResponse)
-def generate_insights():
+async def generate_insights(
+    mode: SummaryMode = "rag",
+    agent: InsightAgent = Depends(insight_agent),
+    summarizer: MapReduceSummarizer = Depends(corpus_summarizer)
+):
     """
     Extrai insights estratégicos dos documentos.
     Ex: riscos, oportunidades, padrões e alertas.
+    Aceita mode=map_reduce (corpus inteiro), como /summary.
     """
 
     try:
-        agent = InsightAgent()
-        result = agent.run()
+        result = await (agent.arun_corpus(summarizer) if mode == "map_reduce" else agent.arun())
 
-        return {"response": result}
+        return response_for(agent, result)
     
     except Exception as e: 
         raise HTTPException(
@@ -73,4 +109,138 @@ def generate_insights():
             detail = f"Erro ao gerar Insights: {str(e)}"
         )
 
+# =====================
+# Streaming (SSE)
+# =====================
+
+@router.post("/summary/stream")
+async def summarize_document_stream(agent: SummarizerAgent = Depends(summarizer_agent)):
+    """
+    Resumo executivo em streaming (text/event-stream).
+    Eventos: sources -> token (vários) -> done; ou error.
+    """
+    return sse_response(agent)
+
+@router.post("/qa/stream")
+async def question_answering_stream(
+    payload: QuestionRequest,
+    agent: QAAgent = Depends(qa_agent)
+):
+    """
+    Resposta de Q&A em streaming (text/event-stream).
+    Eventos: sources -> token (vários) -> done; ou error.
+    """
+    try:
+        agent.vector_store.metadata_index.validate(payload.filter)
+    except ValueError as e: # Antes do stream: ainda dá para responder 400
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return sse_response(agent, query=payload.question, filter=payload.filter)
+
+@router.post("/qa/batch")
+async def question_answering_batch(
+    payload: BatchQuestionRequest,
+    agent: QAAgent = Depends(qa_agent),
+    registry: ResourceRegistry = Depends(get_registry)
+):
+    """
+    Responde uma lista de perguntas sobre os mesmos documentos
+    (text/event-stream). Embeddings e busca são feitos em lote e as
+    completions rodam em paralelo (até QA_BATCH_CONCURRENCY).
+
+    Eventos, na ordem em que as respostas ficam prontas:
+    - answer: {index, question, response, sources, context_tokens, cached}
+    - error: {index, question, error} (só a pergunta afetada)
+    - done: {answered, failed, seconds}
+    """
+    settings = registry.settings
+
+    if len(payload.questions) > settings.QA_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {settings.QA_BATCH_MAX_QUESTIONS} perguntas por lote"
+        )
+
+    try:
+        agent.vector_store.metadata_index.validate(payload.filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events() -> AsyncIterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        answered = failed = 0
+
+        async for item in agent.arun_many(
+            payload.questions,
+            filter=payload.filter,
+            max_concurrency=settings.QA_BATCH_CONCURRENCY
+        ):
+            if "error" in item:
+                failed += 1
+                yield {"event": "error", "data": item}
+            else:
+                answered += 1
+                yield {"event": "answer", "data": item}
+
+        yield {
+            "event": "done",
+            "data": {"answered": answered, "failed": failed, "seconds": time.perf_counter() - start},
+        }
+
+    return event_stream_response(events())
+
+@router.post("/insights/stream")
+async def generate_insights_stream(agent: InsightAgent = Depends(insight_agent)):
+    """
+    Insights em streaming (text/event-stream).
+    Eventos: sources -> token (vários) -> done; ou error.
+    """
+    return sse_response(agent)
+
+
+def response_for(agent: BaseAgent, result: str) -> Dict[str, Any]:
+    return {
+        "response": result,
+        "context_tokens": agent.last_context.tokens_used if agent.last_context else None,
+    }
+
+
+def sse_response(
+    agent: BaseAgent,
+    query: Optional[str] = None,
+    filter: Optional[Dict[str, Any]] = None
+) -> StreamingResponse:
+    """
+    Converte os eventos de BaseAgent.astream em Server-Sent Events.
+    """
+
+    return event_stream_response(agent.astream(query=query, filter=filter))
+
+
+def event_stream_response(source: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """
+    Serializa eventos {"event", "data"} como Server-Sent Events.
+    Erros depois do início do stream viram um evento "error" (o status
+    HTTP já foi enviado).
+    """
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in source:
+                yield format_sse(event)
+        except Exception as e:
+            logger.exception("Erro durante o streaming do agente")
+            yield format_sse({"event": "error", "data": {"detail": str(e)}})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no", # Desliga o buffer de proxies (nginx)
+        }
+    )
+
 
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
@@ -0,0 +1,103 @@
+# Rotas de coleções (namespaces) do vector store:
+# Criar, listar, remover e ver estatísticas de cada coleção
+# Carregar (aquecer índices) ou descarregar uma coleção da memória
+# Upload e agentes escolhem a coleção com ?collection=<nome>
+
+from fastapi import APIRouter, HTTPException, Depends, Response, status
+
+from app.api.deps import collection_manager
+from app.api.schemas.collections_schema import (
+    CollectionCreateRequest,
+    CollectionListResponse,
+    CollectionResponse,
+)
+from app.vectorstore.collections import (
+    CollectionExistsError,
+    CollectionManager,
+    CollectionNotFoundError,
+)
+
+router = APIRouter(prefix="/collections", tags=["Collections"])
+
+
+@router.get("", response_model=CollectionListResponse)
+def list_collections(collections: CollectionManager = Depends(collection_manager)):
+    """
+    Lista as coleções com suas estatísticas (linhas, tombstones, memória).
+    """
+    return {"collections": [collections.stats(name) for name in collections.names()]}
+
+
+@router.post("", response_model=CollectionResponse, status_code=status.HTTP_201_CREATED)
+def create_collection(
+    payload: CollectionCreateRequest,
+    collections: CollectionManager = Depends(collection_manager)
+):
+    """
+    Cria uma coleção vazia.
+    """
+    try:
+        collections.create(payload.name)
+        return collections.stats(payload.name)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except CollectionExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/{name}", response_model=CollectionResponse)
+def get_collection(name: str, collections: CollectionManager = Depends(collection_manager)):
+    """
+    Estatísticas de uma coleção (não a carrega se estiver fora da memória).
+    """
+    try:
+        return collections.stats(name)
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.delete("/{name}", status_code=status.HTTP_204_NO_CONTENT)
+def drop_collection(name: str, collections: CollectionManager = Depends(collection_manager)):
+    """
+    Remove a coleção e todos os seus documentos.
+    """
+    try:
+        collections.drop(name)
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/{name}/load", response_model=CollectionResponse)
+def load_collection(name: str, collections: CollectionManager = Depends(collection_manager)):
+    """
+    Carrega a coleção e constrói seus índices antes da primeira consulta.
+    """
+    try:
+        collections.load(name)
+        return collections.stats(name)
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/{name}/evict", response_model=CollectionResponse)
+def evict_collection(name: str, collections: CollectionManager = Depends(collection_manager)):
+    """
+    Libera a memória da coleção (backend "disk"); ela é reaberta na
+    próxima consulta.
+    """
+    try:
+        collections.evict(name)
+        return collections.stats(name)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
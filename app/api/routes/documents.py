@@ -1,69 +1,377 @@
 # Orquestra a pipeline de documentos
 # Recebe documento seguindo fluxo abaixo.
 # Conecta: Parser -> Chunker -> embeddings -> vectorstore -> agentes
+# O upload só grava o arquivo e enfileira um job; o parse e os embeddings
+# rodam no pool de processos de ingestão (ver app/services/jobs.py).
+# Documentos podem ser listados, substituídos (PUT) e removidos (DELETE);
+# a compactação das linhas removidas roda em background (ver compaction.py).
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import Dict
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+import hashlib
+import os
+import shutil
+import tempfile
 
-from app.document_pipeline.parser import DocumentParser
-from app.document_pipeline.chunker import TextChunker
+from app.api.deps import (
+    get_registry,
+    job_manager,
+    embeddings_generator,
+    collection_name,
+    collection_manager,
+    compaction_service,
+    vector_store,
+)
+from app.api.schemas.documents_schema import (
+    CompactionStatusResponse,
+    DocumentDeleteResponse,
+    DocumentListResponse,
+    JobResponse,
+    JobListResponse,
+)
+from app.core.registry import ResourceRegistry
+from app.document_pipeline.bulk import extract_archive, is_archive
 from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.services.compaction import CompactionService
+from app.services.jobs import IngestionJobManager, QueueFullError
+from app.vectorstore.collections import CollectionManager, CollectionNotFoundError
 from app.vectorstore.store import VectorStore
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
-@router.post("upload", response_model=Dict[str, str])
-async def upload_document(file: UploadFile = File(...)):
+@router.post(
+    "/upload",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def upload_document(
+    file: UploadFile = File(...),
+    tenant: Optional[str] = Form(None),
+    jobs: IngestionJobManager = Depends(job_manager),
+    collection: str = Depends(collection_name),
+    store: VectorStore = Depends(vector_store), # 404 antes do upload se a coleção não existir
+    registry: ResourceRegistry = Depends(get_registry),
+):
     """
     Upload e processamento de documentos corporativos.
-    Pipeline:
+    Pipeline (em background):
     - Parse
     - Chunk
     - Embeddings
     - Persistência no VectorStore
+
+    Retorna imediatamente o job; acompanhe em GET /documents/jobs/{job_id}.
+    Conteúdo idêntico a um documento já ingerido não é reprocessado
+    (files_skipped / duplicate_of); numa nova versão do mesmo filename só os
+    chunks alterados são vetorizados (chunks_reused / chunks_tombstoned).
+
+    filename e tenant (opcional) ficam nos metadados de cada chunk e podem
+    ser usados como filtro nas perguntas (QuestionRequest.filter).
+    ?collection= escolhe a coleção de destino (padrão: default).
     """
 
     if not file.filename:
         raise HTTPException(status_code=400, detail="Arquivo Inválido")
-    
+
+    return await submit_upload(
+        file, file.filename, tenant, jobs, collection, registry.settings.UPLOAD_READ_SIZE
+    )
+
+
+@router.post(
+    "/bulk",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def bulk_upload_documents(
+    files: List[UploadFile] = File(...),
+    tenant: Optional[str] = Form(None),
+    jobs: IngestionJobManager = Depends(job_manager),
+    embedder: EmbeddingsGenerator = Depends(embeddings_generator),
+    collection: str = Depends(collection_name),
+    store: VectorStore = Depends(vector_store),
+    registry: ResourceRegistry = Depends(get_registry),
+):
+    """
+    Ingestão em massa: vários arquivos e/ou arquivos compactados (zip, tar, tar.gz).
+    Os arquivos são parseados em paralelo e os chunks de todos os documentos
+    são vetorizados juntos em lotes grandes. Retorna um único job.
+    """
+
+    if not files:
+        raise HTTPException(status_code=400, detail="Nenhum arquivo enviado")
+
+    if jobs.pending >= jobs.max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Fila de ingestão cheia. Tente novamente em instantes."
+        )
+
+    directory = Path(tempfile.mkdtemp(prefix="documind-bulk-"))
+
+    try:
+        for position, file in enumerate(files):
+            if not file.filename:
+                continue
+
+            name = Path(file.filename).name
+            tmp_path, _ = await save_upload(file, registry.settings.UPLOAD_READ_SIZE)
+
+            if is_archive(name):
+                target = directory / f"{position}_{name.split('.')[0]}"
+                target.mkdir()
+                try:
+                    await run_in_threadpool(extract_archive, Path(tmp_path), target)
+                finally:
+                    os.unlink(tmp_path)
+            else:
+                target = directory / name
+                if target.exists():
+                    target = directory / f"{position}_{name}"
+                shutil.move(tmp_path, target)
+
+        label = files[0].filename if len(files) == 1 else f"{len(files)} arquivos"
+        job = jobs.submit_bulk(
+            str(directory),
+            label=label,
+            embedder=embedder,
+            metadata=upload_metadata(tenant),
+            collection=collection
+        )
+
+        return job.to_dict()
+
+    except QueueFullError as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+
+    except Exception as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(
+            status_code = 500,
+            detail = f"Erro ao processar documentos: {str(e)}"
+        )
+
+
+@router.get("/jobs", response_model=JobListResponse)
+def list_jobs(jobs: IngestionJobManager = Depends(job_manager)):
+    """
+    Lista os jobs de ingestão (em andamento e histórico recente).
+    """
+    return {"jobs": [job.to_dict() for job in jobs.list()]}
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, jobs: IngestionJobManager = Depends(job_manager)):
+    """
+    Status e progresso (páginas lidas, chunks vetorizados) de um job.
+    """
+    job = jobs.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    return job.to_dict()
+
+
+@router.get("", response_model=DocumentListResponse)
+def list_documents(
+    collection: str = Depends(collection_name),
+    store: VectorStore = Depends(vector_store),
+):
+    """
+    Documentos da coleção com a quantidade de chunks vivos de cada um.
+    """
+    counts = store.filter_values("filename") # Vazio se filename não for filtrável
+
+    return {
+        "collection": collection,
+        "documents": [
+            {"filename": filename, "chunks": chunks}
+            for filename, chunks in sorted(counts.items())
+        ],
+        "rows": len(store),
+        "deleted_rows": store.deleted_count,
+        "dead_ratio": store.dead_ratio,
+    }
+
+
+@router.put(
+    "/{filename:path}",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def upsert_document(
+    filename: str,
+    file: UploadFile = File(...),
+    tenant: Optional[str] = Form(None),
+    jobs: IngestionJobManager = Depends(job_manager),
+    collection: str = Depends(collection_name),
+    store: VectorStore = Depends(vector_store),
+    registry: ResourceRegistry = Depends(get_registry),
+):
+    """
+    Cria ou substitui o documento filename pelo arquivo enviado (upsert).
+    Como numa nova versão via upload, só os chunks alterados são
+    vetorizados e os que sumiram viram tombstones ao final do job.
+    """
+    return await submit_upload(
+        file, filename, tenant, jobs, collection, registry.settings.UPLOAD_READ_SIZE, replace=True
+    )
+
+
+@router.delete("/{filename:path}", response_model=DocumentDeleteResponse)
+def delete_document(
+    filename: str,
+    collection: str = Depends(collection_name),
+    collections: CollectionManager = Depends(collection_manager),
+    compactor: CompactionService = Depends(compaction_service),
+):
+    """
+    Remove o documento da coleção. As linhas viram tombstones na hora
+    (somem das buscas) e são apagadas fisicamente pela compactação.
+    """
+    try:
+        with collections.writer(collection) as store:
+            removed = store.delete_document(filename)
+            dead_ratio = store.dead_ratio
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if removed == 0:
+        raise HTTPException(status_code=404, detail=f"Documento não encontrado: {filename}")
+
+    compactor.notify()
+    return {
+        "filename": filename,
+        "collection": collection,
+        "chunks_deleted": removed,
+        "dead_ratio": dead_ratio,
+    }
+
+
+@router.post(
+    "/compact",
+    response_model=CompactionStatusResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+def compact_documents(
+    collection: str = Depends(collection_name),
+    compactor: CompactionService = Depends(compaction_service),
+):
+    """
+    Agenda a compactação da coleção (remove fisicamente as linhas de
+    documentos removidos/substituídos) sem esperar o limite de
+    COMPACTION_DEAD_RATIO. Buscas continuam atendidas durante a compactação;
+    acompanhe em GET /documents/compaction.
+    """
     try:
-        # 1. Ler conteúdo do arquivo
-        content = await file.read()
-
-        # 2. Parse do documento
-        parser = DocumentParser()
-        text = parser.parse(file_bytes=content, filename=file.filename)
-
-        # 3. Chuking
-        chunker = TextChunker()
-        chunks = chunker.split(text)
-
-        if not chunks:
-            raise HTTPException(
-                status_code=400,
-                detail = "Não foi possível gerar chunks a partir do documento"
-            )
-        
-        # 4. Embeddings
-        embedder = EmbeddingsGenerator()
-        embeddings = embedder.embed(chunks)
-
-        # 5. Vector Store
-        store = VectorStore()
-        store.add_documents(
-            text= chunks,
-            embeddings = embeddings,
-            metadata= {"filename": file.filename}
+        compactor.request(collection)
+        return compactor.status(collection)
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/compaction", response_model=CompactionStatusResponse)
+def compaction_status(
+    collection: str = Depends(collection_name),
+    compactor: CompactionService = Depends(compaction_service),
+):
+    """
+    Estado da compactação da coleção e resultado da última execução.
+    """
+    try:
+        return compactor.status(collection)
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+async def submit_upload(
+    file: UploadFile,
+    filename: str,
+    tenant: Optional[str],
+    jobs: IngestionJobManager,
+    collection: str,
+    read_size: int,
+    replace: bool = False
+) -> Dict[str, Any]:
+    """
+    Grava o upload e enfileira o job de ingestão do documento filename
+    (replace: upsert, ver IngestionJobManager.submit). A gravação e o
+    submit (consultas ao catálogo SQLite) rodam fora do event loop.
+    """
+
+    # Backpressure antes de gastar disco com o upload
+    if jobs.pending >= jobs.max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Fila de ingestão cheia. Tente novamente em instantes."
+        )
+
+    tmp_path = None
+
+    try:
+        # Copiar o upload para disco em blocos (o worker remove o arquivo ao final)
+        tmp_path, file_hash = await save_upload(file, read_size)
+
+        job = await run_in_threadpool(
+            jobs.submit,
+            tmp_path,
+            filename=filename,
+            metadata=upload_metadata(tenant),
+            file_hash=file_hash,
+            collection=collection,
+            replace=replace
+        )
+
+        return job.to_dict()
+
+    except QueueFullError as e:
+        os.unlink(tmp_path)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
         )
 
-        return {
-            "status": "success",
-            "filename": file.filename,
-            "chunks_created": str(len(chunks))
-        }
-    
     except Exception as e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
         raise HTTPException(
             status_code = 500,
             detail = f"Erro ao processar documento: {str(e)}"
         )
+
+
+def upload_metadata(tenant: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Metadados extras gravados em cada chunk do upload.
+    """
+    return {"tenant": tenant} if tenant else None
+
+
+async def save_upload(file: UploadFile, read_size: int) -> Tuple[str, str]:
+    """
+    Copia o upload para um arquivo temporário sem carregá-lo inteiro em memória,
+    numa thread (leitura, escrita e hash fora do event loop).
+    Mantém a extensão original (usada pelo Docling para detectar o formato).
+
+    Returns:
+        Tuple[str, str]: Caminho do arquivo e seu SHA-256 (calculado na cópia)
+    """
+    return await run_in_threadpool(_copy_upload, file.file, Path(file.filename).suffix, read_size)
+
+
+def _copy_upload(source: BinaryIO, suffix: str, read_size: int) -> Tuple[str, str]:
+    digest = hashlib.sha256()
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        while block := source.read(read_size):
+            tmp.write(block)
+            digest.update(block)
+
+    return tmp.name, digest.hexdigest()
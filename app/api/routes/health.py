@@ -1,7 +1,21 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_registry
+from app.core.registry import ResourceRegistry
 
 router = APIRouter(tags=["Health"])
 
 @router.get("/health")
-def healthcheck():
-    return {"status": "ok"}
+def healthcheck(registry: ResourceRegistry = Depends(get_registry)):
+    return {
+        "status": "ok",
+        "warmup_seconds": round(registry.warmup_seconds, 3),
+        "warmup_timings": {
+            name: round(seconds, 3)
+            for name, seconds in registry.warmup_timings.items()
+        },
+        "embedding_cache": registry.embedding_cache_stats,
+        "answer_cache": registry.answer_cache.stats() if registry.answer_cache else None,
+        "reranker": registry.reranker.stats() if registry.reranker else None,
+        "parse_cache": registry.parser.cache.stats() if registry.parser.cache else None,
+    }
@@ -1,7 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 
 class QuestionRequest(BaseModel):
     question: str
+    filter: Optional[Dict[str, Any]] = None # Ex.: {"filename": "contrato.pdf"} ou {"tenant": ["rh", "juridico"]}
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1) # Limite: QA_BATCH_MAX_QUESTIONS
+    filter: Optional[Dict[str, Any]] = None # Aplicado a todas as perguntas
 
 class AgentResponse(BaseModel):
     response: str
+    context_tokens: Optional[int] = None # Tokens de contexto enviados ao LLM (None: cache/map-reduce)
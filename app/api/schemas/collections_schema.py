@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class CollectionCreateRequest(BaseModel):
+    name: str
+
+class CollectionResponse(BaseModel):
+    name: str
+    loaded: bool
+    rows: int
+    deleted_rows: int
+    dead_ratio: float = 0.0
+    dim: Optional[int] = None
+    memory_bytes: int
+
+class CollectionListResponse(BaseModel):
+    collections: List[CollectionResponse]
@@ -0,0 +1,56 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class JobResponse(BaseModel):
+    job_id: str
+    filename: str
+    collection: str = "default"
+    status: str
+    pages_parsed: int = 0
+    chunks_embedded: int = 0
+    files_processed: int = 0
+    files_failed: int = 0
+    files_skipped: int = 0
+    chunks_reused: int = 0
+    chunks_tombstoned: int = 0
+    duplicate_of: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class JobListResponse(BaseModel):
+    jobs: List[JobResponse]
+
+class DocumentInfo(BaseModel):
+    filename: str
+    chunks: int
+
+class DocumentListResponse(BaseModel):
+    collection: str
+    documents: List[DocumentInfo]
+    rows: int
+    deleted_rows: int
+    dead_ratio: float
+
+class DocumentDeleteResponse(BaseModel):
+    filename: str
+    collection: str
+    chunks_deleted: int
+    dead_ratio: float
+
+class CompactionRun(BaseModel):
+    rows_before: Optional[int] = None
+    rows_after: Optional[int] = None
+    removed_rows: Optional[int] = None
+    seconds: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+class CompactionStatusResponse(BaseModel):
+    collection: str
+    state: str
+    rows: int
+    deleted_rows: int
+    dead_ratio: float
+    last_run: Optional[CompactionRun] = None
@@ -0,0 +1,95 @@
+# CLI do DocuMind AI.
+#
+# Ingestão em massa de uma árvore de diretórios local, sem passar pela API:
+#   python -m app.cli ingest ./corpus --workers 8
+#   python -m app.cli ingest ./rh --collection rh
+#
+# Use VECTOR_STORE_BACKEND=disk para que o índice persista em VECTOR_DB_PATH
+# e seja aberto pela API depois.
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.document_pipeline.bulk import BulkIngestor
+from app.document_pipeline.chunker import chunker_options
+from app.document_pipeline.parser import parser_options
+from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.services.embedding_cache import build_embedding_cache
+from app.vectorstore.collections import CollectionManager, CollectionNotFoundError
+
+logger = logging.getLogger(__name__)
+
+
+def ingest(args: argparse.Namespace):
+    settings = get_settings()
+
+    if settings.VECTOR_STORE_BACKEND.lower() == "memory":
+        logger.warning(
+            "VECTOR_STORE_BACKEND=memory: o índice será descartado ao final da CLI. "
+            "Use VECTOR_STORE_BACKEND=disk para persistir."
+        )
+
+    collections = CollectionManager(settings)
+    try:
+        store = collections.get(args.collection)
+    except CollectionNotFoundError:
+        store = collections.create(args.collection)
+
+    ingestor = BulkIngestor(
+        embedder=EmbeddingsGenerator(
+            model_name=settings.HF_EMBEDDING_MODEL,
+            cache=build_embedding_cache(settings, settings.HF_EMBEDDING_MODEL)
+        ),
+        vector_store=store,
+        parser_options=parser_options(settings),
+        chunker_options=chunker_options(settings),
+        parse_workers=args.workers or settings.BULK_PARSE_WORKERS,
+        batch_size=args.batch_size or settings.EMBEDDING_BATCH_SIZE,
+        pack_size=args.pack_size or settings.BULK_PACK_SIZE
+    )
+
+    start = time.perf_counter()
+    stats = ingestor.ingest_directory(
+        Path(args.directory),
+        on_progress=lambda s: logger.info(
+            f"{s['files_processed']} arquivos, {s['chunks_embedded']} chunks"
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    logger.info(
+        f"Concluído em {elapsed:.1f}s: {stats['files_processed']} arquivos "
+        f"({stats['files_failed']} falhas), {stats['pages_parsed']} páginas, "
+        f"{stats['chunks_embedded']} chunks "
+        f"({stats['chunks_embedded'] / max(elapsed, 1e-9):.0f} chunks/s); "
+        f"{stats['files_skipped']} arquivos já existentes, "
+        f"{stats['chunks_reused']} chunks reaproveitados, "
+        f"{stats['chunks_tombstoned']} removidos."
+    )
+    collections.close()
+
+
+def main():
+    setup_logging()
+
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="DocuMind AI CLI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="Ingere um diretório local no vector store")
+    ingest_parser.add_argument("directory", help="Raiz da árvore de documentos")
+    ingest_parser.add_argument("--workers", type=int, help="Processos de parse (padrão: BULK_PARSE_WORKERS)")
+    ingest_parser.add_argument("--batch-size", type=int, help="Textos por forward do modelo")
+    ingest_parser.add_argument("--pack-size", type=int, help="Chunks ordenados e vetorizados juntos")
+    ingest_parser.add_argument("--collection", default="default", help="Coleção de destino (criada se não existir)")
+    ingest_parser.set_defaults(handler=ingest)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,14 @@ class Settings(BaseSettings):
     # ====== OpenAI =======
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-4o-mini"
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    OPENAI_BASE_URL: str | None = None # Endpoint compatível (ex.: mock local); None = api.openai.com
+    LLM_MAX_CONCURRENCY: int = Field(default=64) # Chamadas assíncronas simultâneas ao provider
+    LLM_MAX_CONNECTIONS: int = Field(default=100) # Pool de conexões HTTP keep-alive
+    LLM_TIMEOUT: float = Field(default=60.0) # Segundos por requisição
+    LLM_CONNECT_TIMEOUT: float = Field(default=5.0)
+    LLM_MAX_RETRIES: int = Field(default=4) # Retries em 429/5xx/erros de rede
+    LLM_RETRY_BASE_DELAY: float = Field(default=0.5) # Base do backoff exponencial com jitter
 
     # ====== HuggingFace =======
     HUGGINGFACE_API_KEY: str | None = None
@@ -29,10 +37,71 @@ class Settings(BaseSettings):
 
     # ====== Vector Store =======
     VECTOR_DB_PATH: str = Field(default="./data/vectorstore")
+    VECTOR_STORE_BACKEND: str = Field(default="memory") # "memory" | "disk" (memmap em VECTOR_DB_PATH)
+    VECTOR_INDEX_TYPE: str = Field(default="flat") # "flat" (exato) | "ivf" (aproximado)
+    IVF_NLIST: int = Field(default=1024) # Quantidade máxima de listas do IVF
+    IVF_NPROBE: int = Field(default=16) # Listas visitadas por query (recall x latência)
+    IVF_MIN_TRAIN_SIZE: int = Field(default=50000) # Abaixo disso, busca exata
+    VECTOR_QUANTIZATION: str = Field(default="none") # "none" | "sq8" (int8) | "pq" (product quantization)
+    PQ_SUBVECTORS: int = Field(default=48) # Bytes por vetor no PQ
+    PQ_MIN_TRAIN_SIZE: int = Field(default=10000) # Abaixo disso, vetores ficam em float32
+    RERANK_FACTOR: int = Field(default=4) # Re-rank exato de top_k * fator candidatos (0 = desligado; só no backend "disk")
+
+    COMPACTION_DEAD_RATIO: float = Field(default=0.3) # Fração de tombstones que dispara a compactação em background
+    COMPACTION_MIN_DELETED_ROWS: int = Field(default=1000) # Abaixo disso não compensa regravar os segmentos
+    COMPACTION_INTERVAL: float = Field(default=60.0) # Segundos entre verificações do compactador
+
+    # ====== Retrieval / Context ======
+    RAG_TOP_K: int = Field(default=10) # Chunks recuperados por pergunta (antes do empacotamento)
+    CONTEXT_TOKEN_BUDGET: int = Field(default=0) # Tokens de contexto por prompt (0 = padrão do modelo)
+    RETRIEVAL_MODE: str = Field(default="hybrid") # "vector" | "hybrid" (RRF com BM25) | "prefilter" (BM25 limita candidatos)
+    LEXICAL_INDEX_ENABLED: bool = Field(default=True) # Índice BM25 em memória, atualizado no add_documents
+    BM25_K1: float = Field(default=1.5)
+    BM25_B: float = Field(default=0.75)
+    CROSS_ENCODER_ENABLED: bool = Field(default=False) # Re-ranking dos candidatos com cross-encoder local (CPU)
+    CROSS_ENCODER_MODEL: str = Field(default="cross-encoder/mmarco-mMiniLMv2-L12-H384-v1") # Multilíngue (inclui português)
+    CROSS_ENCODER_CANDIDATES: int = Field(default=30) # Candidatos buscados antes do re-ranking
+    CROSS_ENCODER_BATCH_SIZE: int = Field(default=16) # Pares (pergunta, trecho) por forward
+    CROSS_ENCODER_BUDGET: float = Field(default=0.3) # Segundos de re-ranking por requisição (excedeu = ordem da busca)
+    CROSS_ENCODER_MAX_CONCURRENCY: int = Field(default=2) # Re-rankings simultâneos por processo
+    CROSS_ENCODER_CACHE_SIZE: int = Field(default=20000) # Scores (pergunta, trecho) no LRU
+    FILTERABLE_FIELDS: List[str] = Field(default_factory=lambda: ["filename", "tenant"]) # Campos de metadata aceitos em filter
+
+    # ====== Batch QA ======
+    QA_BATCH_MAX_QUESTIONS: int = Field(default=200) # Perguntas por chamada de /agents/qa/batch
+    QA_BATCH_CONCURRENCY: int = Field(default=8) # Completions simultâneas por lote
+
+    # ====== Answer Cache ======
+    ANSWER_CACHE_ENABLED: bool = Field(default=True)
+    ANSWER_CACHE_THRESHOLD: float = Field(default=0.95) # Similaridade cosseno mínima entre perguntas
+    ANSWER_CACHE_SIZE: int = Field(default=2000) # Respostas mantidas (LRU)
+    ANSWER_CACHE_TTL: float = Field(default=3600.0) # Segundos
+
+    # ====== Map-Reduce Summarization ======
+    SUMMARY_TOKEN_BUDGET: int = Field(default=6000) # Tokens de entrada por chamada (map/reduce)
+    SUMMARY_MAX_TOKENS: int = Field(default=500) # Tokens de saída de cada resumo intermediário
+    SUMMARY_CACHE_PATH: str = Field(default="./data/summary_cache.sqlite") # "" = cache em memória
 
     # ====== Document Processing ======
     CHUNK_SIZE: int = Field(default=800)
     CHUNK_OVERLAP: int = Field(default=100)
+    CHUNK_MODE: str = Field(default="chars") # "chars" | "tokens" (tamanho medido pelo tokenizer do HF_EMBEDDING_MODEL)
+    CHUNK_TOKENS: int = Field(default=256) # Modo "tokens": janela do modelo de embeddings (max_seq_length)
+    CHUNK_TOKEN_OVERLAP: int = Field(default=32) # Modo "tokens": overlap em tokens
+    EMBEDDING_BATCH_SIZE: int = Field(default=64) # Chunks vetorizados/gravados por vez na ingestão
+    UPLOAD_READ_SIZE: int = Field(default=1024 * 1024) # Bytes lidos por vez do upload
+    EMBEDDING_CACHE_SIZE: int = Field(default=50000) # Entradas no LRU em memória do cache de embeddings
+    EMBEDDING_CACHE_PATH: str = Field(default="./data/embedding_cache.sqlite") # Tier em disco ("" = desligado)
+    PARSE_CACHE_PATH: str = Field(default="./data/parse_cache") # Saída normalizada do parser por hash do arquivo ("" = desligado)
+    PARSE_CACHE_MAX_BYTES: int = Field(default=1024**3) # Tamanho máximo do cache de parse em disco
+    PARSE_PARALLEL_WORKERS: int = Field(default=0) # Processos por PDF grande (0 = desligado; multiplica por worker de ingestão)
+    PARSE_PARALLEL_MIN_PAGES: int = Field(default=100) # Páginas a partir das quais o PDF é convertido em paralelo
+
+    # ====== Ingestion Jobs ======
+    INGESTION_WORKERS: int = Field(default=2) # Processos de parse/embedding
+    INGESTION_QUEUE_SIZE: int = Field(default=16) # Jobs pendentes antes de responder 429
+    BULK_PARSE_WORKERS: int = Field(default=4) # Processos de parse na ingestão em massa
+    BULK_PACK_SIZE: int = Field(default=4096) # Chunks (de vários documentos) ordenados e vetorizados juntos
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,215 @@
+# Registry de recursos pesados do processo (um por worker):
+# - Parser de documentos (DocumentParser; o Docling é carregado no primeiro PDF/DOCX/PPTX)
+# - Modelo de embeddings (SentenceTransformer)
+# - Cross-encoder de re-ranking (opcional)
+# - Cliente OpenAI (LLMService)
+# - Coleções do VectorStore compartilhadas entre upload e agentes
+# - Compactador das coleções (thread em background)
+#
+# É criado no lifespan do FastAPI (app/main.py) e exposto às rotas via Depends
+# (app/api/deps.py). Assim cada recurso é carregado uma única vez no startup.
+
+from typing import Dict, Optional
+import logging
+import time
+
+from app.core.config import Settings, get_settings
+from app.document_pipeline.parser import DocumentParser, parser_options
+from app.document_pipeline.chunker import TextChunker, chunker_options
+from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.services.llm import LLMService
+from app.services.embedding_cache import build_embedding_cache
+from app.services.answer_cache import SemanticAnswerCache
+from app.agents.map_reduce import MapReduceSummarizer, SummaryCache
+from app.agents.context import ContextPacker
+from app.services.jobs import IngestionJobManager
+from app.services.compaction import CompactionService
+from app.services.reranker import CrossEncoderReranker
+from app.vectorstore.store import VectorStore
+from app.vectorstore.collections import CollectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """
+    Mantém as instâncias compartilhadas (singletons por processo).
+
+    Responsabilidades:
+    - Carregar modelos e clientes uma única vez (warm-up)
+    - Medir o tempo de warm-up de cada recurso
+    - Liberar recursos no shutdown
+    """
+
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or get_settings()
+
+        self.parser: Optional[DocumentParser] = None
+        self.chunker: Optional[TextChunker] = None
+        self.embedder: Optional[EmbeddingsGenerator] = None
+        self.reranker: Optional[CrossEncoderReranker] = None
+        self.llm: Optional[LLMService] = None
+        self.collections: Optional[CollectionManager] = None
+        self.jobs: Optional[IngestionJobManager] = None
+        self.compactor: Optional[CompactionService] = None
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        self.summary_cache: Optional[SummaryCache] = None
+        self.context_packer: Optional[ContextPacker] = None
+
+        self.warmup_timings: Dict[str, float] = {} # Segundos gastos por recurso
+
+    @property
+    def embedding_cache_stats(self) -> Dict[str, Dict]:
+        """
+        Hit rate do cache de embeddings deste processo (chunks e perguntas
+        dos agentes passam pelo mesmo modelo, ver EmbeddingsGenerator).
+        """
+        cache = self.embedder.cache if self.embedder else None
+        return {"chunks": cache.stats()} if cache is not None else {}
+
+    @property
+    def warmup_seconds(self) -> float:
+        """
+        Tempo total de warm-up do registry.
+        """
+        return sum(self.warmup_timings.values())
+
+    def summarizer_for(self, store: VectorStore) -> MapReduceSummarizer:
+        """
+        Resumidor map-reduce de uma coleção. O cache de resumos é único: as
+        chaves vêm do conteúdo, então coleções não colidem.
+        """
+        return MapReduceSummarizer(
+            llm_service=self.llm,
+            vector_store=store,
+            cache=self.summary_cache,
+            token_budget=self.settings.SUMMARY_TOKEN_BUDGET,
+            summary_max_tokens=self.settings.SUMMARY_MAX_TOKENS
+        )
+
+    # ==========================
+    # LIFECYCLE
+    # ==========================
+
+    def startup(self):
+        """
+        Carrega todos os recursos, medindo o tempo de cada um.
+        """
+        settings = self.settings
+
+        self.parser = self._timed("parser", lambda: DocumentParser(**parser_options(settings)))
+        self.chunker = self._timed(
+            "chunker",
+            lambda: TextChunker(**chunker_options(settings))
+        )
+        self.embedder = self._timed(
+            "embedder",
+            lambda: EmbeddingsGenerator(
+                model_name=settings.HF_EMBEDDING_MODEL,
+                cache=build_embedding_cache(settings, settings.HF_EMBEDDING_MODEL)
+            )
+        )
+        if settings.CROSS_ENCODER_ENABLED:
+            self.reranker = self._timed(
+                "reranker",
+                lambda: CrossEncoderReranker(
+                    model_name=settings.CROSS_ENCODER_MODEL,
+                    batch_size=settings.CROSS_ENCODER_BATCH_SIZE,
+                    latency_budget=settings.CROSS_ENCODER_BUDGET,
+                    max_concurrency=settings.CROSS_ENCODER_MAX_CONCURRENCY,
+                    cache_size=settings.CROSS_ENCODER_CACHE_SIZE
+                )
+            )
+        self.llm = self._timed(
+            "llm",
+            lambda: LLMService(
+                api_key=settings.OPENAI_API_KEY,
+                embedding_model=settings.OPENAI_EMBEDDING_MODEL,
+                chat_model=settings.OPENAI_MODEL,
+                base_url=settings.OPENAI_BASE_URL,
+                max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                timeout=settings.LLM_TIMEOUT,
+                connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+                max_retries=settings.LLM_MAX_RETRIES,
+                retry_base_delay=settings.LLM_RETRY_BASE_DELAY
+            )
+        )
+        self.collections = self._timed(
+            "vector_store",
+            lambda: CollectionManager(settings)
+        )
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=settings.ANSWER_CACHE_THRESHOLD,
+                max_entries=settings.ANSWER_CACHE_SIZE,
+                ttl_seconds=settings.ANSWER_CACHE_TTL
+            )
+        self.context_packer = ContextPacker.for_model(
+            settings.OPENAI_MODEL,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET
+        )
+        self.summary_cache = SummaryCache(settings.SUMMARY_CACHE_PATH or None)
+        self.jobs = self._timed(
+            "ingestion_workers",
+            lambda: IngestionJobManager(
+                collections=self.collections,
+                settings=settings,
+                max_workers=settings.INGESTION_WORKERS,
+                max_pending=settings.INGESTION_QUEUE_SIZE
+            )
+        )
+
+        self.compactor = CompactionService(
+            self.collections,
+            dead_ratio=settings.COMPACTION_DEAD_RATIO,
+            min_deleted_rows=settings.COMPACTION_MIN_DELETED_ROWS,
+            interval=settings.COMPACTION_INTERVAL
+        )
+
+        logger.info(
+            f"Registry pronto em {self.warmup_seconds:.2f}s "
+            f"({', '.join(f'{k}={v:.2f}s' for k, v in self.warmup_timings.items())})"
+        )
+
+    async def ashutdown(self):
+        """
+        Fecha os pools de conexões HTTP do LLM e libera os demais recursos.
+        """
+        if self.llm:
+            await self.llm.aclose()
+        self.shutdown()
+
+    def shutdown(self):
+        """
+        Libera recursos que mantêm arquivos/conexões abertos.
+        """
+        if self.jobs:
+            self.jobs.shutdown()
+
+        if self.compactor:
+            self.compactor.shutdown()
+
+        if self.parser:
+            self.parser.close()
+
+        if self.collections:
+            self.collections.close()
+
+        if self.embedder and self.embedder.cache:
+            self.embedder.cache.close()
+
+        if self.summary_cache:
+            self.summary_cache.close()
+
+        logger.info("Registry finalizado.")
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _timed(self, name: str, factory):
+        start = time.perf_counter()
+        resource = factory()
+        self.warmup_timings[name] = time.perf_counter() - start
+        return resource
@@ -0,0 +1,307 @@
+# Ingestão em massa (muitos arquivos de uma vez):
+# - Parse + chunking em paralelo, um processo por core (Docling é CPU-bound)
+# - Chunks de vários documentos são acumulados e ordenados por tamanho
+#   antes de vetorizar: batches grandes e homogêneos = menos padding
+# - Um único modelo de embeddings no processo principal
+# - Mesmo dedup da ingestão unitária: arquivos já conhecidos são pulados e só
+#   chunks inéditos são vetorizados; o commit de cada documento (hash do
+#   arquivo + tombstones) acontece depois que seus chunks foram gravados
+#
+# Usado pelo endpoint POST /documents/bulk e pela CLI (python -m app.cli ingest).
+# A CLI cria um pool de parse por execução; a API reaproveita um pool de vida
+# longa (ver parse_pool e IngestionJobManager), sem pagar o spawn + import
+# do Docling a cada job.
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import logging
+import multiprocessing
+import tarfile
+import zipfile
+
+from app.document_pipeline.chunker import TextChunker
+from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.document_pipeline.dedup import skip_known_chunks, with_metadata
+from app.vectorstore.catalog import hash_file
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {
+    ".pdf", ".docx", ".pptx", ".xlsx", ".html", ".htm",
+    ".md", ".txt", ".csv", ".json", ".asciidoc", ".adoc",
+}
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def extract_archive(archive_path: Path, destination: Path):
+    """
+    Extrai zip/tar em destination, recusando caminhos que escapem do diretório.
+    """
+    destination = destination.resolve()
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.namelist():
+                if not (destination / member).resolve().is_relative_to(destination):
+                    raise ValueError(f"Caminho inválido no arquivo compactado: {member}")
+            archive.extractall(destination)
+        return
+
+    with tarfile.open(archive_path) as archive:
+        archive.extractall(destination, filter="data") # Bloqueia path traversal e links
+
+
+def iter_document_paths(root: Path) -> Iterator[Path]:
+    """
+    Percorre a árvore e emite os arquivos com extensão suportada, em ordem estável.
+    """
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
+            yield path
+
+
+# ==========================
+# WORKER PROCESS
+# ==========================
+
+_worker_parser = None
+_worker_chunker = None
+
+
+def _init_parse_worker(parser_options: Dict[str, Any], chunker_options: Dict[str, Any]):
+    global _worker_parser, _worker_chunker
+
+    from app.document_pipeline.parser import DocumentParser
+
+    _worker_parser = DocumentParser(**parser_options)
+    _worker_chunker = TextChunker(**chunker_options)
+
+
+def parse_pool(
+    parser_options: Dict[str, Any],
+    chunker_options: Dict[str, Any],
+    workers: int
+) -> ProcessPoolExecutor:
+    """
+    Pool de processos de parse/chunking (spawn: o processo pai pode ter
+    threads), com parser e chunker carregados uma vez por processo.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_parse_worker,
+        initargs=(parser_options, chunker_options)
+    )
+
+
+def _parse_and_chunk(path: str) -> Tuple[str, int, List[Dict]]:
+    """
+    Converte e divide um arquivo no worker. Retorna (hash do arquivo, páginas, chunks).
+    """
+    file_hash = hash_file(path)
+    pages = list(_worker_parser.iter_pages(Path(path), file_hash=file_hash))
+    return file_hash, len(pages), list(_worker_chunker.iter_chunks(pages))
+
+
+# ==========================
+# BULK INGESTOR
+# ==========================
+
+class BulkIngestor:
+    """
+    Ingestão de muitos arquivos com parse paralelo e embeddings em lotes
+    grandes ordenados por tamanho, misturando chunks de vários documentos.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbeddingsGenerator,
+        vector_store,
+        parser_options: Optional[Dict[str, Any]] = None,
+        chunker_options: Optional[Dict[str, Any]] = None,
+        parse_workers: int = 4,
+        batch_size: int = 64,
+        pack_size: int = 4096,
+        executor: Optional[ProcessPoolExecutor] = None
+    ):
+        """
+        Args:
+            embedder (EmbeddingsGenerator): Modelo de embeddings (processo principal)
+            vector_store: Destino dos chunks (VectorStore ou qualquer objeto
+                com add_documents, find_file, known_chunks e commit_document)
+            parser_options (Dict): Argumentos do DocumentParser dos workers
+                (ver parser_options; padrão: sem cache de parse)
+            chunker_options (Dict): Argumentos do TextChunker dos workers
+                (ver chunker_options; padrão: chunks de 800 caracteres)
+            parse_workers (int): Processos de parse/chunking
+            batch_size (int): Textos por forward do modelo
+            pack_size (int): Chunks acumulados (de vários documentos) antes de
+                ordenar e vetorizar; limita o pico de memória
+            executor (ProcessPoolExecutor): Pool de parse compartilhado (ver
+                parse_pool), não encerrado ao final; None = um pool próprio
+                de parse_workers processos por ingestão
+        """
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.parser_options = parser_options or {}
+        self.chunker_options = chunker_options or {"chunk_size": 800, "chunk_overlap": 100}
+        self.parse_workers = parse_workers
+        self.batch_size = batch_size
+        self.pack_size = pack_size
+        self.executor = executor
+
+    def ingest_directory(
+        self,
+        root: Path,
+        metadata: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[Callable[[Dict[str, int]], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Ingere todos os arquivos suportados sob root. O filename gravado em
+        cada chunk é o caminho relativo a root.
+        """
+        root = Path(root)
+        return self.ingest_paths(
+            iter_document_paths(root),
+            root=root,
+            metadata=metadata,
+            on_progress=on_progress
+        )
+
+    def ingest_paths(
+        self,
+        paths: Iterable[Path],
+        root: Optional[Path] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[Callable[[Dict[str, int]], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Args:
+            paths (Iterable[Path]): Arquivos a ingerir
+            root (Path): Base para o nome relativo gravado nos metadados
+            metadata (Dict): Metadados extras gravados em cada chunk
+            on_progress (Callable): Chamado após cada arquivo e cada pack
+
+        Returns:
+            Dict[str, int]: files_processed, files_failed, files_skipped,
+            pages_parsed, chunks_embedded, chunks_reused, chunks_tombstoned
+        """
+        metadata = metadata or {}
+        stats = {
+            "files_processed": 0,
+            "files_failed": 0,
+            "files_skipped": 0,
+            "pages_parsed": 0,
+            "chunks_embedded": 0,
+            "chunks_reused": 0,
+            "chunks_tombstoned": 0,
+        }
+        pack: List[Dict] = []
+        commits: List[Tuple[str, str, Set[str]]] = [] # Documentos cujos chunks estão no pack
+        file_hashes: Set[str] = set() # Arquivos repetidos dentro da mesma carga
+
+        def report():
+            if on_progress:
+                on_progress(dict(stats))
+
+        if self.executor is not None:
+            pool = nullcontext(self.executor)
+        else:
+            pool = parse_pool(self.parser_options, self.chunker_options, self.parse_workers)
+
+        with pool as executor:
+            in_flight = {}
+            paths = iter(paths)
+            window = self.parse_workers * 2 # Limita arquivos parseados aguardando embeddings
+
+            while True:
+                while len(in_flight) < window:
+                    path = next(paths, None)
+                    if path is None:
+                        break
+                    in_flight[executor.submit(_parse_and_chunk, str(path))] = path
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    name = str(path.relative_to(root)) if root else path.name
+
+                    try:
+                        file_hash, num_pages, chunks = future.result()
+                    except BrokenProcessPool:
+                        raise # Pool inutilizável: não é falha do arquivo
+                    except Exception:
+                        logger.exception(f"Falha ao processar {name}")
+                        stats["files_failed"] += 1
+                        continue
+
+                    if file_hash in file_hashes or self.vector_store.find_file(file_hash):
+                        stats["files_skipped"] += 1
+                        continue
+                    file_hashes.add(file_hash)
+
+                    seen: Set[str] = set()
+                    reused: Dict[str, Dict] = {}
+                    known = self.vector_store.known_chunks(name)
+                    chunk_metadata = {**metadata, "filename": name}
+                    for chunk in skip_known_chunks(chunks, known, seen, stats, reused):
+                        pack.append(with_metadata(chunk, chunk_metadata))
+                    for chunk in reused.values():
+                        with_metadata(chunk, chunk_metadata)
+                    commits.append((name, file_hash, seen, reused))
+
+                    stats["files_processed"] += 1
+                    stats["pages_parsed"] += num_pages
+
+                if len(pack) >= self.pack_size:
+                    self._flush(pack, commits, stats)
+                    pack, commits = [], []
+
+                report()
+
+        if pack or commits:
+            self._flush(pack, commits, stats)
+            report()
+
+        logger.info(
+            f"Ingestão em massa concluída: {stats['files_processed']} arquivos "
+            f"({stats['files_failed']} falhas), {stats['chunks_embedded']} chunks."
+        )
+
+        return stats
+
+    def _flush(
+        self,
+        pack: List[Dict],
+        commits: List[Tuple[str, str, Set[str], Dict[str, Dict]]],
+        stats: Dict[str, int]
+    ):
+        """
+        Ordena o pack por tamanho, vetoriza em batches homogêneos e então
+        commita os documentos cujos chunks estavam no pack.
+        """
+        pack.sort(key=lambda chunk: len(chunk["text"]))
+
+        for start in range(0, len(pack), self.pack_size):
+            embedded = self.embedder.embed_chunks(
+                pack[start:start + self.pack_size],
+                batch_size=self.batch_size
+            )
+            self.vector_store.add_documents(embedded)
+            stats["chunks_embedded"] += len(embedded)
+
+        for filename, file_hash, chunk_hashes, reused in commits:
+            stats["chunks_tombstoned"] += self.vector_store.commit_document(
+                filename, file_hash, chunk_hashes, reused=reused
+            )
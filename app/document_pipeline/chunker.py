@@ -3,13 +3,64 @@
 # - Preservar contexto com overlap
 # - Evitar cortar frases ao meio
 # - Preparar texto para embeddings, RAG, agentes de IA
+#
+# Dois modos:
+# - "chars": tamanho em caracteres, montando o chunk frase a frase
+# - "tokens": tamanho medido pelo tokenizer do modelo de embeddings, para o
+#   chunk encher a janela do modelo (256/512 tokens) sem ser truncado. Cada
+#   página é tokenizada uma única vez; os chunks são intervalos de offsets
+#   sobre o texto do documento (o mesmo de DocumentParser.parse), cortados
+#   em fim de frase ou, na falta, entre palavras. Cada chunk leva start/end
+#   e as páginas que cobre
 
-from typing import List, Dict
+from itertools import chain
+from typing import TYPE_CHECKING, Any, List, Dict, Iterable, Iterator, Optional, Tuple, Union
 import logging
 import re
 
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.core.config import Settings
+
 logger = logging.getLogger(__name__)   
 
+CHUNK_MODES = ("chars", "tokens")
+PAGE_SEPARATOR = "\n" # Separador das páginas no texto do documento (ver DocumentParser)
+
+# Nível de quebra antes de cada token (modo "tokens")
+_NO_BREAK, _WORD_BREAK, _SENTENCE_BREAK = 0, 1, 2
+_SENTENCE_END = np.frombuffer(b".!?", dtype=np.uint8)
+
+
+def chunker_options(settings: "Settings") -> Dict[str, Any]:
+    """
+    Argumentos do TextChunker a partir das configurações (dict simples,
+    enviado aos processos de ingestão).
+    """
+    if settings.CHUNK_MODE == "tokens":
+        return {
+            "mode": "tokens",
+            "chunk_size": settings.CHUNK_TOKENS,
+            "chunk_overlap": settings.CHUNK_TOKEN_OVERLAP,
+            "tokenizer": settings.HF_EMBEDDING_MODEL,
+        }
+    return {"chunk_size": settings.CHUNK_SIZE, "chunk_overlap": settings.CHUNK_OVERLAP}
+
+
+def load_tokenizer(model_name: str):
+    """
+    Tokenizer "fast" (Rust) do modelo HuggingFace, sem carregar os pesos.
+    O modo "tokens" depende dos offsets que só ele fornece.
+    """
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if not tokenizer.is_fast:
+        raise ValueError(f"O modelo {model_name} não tem tokenizer fast (offsets indisponíveis)")
+    return tokenizer
+
+
 class TextChunker:
     """
     Responsável por dividir documentos longos em chunks
@@ -24,19 +75,44 @@ class TextChunker:
     def __init__(
         self, 
         chunk_size: int = 800, 
-        chunk_overlap: int = 150
+        chunk_overlap: int = 150,
+        mode: str = "chars",
+        tokenizer: Union[str, Any, None] = None
     ):
         """
         Args:
-            chunk_size (int): Tamanho máximo do chunk (em caracteres)
+            chunk_size (int): Tamanho máximo do chunk (em caracteres; no modo
+                "tokens", a janela do modelo, ex.: 256, já com os tokens especiais)
             chunk_overlap (int): Overlap entre chunks para manter contexto
+                (caracteres ou tokens, conforme o modo)
+            mode (str): "chars" | "tokens"
+            tokenizer (str | PreTrainedTokenizerFast): Modo "tokens": nome do
+                modelo de embeddings ou o próprio tokenizer
         """
+        if mode not in CHUNK_MODES:
+            raise ValueError(f"Modo de chunking inválido: {mode}")
         if chunk_overlap >= chunk_size:
             raise ValueError("chunk_overlap deve ser menor que chunk_size")
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.mode = mode
+
+        self.tokenizer = None
+        self.max_tokens = None
+        if mode == "tokens":
+            if tokenizer is None:
+                raise ValueError("O modo 'tokens' exige o tokenizer do modelo de embeddings")
+            self.tokenizer = load_tokenizer(tokenizer) if isinstance(tokenizer, str) else tokenizer
+
+            # Tokens de texto por chunk: a janela (limitada à do modelo) menos [CLS]/[SEP]
+            window = min(chunk_size, getattr(self.tokenizer, "model_max_length", chunk_size))
+            self.max_tokens = window - self.tokenizer.num_special_tokens_to_add()
+            if chunk_overlap >= self.max_tokens:
+                raise ValueError(
+                    f"chunk_overlap deve ser menor que os {self.max_tokens} tokens de texto por chunk"
+                )
     
-    def split(self, text: str) -> List[str]:
+    def split(self, text: str) -> List[Dict]:
         """
          Divide o texto em chunks estruturados.
 
@@ -45,32 +121,165 @@ class TextChunker:
         """
         if not text or not text.strip():
             return []
-        
-        sentences = self._split_sentences(text)
-        chunks = []
+
+        chunks = list(self.iter_chunks([{"page_number": None, "text": text}]))
+
+        logger.info(f"Documento dividido em {len(chunks)} chunks.")
+
+        return chunks
+
+    def iter_chunks(self, pages: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Versão incremental do split: consome páginas sob demanda e emite
+        cada chunk assim que ele fecha. Memória limitada a um chunk (no modo
+        "tokens", à página atual mais o chunk em aberto).
+
+        Args:
+            pages (Iterable[Dict]): Páginas normalizadas ({"page_number", "text"})
+
+        Yields:
+            Dict: Chunk com metadados (inclui a página onde o chunk começa)
+        """
+        if self.mode == "tokens":
+            yield from self._iter_token_chunks(pages)
+            return
 
         current_chunk = ""
+        current_page = None
         chunk_id = 0
 
-        for sentence in sentences:
-            # Se adicionar a frase ultrapassar o tamanho do chunk, salva o chunk atual
-            if len(current_chunk) + len(sentence) > self.chunk_size:
-                chunks.append(self.builds_chunk(current_chunk, chunk_id))
-                chunk_id += 1
+        for page in pages:
+            for sentence in self._split_sentences(page.get("text") or ""):
+                # Se adicionar a frase ultrapassar o tamanho do chunk, emite o chunk atual
+                if current_chunk.strip() and len(current_chunk) + len(sentence) > self.chunk_size:
+                    yield self._builds_chunk(current_chunk, chunk_id, current_page)
+                    chunk_id += 1
 
-                # Overlap: mantém parte final do chunk anterior
-                current_chunk = current_chunk[-self.chunk_overlap:]
+                    # Overlap: mantém parte final do chunk anterior
+                    current_chunk = current_chunk[-self.chunk_overlap:]
+                    current_page = page.get("page_number")
+
+                if not current_chunk.strip():
+                    current_page = page.get("page_number")
+
+                current_chunk += sentence + " "
 
-            current_chunk += sentence + " "
-        
         # Ultimo chunk
         if current_chunk.strip():
-            chunks.append(self.builds_chunk(current_chunk, chunk_id))
+            yield self._builds_chunk(current_chunk, chunk_id, current_page)
+    
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
 
-        logger.info(f"Documento dividido em {len(chunks)} chunks.")
+    def _iter_token_chunks(self, pages: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Modo "tokens". Os tokens pendentes (ainda não emitidos ou no overlap)
+        ficam em arrays de offsets globais; cada chunk é um corte desses
+        arrays e uma única fatia do texto.
+        """
+        segments: List[Tuple[int, Optional[int], str]] = [] # (offset, página, texto) ainda referenciadas
+        starts = ends = np.empty(0, dtype=np.int64)
+        breaks = np.empty(0, dtype=np.int8)
+        offset = 0
+        chunk_id = 0
+
+        for page in pages:
+            text = page.get("text") or ""
+            if not text:
+                continue # Páginas vazias não entram no texto do documento
+
+            page_starts, page_ends, page_breaks = self._tokenize(text)
+            segments.append((offset, page.get("page_number"), text))
+            starts = np.concatenate([starts, page_starts + offset])
+            ends = np.concatenate([ends, page_ends + offset])
+            breaks = np.concatenate([breaks, page_breaks])
+            offset += len(text) + len(PAGE_SEPARATOR)
+
+            # Só corta com a janela cheia: a próxima página ainda pode completá-la
+            while len(starts) > self.max_tokens:
+                cut = self._cut_point(breaks)
+                yield self._builds_span_chunk(segments, int(starts[0]), int(ends[cut - 1]), cut, chunk_id)
+                chunk_id += 1
+
+                keep = self._overlap_start(breaks, cut)
+                starts, ends, breaks = starts[keep:], ends[keep:], breaks[keep:]
+
+                first = int(starts[0])
+                while len(segments) > 1 and segments[1][0] <= first:
+                    segments.pop(0)
+
+        while len(starts):
+            cut = self._cut_point(breaks) if len(starts) > self.max_tokens else len(starts)
+            yield self._builds_span_chunk(segments, int(starts[0]), int(ends[cut - 1]), cut, chunk_id)
+            chunk_id += 1
+
+            if cut == len(starts):
+                break
+            keep = self._overlap_start(breaks, cut)
+            starts, ends, breaks = starts[keep:], ends[keep:], breaks[keep:]
+
+    def _tokenize(self, text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Offsets (início, fim) de cada token da página e o nível de quebra
+        antes dele: entre palavras (há espaço antes) ou fim de frase
+        (o token anterior termina em . ! ?). O início da página conta como
+        fim de frase.
+        """
+        # Direto no tokenizer Rust: sem o wrapper do transformers (conversões
+        # e o aviso de sequência maior que a janela, esperado numa página)
+        offsets = self.tokenizer.backend_tokenizer.encode(text, add_special_tokens=False).offsets
+        offsets = np.fromiter(chain.from_iterable(offsets), dtype=np.int64, count=2 * len(offsets)).reshape(-1, 2)
+        starts, ends = offsets[:, 0], offsets[:, 1]
+
+        breaks = np.zeros(len(starts), dtype=np.int8)
+        if len(starts):
+            gap = starts[1:] > ends[:-1]
+            breaks[1:][gap] = _WORD_BREAK
+
+            codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+            previous = codes[np.maximum(ends[:-1] - 1, 0)]
+            breaks[1:][gap & np.isin(previous, _SENTENCE_END)] = _SENTENCE_BREAK
+            breaks[0] = _SENTENCE_BREAK
+
+        return starts, ends, breaks
+
+    def _cut_point(self, breaks: np.ndarray) -> int:
+        """
+        Quantidade de tokens do próximo chunk (há mais de max_tokens
+        pendentes): o último fim de frase que deixa o chunk ao menos pela
+        metade; senão a última quebra entre palavras; senão max_tokens.
+        """
+        limit = self.max_tokens
+        window = breaks[1:limit + 1] # breaks[j] é a quebra antes do token j: corte em j
+
+        sentence = np.flatnonzero(window[limit // 2:] == _SENTENCE_BREAK)
+        if len(sentence):
+            return int(sentence[-1]) + limit // 2 + 1
+
+        word = np.flatnonzero(window >= _WORD_BREAK)
+        if len(word):
+            return int(word[-1]) + 1
+
+        return limit
+
+    def _overlap_start(self, breaks: np.ndarray, cut: int) -> int:
+        """
+        Primeiro token do chunk seguinte: o início de frase mais antigo
+        dentro dos últimos chunk_overlap tokens (ou, na falta, o início de
+        palavra mais antigo). Nunca recua até o início do chunk emitido.
+        """
+        lower = max(1, cut - self.chunk_overlap)
+        if lower >= cut:
+            return cut
+
+        window = breaks[lower:cut]
+        for level in (_SENTENCE_BREAK, _WORD_BREAK):
+            found = np.flatnonzero(window >= level)
+            if len(found):
+                return lower + int(found[0])
+        return cut
 
-        return chunks
-    
     def _split_sentences(self, text: str) -> List[str]:
         """
         Divide o texto por sentenças para evitar cortes abruptos.
@@ -80,14 +289,46 @@ class TextChunker:
         sentences = re.split(r'(?<=[.!?])\s+', text)
         return [s.strip() for s in sentences if s.strip()]
     
-    def _builds_chunk(self, text: str, chunk_id: int) -> str:
+    def _builds_chunk(self, text: str, chunk_id: int, page: Optional[int] = None) -> Dict:
         """
         Estrutura padrão do chunk.
         """
         return {
             "chunk_id": chunk_id,
             "text": text.strip(),
-            "length": len(text.strip())
+            "length": len(text.strip()),
+            "page": page
         }
 
+    def _builds_span_chunk(
+        self,
+        segments: List[Tuple[int, Optional[int], str]],
+        start: int,
+        end: int,
+        tokens: int,
+        chunk_id: int
+    ) -> Dict:
+        """
+        Chunk do modo "tokens": fatia [start, end) do texto do documento,
+        com os offsets e as páginas que cobre.
+        """
+        parts, pages = [], []
+        for offset, page_number, text in segments:
+            if offset >= end:
+                break
+            if offset + len(text) <= start:
+                continue
+            parts.append(text[max(start - offset, 0):end - offset])
+            pages.append(page_number)
 
+        text = PAGE_SEPARATOR.join(parts)
+        return {
+            "chunk_id": chunk_id,
+            "text": text,
+            "length": len(text),
+            "tokens": tokens,
+            "page": pages[0] if pages else None,
+            "pages": pages,
+            "start": start,
+            "end": end,
+        }
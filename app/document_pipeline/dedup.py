@@ -0,0 +1,50 @@
+# Dedup de chunks por hash de conteúdo, compartilhado pela ingestão
+# unitária (ingestion.py) e em massa (bulk.py). Os hashes e o catálogo
+# de documentos ficam em app/vectorstore/catalog.py.
+
+from typing import Any, Container, Dict, Iterable, Iterator, Optional, Set
+
+from app.vectorstore.catalog import hash_chunk
+
+
+def skip_known_chunks(
+    chunks: Iterable[Dict],
+    known: Container[str],
+    seen: Set[str],
+    stats: Dict[str, int],
+    reused: Optional[Dict[str, Dict]] = None
+) -> Iterator[Dict]:
+    """
+    Emite apenas chunks com hash inédito (nem no store, nem repetidos no
+    próprio documento), anotando chunk["chunk_hash"]. Registra em seen
+    todos os hashes da nova versão e conta os demais em chunks_reused.
+
+    Com reused, guarda hash -> chunk (anotado) de cada chunk já presente no
+    store, na posição da nova versão: o commit regrava as linhas que mudaram.
+    """
+    for chunk in chunks:
+        chunk_hash = hash_chunk(chunk["text"])
+        if chunk_hash in seen or chunk_hash in known:
+            if reused is not None and chunk_hash not in seen:
+                chunk["chunk_hash"] = chunk_hash
+                reused[chunk_hash] = chunk
+            seen.add(chunk_hash)
+            stats["chunks_reused"] += 1
+            continue
+
+        seen.add(chunk_hash)
+        chunk["chunk_hash"] = chunk_hash
+        yield chunk
+
+
+def with_metadata(chunk: Dict, metadata: Dict[str, Any]) -> Dict:
+    """
+    Move page e chunk_hash do chunk para chunk["metadata"] (formato das
+    linhas do store), junto com os metadados do documento.
+    """
+    chunk["metadata"] = {
+        **metadata,
+        "page": chunk.pop("page", None),
+        "chunk_hash": chunk.pop("chunk_hash"),
+    }
+    return chunk
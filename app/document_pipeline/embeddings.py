@@ -1,10 +1,17 @@
 # O Embeddings é reponsável por:
 # - Trasnformar chunks em vetores numéricos
 # - Ser agnóstico de provedor (HuggingFace, OpenAI, etc.)
+# - Não recalcular textos já vistos (cache opcional, ver embedding_cache.py)
+# - Vetorizar também as perguntas dos agentes (embed_texts): query e chunks
+#   precisam estar no mesmo espaço vetorial (mesmo modelo)
 
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional
+from itertools import islice
 import logging
-from sentence_transformers import SentenceTransformer
+
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
  
@@ -19,22 +26,48 @@ class EmbeddingsGenerator:
 
     def __init__(
         self,
-        model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        cache: Optional[EmbeddingCache] = None
     ):
         """
         Args:
             model_name (str): Modelo HuggingFace para embeddings
+            cache (EmbeddingCache): Cache (modelo, texto) -> vetor; chunks
+                repetidos não passam de novo pelo modelo
         """
+        from sentence_transformers import SentenceTransformer
+
         logger.info(f"Carregando modelo de embeddings: {model_name}")
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name) # Carrega o modelo de embeddings
+        self.cache = cache
 
-    def embed_chunks(self, chunks: List[Dict]) -> List[Dict]:
+    def embed_texts(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Vetoriza textos soltos (ex.: perguntas dos agentes), com o mesmo
+        modelo, normalização e cache dos chunks.
+
+        Returns:
+            np.ndarray: Matriz (len(texts), dim) float32
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        if self.cache is not None:
+            vectors = self.cache.get_or_compute(texts, lambda batch: self._encode(batch, batch_size))
+        else:
+            vectors = self._encode(texts, batch_size)
+
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_chunks(self, chunks: List[Dict], batch_size: int = 32) -> List[Dict]:
 
         """
         Gera embeddings para uma lista de chunks.
 
         Args:
             chunks (List[Dict]): Lista de chunks estruturados
+            batch_size (int): Textos por forward do modelo
 
         Returns:
             List[Dict]: Chunks com embeddings adicionados
@@ -47,21 +80,52 @@ class EmbeddingsGenerator:
             return []
     
         logger.info(f"Gerando embeddings para {len(texts)} chunks")
-    
-        vectors = self.model.encode(
-            texts, 
-            show_progress_bar=False,
-            normalize_embeddings=True
-        ) # Gera os embeddings
+
+        if self.cache is not None:
+            vectors = self.cache.get_or_compute(texts, lambda batch: self._encode(batch, batch_size))
+        else:
+            vectors = self._encode(texts, batch_size)
     
         enriched_chunks = []
     
+        # Mantém o vetor float32 do modelo (sem .tolist()): o VectorStore
+        # copia direto para a matriz, sem listas de floats Python no caminho
         for chunk, vector in zip(chunks, vectors):
             enriched_chunks.append({
                 **chunk, 
-                "embedding": vector.tolist()
+                "embedding": vector
                 })
         
         return enriched_chunks
-    
- 
\ No newline at end of file
+
+    def embed_batches(
+        self,
+        chunks: Iterable[Dict],
+        batch_size: int = 64
+    ) -> Iterator[List[Dict]]:
+        """
+        Consome chunks sob demanda e emite micro-batches já vetorizados.
+        A memória fica limitada a um batch, independente do tamanho do documento.
+
+        Args:
+            chunks (Iterable[Dict]): Chunks estruturados (ex.: TextChunker.iter_chunks)
+            batch_size (int): Chunks por chamada ao modelo
+
+        Yields:
+            List[Dict]: Chunks do batch com embeddings adicionados
+        """
+        iterator = iter(chunks)
+
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield self.embed_chunks(batch)
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=False,
+            normalize_embeddings=True
+        ) # Gera os embeddings
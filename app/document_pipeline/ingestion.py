@@ -0,0 +1,129 @@
+# A ingestão é responsável por:
+# - Encadear Parser -> Chunker -> Embeddings -> VectorStore como geradores
+# - Vetorizar em micro-batches de tamanho fixo
+# - Gravar cada batch no store assim que fica pronto
+#
+# O pico de memória depende do batch_size, não do tamanho do documento.
+#
+# Dedup por conteúdo: um arquivo com hash já conhecido é pulado, e numa nova
+# versão do documento só chunks com hash inédito são vetorizados. Ao final,
+# os chunks da versão anterior que sumiram viram tombstones no store; os
+# reaproveitados que mudaram de posição são regravados com o mesmo vetor.
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set
+import logging
+
+from app.document_pipeline.parser import DocumentParser
+from app.document_pipeline.chunker import TextChunker
+from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.document_pipeline.dedup import skip_known_chunks, with_metadata
+from app.vectorstore.catalog import hash_file
+from app.vectorstore.store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionPipeline:
+    """
+    Pipeline de ingestão em streaming de um documento.
+    """
+
+    def __init__(
+        self,
+        parser: DocumentParser,
+        chunker: TextChunker,
+        embedder: EmbeddingsGenerator,
+        vector_store: VectorStore,
+        batch_size: int = 64
+    ):
+        """
+        Args:
+            parser (DocumentParser): Conversor de documentos
+            chunker (TextChunker): Divisor de texto em chunks
+            embedder (EmbeddingsGenerator): Gerador de embeddings
+            vector_store (VectorStore): Destino dos chunks vetorizados
+            batch_size (int): Chunks vetorizados (e gravados) por vez
+        """
+        self.parser = parser
+        self.chunker = chunker
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+
+    def ingest(
+        self,
+        file_path: Path,
+        metadata: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+        file_hash: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Processa um arquivo de ponta a ponta.
+
+        Args:
+            file_path (Path): Caminho do arquivo
+            metadata (Dict): Metadados gravados em cada chunk (ex.: filename,
+                que identifica o documento para a re-ingestão incremental)
+            on_progress (Callable): Chamado após cada batch com as estatísticas
+            file_hash (str): SHA-256 do arquivo, se já calculado no upload
+
+        Returns:
+            Dict[str, int]: pages_parsed, chunks_embedded, chunks_reused,
+            chunks_tombstoned e files_skipped (1 se o arquivo já existia)
+        """
+        metadata = {"filename": Path(file_path).name, **(metadata or {})}
+        filename = metadata["filename"]
+        stats = {
+            "pages_parsed": 0,
+            "chunks_embedded": 0,
+            "chunks_reused": 0,
+            "chunks_tombstoned": 0,
+            "files_skipped": 0,
+        }
+
+        file_hash = file_hash or hash_file(file_path)
+        duplicate_of = self.vector_store.find_file(file_hash)
+        if duplicate_of is not None:
+            stats["files_skipped"] = 1
+            logger.info(f"{filename} ignorado: conteúdo idêntico a {duplicate_of}.")
+            return stats
+
+        known = self.vector_store.known_chunks(filename)
+        seen: Set[str] = set()
+        reused: Dict[str, Dict] = {}
+
+        pages = self._count_pages(self.parser.iter_pages(file_path, file_hash=file_hash), stats)
+        chunks = skip_known_chunks(self.chunker.iter_chunks(pages), known, seen, stats, reused)
+
+        for batch in self.embedder.embed_batches(chunks, self.batch_size):
+            for chunk in batch:
+                with_metadata(chunk, metadata)
+
+            self.vector_store.add_documents(batch)
+            stats["chunks_embedded"] += len(batch)
+
+            if on_progress:
+                on_progress(dict(stats))
+
+        stats["chunks_tombstoned"] = self.vector_store.commit_document(
+            filename,
+            file_hash,
+            seen,
+            reused={chunk_hash: with_metadata(chunk, metadata) for chunk_hash, chunk in reused.items()}
+        )
+
+        logger.info(
+            f"Ingestão concluída: {stats['pages_parsed']} páginas, "
+            f"{stats['chunks_embedded']} chunks novos, {stats['chunks_reused']} reaproveitados, "
+            f"{stats['chunks_tombstoned']} removidos."
+        )
+
+        return stats
+
+    @staticmethod
+    def _count_pages(pages: Iterable[Dict], stats: Dict[str, int]) -> Iterator[Dict]:
+        for page in pages:
+            stats["pages_parsed"] += 1
+            yield page
+
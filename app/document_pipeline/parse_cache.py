@@ -0,0 +1,170 @@
+# Cache em disco da saída normalizada do parser:
+# - A conversão (Docling) é de longe a etapa mais cara da ingestão; re-chunkar
+#   ou re-vetorizar um corpus (novo CHUNK_MODE, novo modelo de embeddings)
+#   não deve convertê-lo de novo
+# - Endereçado por conteúdo: a chave é o SHA-256 de (hash do arquivo, versão
+#   do parser). Renomear o arquivo reaproveita a entrada; mudar o parser
+#   (ou a versão do Docling) invalida todas
+# - Cada entrada é um JSON gzip com as páginas normalizadas; text e num_pages
+#   são derivados delas na leitura
+# - Limite de tamanho total: ao gravar, as entradas menos usadas (mtime,
+#   atualizado a cada leitura) são removidas até caber em max_bytes
+# - Um arquivo por entrada, gravado com rename atômico: o diretório pode ser
+#   compartilhado pela API e pelos workers de ingestão
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+ENTRY_SUFFIX = ".json.gz"
+
+
+class ParseCache:
+    """
+    Cache (hash do arquivo, versão do parser) -> páginas normalizadas.
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 1024**3):
+        """
+        Args:
+            path (str | Path): Diretório das entradas (criado se não existir)
+            max_bytes (int): Tamanho total máximo das entradas em disco
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def get(self, file_hash: str, version: str) -> Optional[Dict[str, Any]]:
+        """
+        Saída normalizada em cache ({"pages", "text", "num_pages"}), ou None.
+        """
+        entry = self._entry(file_hash, version)
+        try:
+            with gzip.open(entry, "rt", encoding="utf-8") as f:
+                pages = json.load(f)["pages"]
+            os.utime(entry) # Marca o uso (ordem da remoção)
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+        except (OSError, EOFError, ValueError, KeyError):
+            logger.warning(f"Entrada corrompida no cache de parse: {entry.name}")
+            entry.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        return normalized_output(pages)
+
+    def put(self, file_hash: str, version: str, pages: List[Dict[str, Any]]):
+        """
+        Grava as páginas normalizadas e remove as entradas menos usadas
+        se o total passar de max_bytes.
+        """
+        payload = gzip.compress(
+            json.dumps({"pages": pages}, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+            mtime=0
+        )
+        if len(payload) > self.max_bytes:
+            return
+
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, self._entry(file_hash, version))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+        self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Entradas e bytes em disco; acertos/faltas deste processo.
+        """
+        entries = self._scan()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _entry(self, file_hash: str, version: str) -> Path:
+        key = hashlib.sha256(f"{file_hash}\0{version}".encode("utf-8")).hexdigest()
+        return self.path / f"{key}{ENTRY_SUFFIX}"
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """
+        (mtime, tamanho, caminho) de cada entrada.
+        """
+        entries = []
+        with os.scandir(self.path) as it:
+            for item in it:
+                if not item.name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError: # Removida por outro processo
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+        return entries
+
+    def _evict(self):
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        removed = 0
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            Path(entry).unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        logger.info(f"Cache de parse: {removed} entradas removidas (limite de {self.max_bytes} bytes).")
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+
+def normalized_output(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Campos derivados das páginas na saída normalizada do parser.
+    """
+    return {
+        "num_pages": len(pages),
+        "text": "\n".join(p["text"] for p in pages if p["text"]),
+        "pages": pages,
+    }
@@ -1,19 +1,81 @@
 # Recebe Documentos corporativos (PDF, DOCX, TXT, etc.) e os converte em texto bruto.
 # Normaliza a saída, para ser usada por(chunking, embedding, etc).
 # Utilizando o Docling library
+#
+# Formatos que já são texto (txt, md, csv, html, json) usam os parsers leves
+# de text_formats.py. O Docling só é importado e inicializado quando chega o
+# primeiro formato rico (PDF, DOCX, PPTX...).
+#
+# Com cache_path, a saída normalizada fica num cache em disco endereçado pelo
+# hash do arquivo (ver parse_cache.py): o mesmo conteúdo não volta ao Docling.
+#
+# Com parallel_workers > 1, PDFs com parallel_min_pages páginas ou mais são
+# divididos em intervalos de páginas convertidos num pool de processos, cada
+# um com seu DocumentConverter já carregado; as páginas são emitidas na ordem.
 
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
 from pathlib import Path
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import logging
+import math
+import multiprocessing
+import threading
+import time
 
-from docling.document_converter import DocumentConverter
+from app.document_pipeline.parse_cache import ParseCache, normalized_output
+from app.document_pipeline.text_formats import fast_parser_for
+from app.vectorstore.catalog import hash_file
+
+if TYPE_CHECKING:
+    from docling.document_converter import DocumentConverter
+
+    from app.core.config import Settings
 
 logger = logging.getLogger(__name__)
 
+# Versão da normalização: incremente ao mudar _iter_pages (invalida o cache de parse)
+PARSER_VERSION = 2
+
+
+def parser_options(settings: "Settings") -> Dict[str, Any]:
+    """
+    Argumentos do DocumentParser a partir das configurações (dict simples,
+    enviado aos processos de ingestão).
+    """
+    return {
+        "cache_path": settings.PARSE_CACHE_PATH or None,
+        "cache_max_bytes": settings.PARSE_CACHE_MAX_BYTES,
+        "parallel_workers": settings.PARSE_PARALLEL_WORKERS,
+        "parallel_min_pages": settings.PARSE_PARALLEL_MIN_PAGES,
+    }
+
+
+def count_pdf_pages(path: Path) -> Optional[int]:
+    """
+    Páginas do PDF via pypdfium2 (dependência do Docling), sem convertê-lo.
+    None se não for possível contar.
+    """
+    try:
+        import pypdfium2
+    except ImportError:
+        return None
+
+    try:
+        pdf = pypdfium2.PdfDocument(str(path))
+    except Exception:
+        return None
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
 class DocumentParser:
     """
     Responsável por converter documentos corporativos (PDF, DOCX, TXT, etc.)
-    em texto estruturado utilizando Docling.
+    em texto estruturado utilizando Docling (ou um parser leve, para
+    formatos que já são texto).
 
     Saída normalizada para:
     - Chunking
@@ -21,55 +83,252 @@ class DocumentParser:
     - Agentes de IA
     """
 
-    def __init__(self):
-        self.converter = DocumentConverter()
+    def __init__(
+        self,
+        cache_path: Optional[str] = None,
+        cache_max_bytes: int = 1024**3,
+        parallel_workers: int = 0,
+        parallel_min_pages: int = 100
+    ):
+        """
+        Args:
+            cache_path (str): Diretório do cache de parse (None = sem cache)
+            cache_max_bytes (int): Tamanho máximo do cache em disco
+            parallel_workers (int): Processos de conversão por intervalo de
+                páginas (0 ou 1 = um único convert por documento)
+            parallel_min_pages (int): Páginas a partir das quais um PDF é
+                convertido em paralelo
+        """
+        self.cache = ParseCache(cache_path, cache_max_bytes) if cache_path else None
+        self.parallel_workers = parallel_workers
+        self.parallel_min_pages = parallel_min_pages
 
-    def parse(self, file_path: Path) -> Dict[str, Any]:
+        self._converter: Optional["DocumentConverter"] = None # Criado no primeiro formato rico
+        self._converter_lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None # Criado no primeiro PDF grande
+        self._pool_lock = threading.Lock()
+
+    @property
+    def converter(self) -> "DocumentConverter":
+        """
+        DocumentConverter do Docling, importado e inicializado no primeiro uso.
+        """
+        with self._converter_lock:
+            if self._converter is None:
+                from docling.document_converter import DocumentConverter
+
+                logger.info("Inicializando o Docling.")
+                self._converter = DocumentConverter()
+            return self._converter
+
+    @property
+    def version(self) -> str:
+        """
+        Versão da saída do Docling (parte da chave do cache de parse).
+        """
+        return f"{PARSER_VERSION}:docling-{metadata.version('docling')}"
+
+    def parse(self, file_path: Path, file_hash: Optional[str] = None) -> Dict[str, Any]:
         """
         Converte um documento em estrutura textual normalizada.
+
+        Args:
+            file_path (Path): Caminho do arquivo
+            file_hash (str): SHA-256 do arquivo, se já calculado (chave do cache)
+        """
+        path = Path(file_path)
+
+        return self._normalize_document(self.iter_pages(path, file_hash), path)
+
+    def iter_pages(self, file_path: Path, file_hash: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Converte o documento e emite as páginas normalizadas uma a uma,
+        sem montar o texto completo nem a lista de páginas (com cache, as
+        páginas vêm dele ou são gravadas nele antes de emitidas).
+        Formatos de texto passam pelo parser leve, sem Docling nem cache.
         """
         path = Path(file_path)
 
+        fast_parser = fast_parser_for(path)
+        if fast_parser is not None:
+            if not path.exists():
+                raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+            logger.info(f"Lendo documento: {path.name}")
+            yield from fast_parser(path)
+        elif self.cache is None:
+            yield from self._convert_pages(path)
+        else:
+            yield from self._cached_pages(path, file_hash)
+
+    def close(self):
+        """
+        Encerra o pool de conversão paralela, se foi criado.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _cached_pages(self, path: Path, file_hash: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Páginas normalizadas do cache; numa falta, converte e grava.
+        """
         if not path.exists():
-            raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
+            raise FileNotFoundError(f"Arquivo não encontrado: {path}")
 
-        logger.info(f"Convertendo documento: {path.name}")
+        file_hash = file_hash or hash_file(path)
+        cached = self.cache.get(file_hash, self.version)
+        if cached is not None:
+            logger.info(f"{path.name}: páginas do cache de parse.")
+            return cached["pages"]
 
+        pages = list(self._convert_pages(path))
         try:
-            result = self.converter.convert(path)
+            self.cache.put(file_hash, self.version, pages)
+        except OSError: # Cache cheio/indisponível não impede a ingestão
+            logger.warning(f"Falha ao gravar {path.name} no cache de parse", exc_info=True)
+        return pages
 
-            # O document vem dentro do result
-            document = result.document
+    def _convert_pages(self, path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Páginas normalizadas do documento: em paralelo por intervalos de
+        páginas quando o PDF é grande o bastante, senão num único convert.
+        """
+        ranges = self._page_ranges(path)
+        if ranges:
+            return self._convert_parallel(path, ranges)
+        return self._iter_pages(self._convert(path))
+
+    def _page_ranges(self, path: Path) -> List[Tuple[int, int]]:
+        """
+        Intervalos (primeira, última) de páginas, 1-based e inclusivos, para a
+        conversão paralela; lista vazia se o documento não se qualifica.
+        Duas fatias por processo equilibram páginas mais lentas (tabelas, OCR).
+        """
+        if self.parallel_workers <= 1 or path.suffix.lower() != ".pdf":
+            return []
 
-            return self._normalize_document(document, path)
+        num_pages = count_pdf_pages(path)
+        if num_pages is None or num_pages < self.parallel_min_pages:
+            return []
+
+        size = math.ceil(num_pages / (2 * self.parallel_workers))
+        return [(first, min(first + size - 1, num_pages)) for first in range(1, num_pages + 1, size)]
+
+    def _convert_parallel(self, path: Path, ranges: List[Tuple[int, int]]) -> Iterator[Dict[str, Any]]:
+        """
+        Converte os intervalos no pool e emite as páginas na ordem do
+        documento, à medida que cada intervalo (em ordem) fica pronto.
+        """
+        logger.info(
+            f"Convertendo documento: {path.name} ({ranges[-1][1]} páginas em "
+            f"{len(ranges)} intervalos, {self.parallel_workers} processos)"
+        )
+        start = time.perf_counter()
+
+        pool = self._range_pool()
+        futures = [pool.submit(_convert_range, str(path), first, last) for first, last in ranges]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+        logger.info(f"{path.name} convertido em {time.perf_counter() - start:.1f}s.")
+
+    def _range_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: o processo pai pode ter threads (API, torch)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.parallel_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_range_worker
+                )
+            return self._pool
+
+    def _convert(self, path: Path, page_range: Optional[Tuple[int, int]] = None):
+        if not path.exists():
+            raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+
+        if page_range is None:
+            logger.info(f"Convertendo documento: {path.name}")
+
+        try:
+            if page_range is None:
+                result = self.converter.convert(path)
+            else:
+                result = self.converter.convert(path, page_range=page_range)
+
+            # O document vem dentro do result
+            return result.document
 
         except Exception as e:
             logger.exception(f"Erro ao converter o documento {path.name}")
             raise e
 
-    def _normalize_document(self, document, path: Path) -> Dict[str, Any]:
+    def _iter_pages(self, document) -> Iterator[Dict[str, Any]]:
         """
-        Normaliza a saída do Docling em um formato
-        consistente e fácil de consumir por IA.
+        Emite as páginas do Docling no formato normalizado.
+
+        document.pages mapeia page_no -> PageItem (sem texto); o texto de cada
+        página vem do export em markdown filtrado por page_no. Na conversão de
+        um intervalo, page_no já é o número no documento inteiro. Formatos sem
+        paginação (ex.: DOCX) viram uma única página.
         """
 
-        pages = []
+        if not document.pages:
+            yield {"page_number": 1, "text": document.export_to_markdown().strip()}
+            return
 
-        # A API atual do Docling expõe pages dessa forma
-        for idx, page in enumerate(document.pages):
-            text = page.text if hasattr(page, "text") else ""
+        for page_no in sorted(document.pages):
+            text = document.export_to_markdown(page_no=page_no)
 
-            pages.append({
-                "page_number": idx + 1,
+            yield {
+                "page_number": page_no,
                 "text": text.strip() if text else "",
-            })
+            }
 
-        full_text = "\n".join(p["text"] for p in pages if p["text"])
+    def _normalize_document(self, pages: Iterable[Dict[str, Any]], path: Path) -> Dict[str, Any]:
+        """
+        Normaliza as páginas em um formato
+        consistente e fácil de consumir por IA.
+        """
+
+        pages = list(pages)
 
         return {
             "file_name": path.name,
             "file_type": path.suffix.lower(),
-            "num_pages": len(pages),
-            "text": full_text,
-            "pages": pages,
-        }
\ No newline at end of file
+            **normalized_output(pages),
+        }
+
+
+# ==========================
+# RANGE WORKER PROCESS
+# ==========================
+
+_range_parser: Optional[DocumentParser] = None
+
+
+def _init_range_worker():
+    """
+    Carrega o DocumentConverter uma única vez por processo do pool.
+    """
+    global _range_parser
+    _range_parser = DocumentParser()
+    _range_parser.converter # O converter é lazy: carrega já, não na primeira tarefa
+
+
+def _convert_range(path: str, first: int, last: int) -> List[Dict[str, Any]]:
+    """
+    Converte as páginas first..last (inclusivo) e as devolve normalizadas,
+    numeradas como no documento inteiro.
+    """
+    document = _range_parser._convert(Path(path), page_range=(first, last))
+    return list(_range_parser._iter_pages(document))
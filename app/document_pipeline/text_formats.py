@@ -0,0 +1,206 @@
+# Parsers leves para formatos que já são texto (txt, md, csv, html, json):
+# - Não passam pelo Docling (análise de layout com modelos, imports pesados)
+# - Leem o arquivo em streaming e emitem páginas no mesmo formato normalizado
+#   do DocumentParser ({"page_number", "text"})
+# - Esses formatos não têm páginas: o texto é agrupado em blocos de até
+#   TEXT_PAGE_CHARS caracteres, cortados entre linhas (ou em \f, quebra de
+#   página explícita em .txt). A memória fica limitada a um bloco
+#
+# Registro por extensão em FAST_PARSERS; o DocumentParser consulta
+# fast_parser_for antes de recorrer ao Docling.
+
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import csv
+import json
+
+TEXT_PAGE_CHARS = 20000
+TEXT_READ_SIZE = 1024 * 1024 # Bytes por leitura no HTML
+
+PageParser = Callable[[Path], Iterator[Dict[str, Any]]]
+
+
+def paginate(lines: Iterable[str], page_chars: int = TEXT_PAGE_CHARS) -> Iterator[Dict[str, Any]]:
+    """
+    Agrupa linhas em páginas normalizadas de até page_chars caracteres
+    (uma linha maior que isso vira uma página sozinha). "\\f" numa linha
+    força a quebra de página.
+    """
+    buffer: List[str] = []
+    size = 0
+    page_number = 1
+
+    for line in lines:
+        parts = line.split("\f")
+        for i, part in enumerate(parts):
+            if i > 0 or (buffer and size + len(part) > page_chars):
+                text = "".join(buffer).strip()
+                if text:
+                    yield {"page_number": page_number, "text": text}
+                    page_number += 1
+                buffer, size = [], 0
+
+            buffer.append(part)
+            size += len(part)
+
+    text = "".join(buffer).strip()
+    if text:
+        yield {"page_number": page_number, "text": text}
+
+
+# ==========================
+# PARSERS
+# ==========================
+
+def parse_text(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    .txt / .md: o próprio texto (Markdown é mantido como está; é legível
+    para o modelo de embeddings e para o LLM).
+    """
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        yield from paginate(f)
+
+
+def parse_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    .csv: uma linha de texto por registro, "coluna: valor; ...", para que
+    cada chunk carregue os nomes das colunas.
+    """
+    with open(path, encoding="utf-8-sig", errors="replace", newline="") as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+
+        reader = csv.reader(f, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [name.strip() for name in header]
+
+        def rows() -> Iterator[str]:
+            for row in reader:
+                fields = [
+                    f"{header[i] if i < len(header) and header[i] else f'coluna {i + 1}'}: {value.strip()}"
+                    for i, value in enumerate(row)
+                    if value.strip()
+                ]
+                if fields:
+                    yield "; ".join(fields) + "\n"
+
+        yield from paginate(rows())
+
+
+def parse_json(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    .json: uma linha "caminho.da.chave: valor" por valor escalar. O
+    arquivo é carregado inteiro (o módulo json não lê em streaming); as
+    linhas são geradas sob demanda.
+    """
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        data = json.load(f)
+
+    def lines(value: Any, prefix: str) -> Iterator[str]:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                yield from lines(item, f"{prefix}.{key}" if prefix else str(key))
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                yield from lines(item, f"{prefix}[{i}]")
+        elif value is not None and value != "":
+            yield f"{prefix}: {value}\n" if prefix else f"{value}\n"
+
+    yield from paginate(lines(data, ""))
+
+
+class _HTMLText(HTMLParser):
+    """
+    Extrai o texto visível do HTML, com quebras de linha nos elementos
+    de bloco. O texto extraído fica em self.lines até ser consumido.
+
+    head não é ignorado como um todo (o HTML5 permite omitir </head>; o
+    documento inteiro seria descartado): dele só sai o <title>, já que
+    scripts e estilos são pulados pelas próprias tags.
+    """
+
+    SKIP = {"script", "style", "noscript", "template", "svg"}
+    BLOCK = {
+        "p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+        "section", "article", "header", "footer", "blockquote", "pre", "table", "ul", "ol", "title",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines: List[str] = []
+        self._current: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag: str, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCK:
+            self._newline()
+        elif tag in ("td", "th"):
+            self._current.append(" | ")
+
+    def handle_endtag(self, tag: str):
+        if tag in self.SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self.BLOCK:
+            self._newline()
+
+    def handle_data(self, data: str):
+        if not self._skipping:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._newline()
+
+    def _newline(self):
+        line = " ".join("".join(self._current).split())
+        if line:
+            self.lines.append(line + "\n")
+        self._current = []
+
+
+def parse_html(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    .html / .htm: texto visível (sem scripts/estilos), lido em blocos.
+    """
+    extractor = _HTMLText()
+
+    def lines() -> Iterator[str]:
+        with open(path, encoding="utf-8-sig", errors="replace") as f:
+            while block := f.read(TEXT_READ_SIZE):
+                extractor.feed(block)
+                yield from extractor.lines
+                extractor.lines.clear()
+        extractor.close()
+        yield from extractor.lines
+
+    yield from paginate(lines())
+
+
+# ==========================
+# REGISTRY
+# ==========================
+
+FAST_PARSERS: Dict[str, PageParser] = {
+    ".txt": parse_text,
+    ".md": parse_text,
+    ".csv": parse_csv,
+    ".html": parse_html,
+    ".htm": parse_html,
+    ".json": parse_json,
+}
+
+
+def fast_parser_for(path: Path) -> Optional[PageParser]:
+    """
+    Parser leve da extensão do arquivo, ou None (formato rico: Docling).
+    """
+    return FAST_PARSERS.get(Path(path).suffix.lower())
@@ -1,9 +1,28 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routes import documents, agents, health
+from app.api.routes import documents, agents, health, collections
 from app.core.config import get_settings
 from app.core.logging import setup_logging
+from app.core.registry import ResourceRegistry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Carrega os recursos pesados (modelos, clientes, vector store)
+    uma única vez por worker e os libera no shutdown.
+    """
+    registry = ResourceRegistry(get_settings())
+    registry.startup()
+    app.state.registry = registry
+
+    yield
+
+    await registry.ashutdown()
+
 
 def create_app() -> FastAPI:
     """
@@ -18,6 +37,7 @@ def create_app() -> FastAPI:
         title=settings.APP_NAME,
         description="AI-powered document intelligence platform",
         version="0.1.0",
+        lifespan=lifespan,
     )
 
     # =========================
@@ -37,6 +57,7 @@ def create_app() -> FastAPI:
     app.include_router(health.router)
     app.include_router(documents.router)
     app.include_router(agents.router)
+    app.include_router(collections.router)
 
     return app
 
@@ -0,0 +1,185 @@
+# Cache semântico de respostas dos agentes:
+# - Compara o embedding da pergunta com os das perguntas já respondidas;
+#   similaridade cosseno >= threshold reaproveita a resposta (sem busca e
+#   sem chamada ao LLM)
+# - Cada entrada é ligada à versão do corpus (VectorStore.version): após
+#   upload ou remoção de documentos, as respostas antigas deixam de valer
+# - Despejo por TTL e LRU (max_entries). A consulta só ignora as entradas
+#   vencidas do namespace (sem varrer o cache); a remoção acontece no put
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import itertools
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedAnswer:
+    """
+    Resposta armazenada no cache (com as fontes usadas para gerá-la).
+    """
+    answer: str
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    question: Optional[str] = None
+    similarity: float = 1.0
+
+
+@dataclass
+class _Entry:
+    namespace: Tuple
+    embedding: np.ndarray
+    value: CachedAnswer
+    expires_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Cache pergunta -> resposta por similaridade de embeddings.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 2000,
+        ttl_seconds: float = 3600.0
+    ):
+        """
+        Args:
+            threshold (float): Similaridade cosseno mínima para reaproveitar
+            max_entries (int): Entradas mantidas (LRU)
+            ttl_seconds (float): Validade de cada resposta
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._matrices: Dict[Tuple, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {} # namespace -> (ids, embeddings, validades)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def get(
+        self,
+        namespace: Tuple,
+        embedding: Sequence[float]
+    ) -> Optional[CachedAnswer]:
+        """
+        Retorna a resposta da pergunta mais parecida no namespace, se a
+        similaridade atingir o threshold.
+
+        Args:
+            namespace (Tuple): Agente, parâmetros da busca e versão do corpus
+            embedding (Sequence[float]): Embedding da pergunta
+        """
+        query = self._normalize(embedding)
+
+        with self._lock:
+            ids, matrix, expires_at = self._matrix(namespace)
+
+            if len(ids):
+                scores = matrix @ query
+                scores[expires_at <= time.monotonic()] = -np.inf # Vencidas: removidas no próximo put
+                best = int(np.argmax(scores))
+
+                if scores[best] >= self.threshold:
+                    entry_id = int(ids[best])
+                    self._entries.move_to_end(entry_id)
+                    self._hits += 1
+                    value = self._entries[entry_id].value
+                    return CachedAnswer(
+                        answer=value.answer,
+                        sources=value.sources,
+                        question=value.question,
+                        similarity=float(scores[best])
+                    )
+
+            self._misses += 1
+            return None
+
+    def put(
+        self,
+        namespace: Tuple,
+        embedding: Sequence[float],
+        value: CachedAnswer
+    ):
+        """
+        Armazena a resposta. Entradas vencidas e as do mesmo agente com
+        outra versão do corpus (nunca mais seriam consultadas) são descartadas.
+        """
+        entry = _Entry(
+            namespace=namespace,
+            embedding=self._normalize(embedding),
+            value=value,
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+
+        with self._lock:
+            now = time.monotonic()
+            stale = [
+                entry_id for entry_id, other in self._entries.items()
+                if other.expires_at <= now
+                or (other.namespace[:-1] == namespace[:-1] and other.namespace != namespace)
+            ]
+            for entry_id in stale:
+                self._remove(entry_id)
+
+            self._entries[next(self._ids)] = entry
+            self._matrices.pop(namespace, None)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+            }
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _matrix(self, namespace: Tuple) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Embeddings e validades das entradas do namespace empilhados
+        (recalculado só após inserções/remoções nele). Chamado com o lock.
+        """
+        cached = self._matrices.get(namespace)
+        if cached is None:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry.namespace == namespace]
+            matrix = (
+                np.stack([self._entries[entry_id].embedding for entry_id in ids])
+                if ids else np.empty((0, 0), dtype=np.float32)
+            )
+            expires_at = np.asarray([self._entries[entry_id].expires_at for entry_id in ids], dtype=np.float64)
+            cached = (np.asarray(ids, dtype=np.int64), matrix, expires_at)
+            self._matrices[namespace] = cached
+        return cached
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._matrices.pop(entry.namespace, None)
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
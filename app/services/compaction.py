@@ -0,0 +1,176 @@
+# Compactação das coleções em background:
+# - Remover ou substituir documentos só marca tombstones (O(1) por linha);
+#   as linhas mortas continuam ocupando memória/disco e o tempo da busca
+# - Uma thread verifica as coleções carregadas a cada COMPACTION_INTERVAL
+#   (ou logo após uma remoção) e compacta as que passaram de
+#   COMPACTION_DEAD_RATIO, ver CollectionManager.compact
+# - A compactação também pode ser pedida pela API (POST /documents/compact)
+# - Depois de uma falha, a verificação automática da coleção espera um
+#   intervalo que dobra a cada nova falha (até MAX_BACKOFF); pedidos
+#   explícitos não esperam
+
+from typing import Any, Dict, Optional, Set, Tuple
+import logging
+import threading
+import time
+
+from app.vectorstore.collections import CollectionManager, CollectionNotFoundError
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF = 3600.0 # Segundos máximos de espera após falhas seguidas
+
+
+class CompactionService:
+    """
+    Compactador de coleções, numa thread própria (um por processo).
+    """
+
+    def __init__(
+        self,
+        collections: CollectionManager,
+        dead_ratio: float = 0.3,
+        min_deleted_rows: int = 1000,
+        interval: float = 60.0
+    ):
+        """
+        Args:
+            collections (CollectionManager): Coleções verificadas
+            dead_ratio (float): Fração de tombstones a partir da qual compacta
+            min_deleted_rows (int): Mínimo de tombstones para compactar
+                automaticamente (pedidos explícitos ignoram os limites)
+            interval (float): Segundos entre verificações
+        """
+        self.collections = collections
+        self.dead_ratio = dead_ratio
+        self.min_deleted_rows = min_deleted_rows
+        self.interval = interval
+
+        self._requested: Set[str] = set() # Pedidos explícitos pendentes
+        self._running: Optional[str] = None
+        self._last: Dict[str, Dict[str, Any]] = {} # Última compactação de cada coleção
+        self._failures: Dict[str, Tuple[int, float]] = {} # Coleção -> (falhas seguidas, próxima tentativa)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="vector-compaction",
+            daemon=True
+        )
+        self._thread.start()
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def request(self, name: str):
+        """
+        Agenda a compactação da coleção, independente dos limites.
+
+        Raises:
+            CollectionNotFoundError: Coleção inexistente
+        """
+        self.collections.get(name)
+        with self._lock:
+            self._requested.add(name)
+        self._wakeup.set()
+
+    def notify(self):
+        """
+        Antecipa a próxima verificação (ex.: logo após remover documentos).
+        """
+        self._wakeup.set()
+
+    def status(self, name: str) -> Dict[str, Any]:
+        """
+        Estado da compactação da coleção: "running", "scheduled" ou "idle",
+        tombstones atuais e o resultado da última execução.
+
+        Raises:
+            CollectionNotFoundError: Coleção inexistente
+        """
+        stats = self.collections.stats(name)
+
+        with self._lock:
+            if self._running == name:
+                state = "running"
+            elif name in self._requested:
+                state = "scheduled"
+            else:
+                state = "idle"
+            last = self._last.get(name)
+
+        return {
+            "collection": name,
+            "state": state,
+            "rows": stats["rows"],
+            "deleted_rows": stats["deleted_rows"],
+            "dead_ratio": stats["dead_ratio"],
+            "last_run": last,
+        }
+
+    def shutdown(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+            with self._lock:
+                requested = set(self._requested)
+
+            for name in sorted(requested | set(self.collections.loaded())):
+                if self._stopped:
+                    return
+                if name in requested or self._should_compact(name):
+                    self._compact(name)
+
+    def _should_compact(self, name: str) -> bool:
+        with self._lock:
+            _, retry_at = self._failures.get(name, (0, 0.0))
+        if time.time() < retry_at:
+            return False
+
+        try:
+            store = self.collections.get(name)
+        except CollectionNotFoundError:
+            return False
+        return store.deleted_count >= self.min_deleted_rows and store.dead_ratio >= self.dead_ratio
+
+    def _compact(self, name: str):
+        with self._lock:
+            self._requested.discard(name)
+            self._running = name
+
+        failed = False
+        try:
+            result = self.collections.compact(name)
+            result["finished_at"] = time.time()
+        except Exception as e:
+            logger.exception(f"Falha ao compactar a coleção {name}")
+            result = {"error": str(e), "finished_at": time.time()}
+            failed = True
+        finally:
+            with self._lock:
+                self._running = None
+
+        with self._lock:
+            self._last[name] = result
+            if not failed:
+                self._failures.pop(name, None)
+                return
+
+            failures = self._failures.get(name, (0, 0.0))[0] + 1
+            delay = min(self.interval * 2 ** failures, MAX_BACKOFF)
+            self._failures[name] = (failures, time.time() + delay)
+
+        logger.warning(f"Compactação automática de {name} suspensa por {delay:.0f} s ({failures} falhas seguidas).")
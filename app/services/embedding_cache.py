@@ -0,0 +1,225 @@
+# Cache de embeddings em dois níveis:
+# - LRU em memória (limitado em número de entradas), por processo
+# - SQLite em disco (opcional), compartilhado entre processos e reinícios
+#
+# A chave é o SHA-256 de (modelo, texto normalizado): o mesmo texto vetorizado
+# por modelos diferentes nunca colide. Usado pelo EmbeddingsGenerator
+# (chunks repetidos: cabeçalhos, rodapés, avisos legais; e perguntas
+# repetidas dos agentes, vetorizadas pelo mesmo modelo).
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+import hashlib
+import logging
+import sqlite3
+import threading
+
+import numpy as np
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key BLOB PRIMARY KEY,
+    vector BLOB NOT NULL
+)
+"""
+
+
+def normalize_text(text: str) -> str:
+    """
+    Colapsa espaços em branco: diferenças só de formatação reaproveitam o cache.
+    """
+    return " ".join(text.split())
+
+
+def build_embedding_cache(settings: Settings, model_name: str) -> Optional["EmbeddingCache"]:
+    """
+    Cria o cache do modelo a partir de Settings (None se EMBEDDING_CACHE_SIZE = 0
+    e sem EMBEDDING_CACHE_PATH). Todos os modelos compartilham o mesmo arquivo.
+    """
+    if settings.EMBEDDING_CACHE_SIZE <= 0 and not settings.EMBEDDING_CACHE_PATH:
+        return None
+
+    return EmbeddingCache(
+        model_name=model_name,
+        max_entries=settings.EMBEDDING_CACHE_SIZE,
+        path=settings.EMBEDDING_CACHE_PATH or None
+    )
+
+
+class EmbeddingCache:
+    """
+    Cache (modelo, texto) -> vetor float32 com LRU em memória e tier SQLite.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 50000,
+        path: Optional[Union[str, Path]] = None
+    ):
+        """
+        Args:
+            model_name (str): Modelo que gera os vetores (faz parte da chave)
+            max_entries (int): Entradas mantidas no LRU em memória
+            path (str | Path): Arquivo SQLite do tier em disco; None = só memória
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+            with self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(_SCHEMA)
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def get_or_compute(
+        self,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Sequence[Sequence[float]]]
+    ) -> List[np.ndarray]:
+        """
+        Retorna os vetores de texts, chamando compute apenas para os textos
+        ausentes nos dois níveis (cada texto distinto uma única vez).
+
+        Args:
+            texts (Sequence[str]): Textos a vetorizar
+            compute (Callable): Recebe os textos faltantes e devolve seus vetores
+
+        Returns:
+            List[np.ndarray]: Um vetor float32 por texto, na ordem recebida
+        """
+        keys, found, missing = self._split(texts)
+
+        if missing:
+            self._fill(found, missing, compute(list(missing.values())))
+
+        return [found[key] for key in keys]
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Contadores de acerto por nível e hit rate (desde o início do processo).
+        """
+        with self._lock:
+            hits = self._hits_memory + self._hits_disk
+            lookups = hits + self._misses
+            return {
+                "model": self.model_name,
+                "entries_memory": len(self._memory),
+                "hits_memory": self._hits_memory,
+                "hits_disk": self._hits_disk,
+                "misses": self._misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _key(self, text: str) -> bytes:
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).digest()
+
+    def _split(self, texts: Sequence[str]):
+        """
+        Retorna (chaves, vetores encontrados, textos faltantes por chave).
+        """
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        return keys, found, missing
+
+    def _fill(self, found: Dict[bytes, np.ndarray], missing: Dict[bytes, str], vectors):
+        computed = dict(zip(missing.keys(), np.asarray(vectors, dtype=np.float32)))
+        self._store(computed)
+        found.update(computed)
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found: Dict[bytes, np.ndarray] = {}
+        pending = []
+
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self._hits_memory += 1
+                elif key not in found:
+                    pending.append(key)
+
+        pending = list(dict.fromkeys(pending))
+        if pending and self._conn is not None:
+            disk = self._read_disk(pending)
+            with self._lock:
+                for key, vector in disk.items():
+                    found[key] = vector
+                    self._remember(key, vector)
+                self._hits_disk += len(disk)
+
+        with self._lock:
+            self._misses += sum(1 for key in pending if key not in found)
+
+        return found
+
+    def _read_disk(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        result = {}
+        for start in range(0, len(keys), 500): # Limite de parâmetros do SQLite
+            batch = keys[start:start + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+            for key, blob in rows:
+                result[key] = np.frombuffer(blob, dtype=np.float32)
+        return result
+
+    def _store(self, vectors: Dict[bytes, np.ndarray]):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, vector.tobytes()) for key, vector in vectors.items()]
+                    )
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        """
+        Insere no LRU, descartando as entradas menos usadas. Chamado com o lock.
+        """
+        vector.flags.writeable = False # Compartilhado entre chamadas
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
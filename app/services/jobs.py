@@ -0,0 +1,594 @@
+# Subsistema de jobs de ingestão:
+# - O upload apenas grava o arquivo e enfileira um job (resposta imediata)
+# - Um ProcessPoolExecutor limitado faz o trabalho pesado (Docling + embeddings)
+#   fora do event loop e fora do GIL do processo da API
+# - Os workers enviam progresso e micro-batches vetorizados por uma fila;
+#   uma thread do processo principal grava os batches no VectorStore compartilhado
+# - Backpressure: com a fila cheia, novos jobs são recusados (QueueFullError)
+# - Jobs em massa (vários arquivos) rodam o BulkIngestor numa thread dedicada,
+#   gravando pelo mesmo consumidor de eventos (um único escritor no store);
+#   o pool de parse é criado no primeiro job em massa e reaproveitado
+# - Dedup: um upload com hash já conhecido nem entra na fila; o worker recebe
+#   os hashes dos chunks já gravados do documento e só vetoriza os novos.
+#   Esse snapshot só economiza embeddings: quem decide é a gravação, que
+#   confere o store de novo sob o lock de escrita (jobs concorrentes do
+#   mesmo documento não duplicam chunks)
+# - Cada job grava numa coleção (ver app/vectorstore/collections.py)
+
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, asdict
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from app.core.config import Settings
+from app.document_pipeline.bulk import BulkIngestor, parse_pool
+from app.document_pipeline.chunker import chunker_options
+from app.document_pipeline.parser import parser_options
+from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.vectorstore.collections import DEFAULT_COLLECTION, CollectionManager
+from app.vectorstore.store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class IngestionJob:
+    """
+    Estado de um job de ingestão, exposto pela API.
+    """
+    job_id: str
+    filename: str
+    collection: str = DEFAULT_COLLECTION
+    status: JobStatus = JobStatus.QUEUED
+    pages_parsed: int = 0
+    chunks_embedded: int = 0
+    files_processed: int = 0
+    files_failed: int = 0
+    files_skipped: int = 0 # Arquivos com conteúdo idêntico a um já ingerido
+    chunks_reused: int = 0 # Chunks com hash já presente no store (não vetorizados)
+    chunks_tombstoned: int = 0 # Chunks da versão anterior removidos da busca
+    duplicate_of: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["status"] = self.status.value
+        return data
+
+
+class QueueFullError(Exception):
+    """
+    Levantada quando a fila de ingestão atingiu o limite configurado.
+    """
+
+
+# ==========================
+# WORKER PROCESS
+# ==========================
+
+_worker_pipeline = None # IngestionPipeline carregado uma vez por processo worker
+
+
+class _QueueSink:
+    """
+    Substitui o VectorStore dentro do worker: cada batch (e o commit final
+    do documento) vai para a fila de eventos e é gravado pelo processo principal.
+
+    As consultas de dedup usam o store real quando o sink roda no processo
+    principal (jobs em massa) ou o snapshot known_chunks enviado com o job.
+    O store é obtido a cada consulta (store_for): uma compactação pode
+    trocá-lo durante o job.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        events,
+        store_for: Optional[Callable[[], VectorStore]] = None,
+        known_chunks: Optional[Dict[str, int]] = None
+    ):
+        self.job_id = job_id
+        self.events = events
+        self.store_for = store_for
+        self._known_chunks = known_chunks or {}
+
+    def add_documents(self, docs: List[Dict]):
+        self.events.put(("batch", self.job_id, docs))
+
+    def find_file(self, file_hash: str) -> Optional[str]:
+        # Sem store: o hash já foi verificado no upload, antes de enfileirar
+        return self.store_for().find_file(file_hash) if self.store_for is not None else None
+
+    def known_chunks(self, filename: str) -> Dict[str, int]:
+        if self.store_for is not None:
+            return self.store_for().known_chunks(filename)
+        return self._known_chunks
+
+    def commit_document(
+        self,
+        filename: str,
+        file_hash: str,
+        chunk_hashes: Iterable[str],
+        reused: Optional[Dict[str, Dict]] = None
+    ) -> int:
+        chunk_hashes = list(chunk_hashes)
+        self.events.put(("commit", self.job_id, (filename, file_hash, chunk_hashes, reused)))
+        return len(set(self.known_chunks(filename)) - set(chunk_hashes))
+
+
+def _init_worker(
+    model_name: str,
+    parser_options: Dict[str, Any],
+    chunker_options: Dict[str, Any],
+    batch_size: int,
+    cache_size: int,
+    cache_path: str
+):
+    """
+    Inicializa o worker: carrega conversor e modelo de embeddings uma única vez.
+    O tier em disco do cache de embeddings é compartilhado com a API.
+    """
+    global _worker_pipeline
+
+    from app.document_pipeline.parser import DocumentParser
+    from app.document_pipeline.chunker import TextChunker
+    from app.document_pipeline.embeddings import EmbeddingsGenerator
+    from app.document_pipeline.ingestion import IngestionPipeline
+    from app.services.embedding_cache import EmbeddingCache
+
+    cache = None
+    if cache_size > 0 or cache_path:
+        cache = EmbeddingCache(model_name, max_entries=cache_size, path=cache_path or None)
+
+    _worker_pipeline = IngestionPipeline(
+        parser=DocumentParser(**parser_options),
+        chunker=TextChunker(**chunker_options),
+        embedder=EmbeddingsGenerator(model_name=model_name, cache=cache),
+        vector_store=None,
+        batch_size=batch_size
+    )
+
+
+def _run_job(
+    job_id: str,
+    file_path: str,
+    metadata: Dict[str, Any],
+    file_hash: Optional[str],
+    known_chunks: Dict[str, int],
+    events
+):
+    """
+    Executa a ingestão no worker. O último evento do job é sempre
+    "completed" ou "failed", depois de todos os seus batches.
+    """
+    events.put(("running", job_id, None))
+
+    try:
+        _worker_pipeline.vector_store = _QueueSink(job_id, events, known_chunks=known_chunks)
+        stats = _worker_pipeline.ingest(
+            Path(file_path),
+            metadata=metadata,
+            on_progress=lambda s: events.put(("progress", job_id, s)),
+            file_hash=file_hash
+        )
+        events.put(("completed", job_id, stats))
+
+    except Exception as e:
+        logger.exception(f"Falha no job de ingestão {job_id}")
+        events.put(("failed", job_id, str(e)))
+
+    finally:
+        try:
+            os.unlink(file_path)
+        except OSError as e: # Não mascara o erro do job
+            logger.warning(f"Não foi possível remover {file_path}: {e}")
+
+
+# ==========================
+# JOB MANAGER (processo da API)
+# ==========================
+
+class IngestionJobManager:
+    """
+    Gerencia a fila de jobs, o pool de processos e o estado dos jobs.
+    """
+
+    def __init__(
+        self,
+        collections: CollectionManager,
+        settings: Settings,
+        max_workers: int = 2,
+        max_pending: int = 16,
+        history_size: int = 1000
+    ):
+        """
+        Args:
+            collections (CollectionManager): Coleções que recebem os batches
+            settings (Settings): Configurações repassadas aos workers
+            max_workers (int): Processos de ingestão
+            max_pending (int): Jobs na fila/em execução antes de recusar novos
+            history_size (int): Jobs finalizados mantidos para consulta
+        """
+        self.collections = collections
+        self.settings = settings
+        self.max_pending = max_pending
+        self.history_size = history_size
+
+        # spawn: evita herdar threads/locks do processo da API (torch, uvicorn)
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._events = self._manager.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(
+                settings.HF_EMBEDDING_MODEL,
+                parser_options(settings),
+                chunker_options(settings),
+                settings.EMBEDDING_BATCH_SIZE,
+                settings.EMBEDDING_CACHE_SIZE,
+                settings.EMBEDDING_CACHE_PATH,
+            )
+        )
+
+        self._bulk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-ingestion")
+        self._parse_pool: Optional[ProcessPoolExecutor] = None # Criado no primeiro job em massa
+
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._consumer = threading.Thread(
+            target=self._consume_events,
+            name="ingestion-events",
+            daemon=True
+        )
+        self._consumer.start()
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.is_finished)
+
+    def submit(
+        self,
+        file_path: str,
+        filename: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        file_hash: Optional[str] = None,
+        collection: str = DEFAULT_COLLECTION,
+        replace: bool = False
+    ) -> IngestionJob:
+        """
+        Enfileira a ingestão de um arquivo já gravado em disco.
+        O arquivo é removido pelo worker ao final do job.
+
+        Se file_hash já estiver na coleção, nada é enfileirado: o job volta
+        concluído com files_skipped = 1 e o arquivo é removido na hora.
+        Com replace=True (upsert de filename), só é pulado o conteúdo que já
+        é o do próprio filename: idêntico a outro documento, é ingerido.
+
+        Raises:
+            QueueFullError: Se a fila estiver cheia
+            CollectionNotFoundError: Coleção inexistente
+        """
+        store = self.collections.get(collection)
+
+        if file_hash is not None:
+            duplicate_of = store.find_file(file_hash)
+            if duplicate_of is not None and (not replace or duplicate_of == filename):
+                os.unlink(file_path)
+                return self._create_duplicate_job(filename, collection, duplicate_of)
+
+        job = self._create_job(filename, collection)
+
+        future = self._executor.submit(
+            _run_job,
+            job.job_id,
+            file_path,
+            {"filename": filename, **(metadata or {})},
+            file_hash,
+            store.known_chunks(filename),
+            self._events
+        )
+        future.add_done_callback(lambda f, job_id=job.job_id: self._on_done(job_id, f))
+
+        logger.info(f"Job de ingestão {job.job_id} enfileirado ({filename}).")
+        return job
+
+    def submit_bulk(
+        self,
+        directory: str,
+        label: str,
+        embedder: EmbeddingsGenerator,
+        metadata: Optional[Dict[str, Any]] = None,
+        collection: str = DEFAULT_COLLECTION
+    ) -> IngestionJob:
+        """
+        Enfileira a ingestão em massa de um diretório (removido ao final).
+
+        Raises:
+            QueueFullError: Se a fila estiver cheia
+            CollectionNotFoundError: Coleção inexistente
+        """
+        self.collections.get(collection)
+        job = self._create_job(label, collection)
+
+        ingestor = BulkIngestor(
+            embedder=embedder,
+            vector_store=_QueueSink(
+                job.job_id,
+                self._events,
+                store_for=lambda: self.collections.get(collection)
+            ),
+            parser_options=parser_options(self.settings),
+            chunker_options=chunker_options(self.settings),
+            parse_workers=self.settings.BULK_PARSE_WORKERS,
+            batch_size=self.settings.EMBEDDING_BATCH_SIZE,
+            pack_size=self.settings.BULK_PACK_SIZE
+        )
+
+        future = self._bulk_executor.submit(
+            self._run_bulk, job.job_id, directory, ingestor, metadata
+        )
+        future.add_done_callback(lambda f, job_id=job.job_id: self._on_done(job_id, f))
+
+        logger.info(f"Job de ingestão em massa {job.job_id} enfileirado ({label}).")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestionJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._bulk_executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown(wait=False, cancel_futures=True)
+                self._parse_pool = None
+        self._events.put(None) # Encerra a thread consumidora
+        self._consumer.join(timeout=5)
+        self._manager.shutdown()
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _create_job(self, filename: str, collection: str) -> IngestionJob:
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.is_finished)
+            if pending >= self.max_pending:
+                raise QueueFullError(
+                    f"Fila de ingestão cheia ({pending}/{self.max_pending} jobs)."
+                )
+
+            job = IngestionJob(job_id=uuid.uuid4().hex, filename=filename, collection=collection)
+            self._jobs[job.job_id] = job
+            self._evict_history()
+
+        return job
+
+    def _create_duplicate_job(self, filename: str, collection: str, duplicate_of: str) -> IngestionJob:
+        now = time.time()
+        job = IngestionJob(
+            job_id=uuid.uuid4().hex,
+            filename=filename,
+            collection=collection,
+            status=JobStatus.COMPLETED,
+            files_skipped=1,
+            duplicate_of=duplicate_of,
+            started_at=now,
+            finished_at=now
+        )
+
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict_history()
+
+        logger.info(f"Upload {filename} ignorado: conteúdo idêntico a {duplicate_of}.")
+        return job
+
+    def _run_bulk(
+        self,
+        job_id: str,
+        directory: str,
+        ingestor: BulkIngestor,
+        metadata: Optional[Dict[str, Any]]
+    ):
+        events = self._events
+        events.put(("running", job_id, None))
+
+        try:
+            ingestor.executor = self._bulk_parse_pool()
+            stats = ingestor.ingest_directory(
+                Path(directory),
+                metadata=metadata,
+                on_progress=lambda s: events.put(("progress", job_id, s))
+            )
+            events.put(("completed", job_id, stats))
+
+        except Exception as e:
+            logger.exception(f"Falha no job de ingestão em massa {job_id}")
+            events.put(("failed", job_id, str(e)))
+            if isinstance(e, BrokenProcessPool): # O próximo job cria um pool novo
+                self._discard_parse_pool(ingestor.executor)
+
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _bulk_parse_pool(self) -> ProcessPoolExecutor:
+        """
+        Pool de parse dos jobs em massa, criado no primeiro uso e mantido
+        entre jobs (os workers já têm o Docling carregado).
+        """
+        with self._lock:
+            if self._parse_pool is None:
+                self._parse_pool = parse_pool(
+                    parser_options(self.settings),
+                    chunker_options(self.settings),
+                    self.settings.BULK_PARSE_WORKERS
+                )
+            return self._parse_pool
+
+    def _discard_parse_pool(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._parse_pool is pool:
+                self._parse_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _consume_events(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+
+            kind, job_id, payload = event
+            if kind in ("batch", "commit") and not self._accepts_writes(job_id):
+                continue # Job já falhou: batches seguintes não são gravados
+
+            try:
+                if kind == "batch":
+                    with self.collections.writer(self._collection_for(job_id)) as store:
+                        store.add_documents(self._new_chunks(store, payload))
+                elif kind == "commit":
+                    with self.collections.writer(self._collection_for(job_id)) as store:
+                        self._check_commit(store, *payload)
+                        store.commit_document(*payload)
+                else:
+                    self._update(job_id, kind, payload)
+            except Exception as e:
+                logger.exception(f"Erro ao processar evento {kind} do job {job_id}")
+                self._update(job_id, "failed", str(e))
+
+    @staticmethod
+    def _new_chunks(store: VectorStore, docs: List[Dict]) -> List[Dict]:
+        """
+        Descarta os chunks cujo (filename, chunk_hash) já está vivo no store:
+        gravados por outro job depois do snapshot enviado ao worker.
+        Chamado sob o lock de escrita da coleção.
+        """
+        known: Dict[str, Set[str]] = {}
+        new = []
+
+        for doc in docs:
+            metadata = doc.get("metadata", {})
+            filename, chunk_hash = metadata.get("filename"), metadata.get("chunk_hash")
+            if filename is not None and chunk_hash is not None:
+                if filename not in known:
+                    known[filename] = set(store.known_chunks(filename))
+                if chunk_hash in known[filename]:
+                    continue
+                known[filename].add(chunk_hash)
+            new.append(doc)
+
+        if len(new) < len(docs):
+            logger.info(f"{len(docs) - len(new)} chunks já gravados por outro job descartados.")
+        return new
+
+    @staticmethod
+    def _check_commit(
+        store: VectorStore,
+        filename: str,
+        file_hash: str,
+        chunk_hashes: List[str],
+        reused: Optional[Dict[str, Dict]] = None
+    ):
+        """
+        Confere, sob o lock de escrita, que todos os chunks da nova versão
+        estão vivos: um chunk reaproveitado do snapshot pode ter sido
+        removido por outro job (ex.: DELETE do documento) durante este.
+
+        Raises:
+            RuntimeError: Chunks ausentes; o documento não é commitado
+        """
+        missing = set(chunk_hashes) - set(store.known_chunks(filename))
+        if missing:
+            raise RuntimeError(
+                f"{len(missing)} chunks de {filename} foram removidos durante a "
+                "ingestão; envie o arquivo novamente."
+            )
+
+    def _accepts_writes(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and not job.is_finished
+
+    def _collection_for(self, job_id: str) -> str:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.collection if job is not None else DEFAULT_COLLECTION
+
+    def _update(self, job_id: str, kind: str, payload):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_finished:
+                return
+
+            if kind == "running":
+                job.status = JobStatus.RUNNING
+                job.started_at = time.time()
+            elif kind in ("progress", "completed"):
+                job.pages_parsed = payload["pages_parsed"]
+                job.chunks_embedded = payload["chunks_embedded"]
+                job.files_processed = payload.get("files_processed", job.files_processed)
+                job.files_failed = payload.get("files_failed", job.files_failed)
+                job.files_skipped = payload.get("files_skipped", job.files_skipped)
+                job.chunks_reused = payload.get("chunks_reused", job.chunks_reused)
+                job.chunks_tombstoned = payload.get("chunks_tombstoned", job.chunks_tombstoned)
+                if kind == "completed":
+                    job.status = JobStatus.COMPLETED
+                    job.finished_at = time.time()
+            elif kind == "failed":
+                job.status = JobStatus.FAILED
+                job.error = payload
+                job.finished_at = time.time()
+
+    def _on_done(self, job_id: str, future: Future):
+        """
+        Cobre falhas fora do _run_job (ex.: worker morto, job cancelado).
+        """
+        if future.cancelled():
+            self._update(job_id, "failed", "Job cancelado.")
+            return
+
+        error = future.exception()
+        if error is not None:
+            self._update(job_id, "failed", str(error))
+
+    def _evict_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
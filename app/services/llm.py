@@ -3,33 +3,34 @@
 # Separação entre: geração de embeddings e geração de texto
 # Preparação para os agentes
 # Fácil de troca para HuggingFace, etc.
+#
+# Caminho assíncrono (agenerate / aembed_texts) para as rotas:
+# - Um único AsyncOpenAI por processo, com pool de conexões HTTP keep-alive
+# - Semáforo limita as chamadas simultâneas ao provider
+# - Timeouts de conexão/leitura e retry com backoff exponencial + jitter
+#   em 429, 5xx e falhas de rede (respeitando Retry-After), com a mesma
+#   política no caminho síncrono (generate / embed_texts)
+# - astream: tokens repassados conforme o provider os emite (SSE nas rotas)
 
-from typing import List, Optional
-import os
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
+import asyncio
 import logging
-from urllib import response
-from openai import OpenAI
-
-logger = logging.getLogger(__name__)
+import os
+import random
+import time
 
-# Fará a abstração clara de LLMs usados na aplicação
-# Suporte inicial a OpenAI
-# Separação entre: geração de embeddings e geração de texto
-# Preparação para os agentes
-# Fácil de troca para HuggingFace, etc.
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
 
-from typing import List, Optional
-import logging
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
-from app.core.config import get_settings
+logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-logger = logging.getLogger(__name__)
 
 class LLMService:
     """
-    Camada de abstração para modelos de linguagem. 
+    Camada de abstração para modelos de linguagem.
 
     Responsabilidades:
     - Gerar embeddings
@@ -41,15 +42,57 @@ class LLMService:
             self,
             api_key: Optional[str] = None,
             embedding_model: str = "text-embedding-3-small",
-            chat_model: str = "gpt-4o-mini"
+            chat_model: str = "gpt-4o-mini",
+            base_url: Optional[str] = None,
+            max_concurrency: int = 64,
+            max_connections: int = 100,
+            timeout: float = 60.0,
+            connect_timeout: float = 5.0,
+            max_retries: int = 4,
+            retry_base_delay: float = 0.5
         ):
+            """
+            Args:
+                base_url (str): Endpoint compatível com a API da OpenAI
+                    (ex.: servidor mock local); None = padrão do SDK
+                max_concurrency (int): Chamadas assíncronas simultâneas ao provider
+                max_connections (int): Tamanho do pool de conexões HTTP
+                timeout (float): Timeout total de cada requisição (segundos)
+                connect_timeout (float): Timeout para abrir a conexão (segundos)
+                max_retries (int): Novas tentativas em 429/5xx/erros de rede
+                retry_base_delay (float): Base do backoff exponencial (segundos)
+            """
             self.api_key = api_key or os.getenv("OPENAI_API_KEY")
             if not self.api_key:
                 raise ValueError("OPENAI_API_KEY não está definido.")
-            
-            self.client = OpenAI(api_key=self.api_key) # Inicializa o cliente OpenAI
+
+            http_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+            limits = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+
+            # Retries ficam a cargo de _with_retries / _with_retries_sync (backoff com jitter)
+            self.client = OpenAI(
+                api_key=self.api_key,
+                base_url=base_url,
+                timeout=http_timeout,
+                max_retries=0,
+                http_client=openai.DefaultHttpxClient(limits=limits, timeout=http_timeout)
+            ) # Inicializa o cliente OpenAI
+            self.async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=base_url,
+                timeout=http_timeout,
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(limits=limits, timeout=http_timeout)
+            ) # Cliente assíncrono compartilhado (pool de conexões)
+
             self.embedding_model = embedding_model
             self.chat_model = chat_model
+            self.max_retries = max_retries
+            self.retry_base_delay = retry_base_delay
+            self._semaphore = asyncio.Semaphore(max_concurrency)
 
             logger.info("LLMService inicializado com OpenAI.")
 
@@ -61,25 +104,26 @@ class LLMService:
         """
         Gera embedding para um único texto.
         """
-        response = self.client.embeddings.create(
-            model=self.embedding_model,
-            input=text
-        )
-
-        return response.data[0].embedding
+        return self.embed_texts([text])[0]
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
         Gera embeddings para múltiplos textos.
         """
+        return self._create_embeddings(texts)
 
-        response = self.client.embeddings.create(
-            model=self.embedding_model,
-            input=texts
-        )
+    async def aembed_text(self, text: str) -> List[float]:
+        """
+        Versão assíncrona de embed_text.
+        """
+        return (await self.aembed_texts([text]))[0]
+
+    async def aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Versão assíncrona de embed_texts (cliente pooled, retries).
+        """
+        return await self._acreate_embeddings(texts)
 
-        return [item.embedding for item in response.data]
-    
     # ==========================
     # TEXT GENERATION
     # ==========================
@@ -95,26 +139,181 @@ class LLMService:
         Gera texto a partir de um prompt.
         """
 
-        menssages = []
+        response = self._with_retries_sync(
+            lambda: self.client.chat.completions.create(
+                model = self.chat_model,
+                messages = self._build_messages(prompt, system_prompt),
+                temperature = temperature,
+                max_tokens = max_tokens
+            )
+        )
+
+        return response.choices[0].message.content.strip()
+
+    async def agenerate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        max_tokens: int = 500
+    ) -> str:
+        """
+        Versão assíncrona de generate: não ocupa thread enquanto o provider
+        responde, limitada pelo semáforo e com retries.
+        """
+
+        response = await self._with_retries(
+            lambda: self.async_client.chat.completions.create(
+                model = self.chat_model,
+                messages = self._build_messages(prompt, system_prompt),
+                temperature = temperature,
+                max_tokens = max_tokens
+            )
+        )
+
+        return response.choices[0].message.content.strip()
+
+    async def astream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        max_tokens: int = 500
+    ) -> AsyncIterator[str]:
+        """
+        Gera texto em streaming, emitindo cada trecho assim que chega.
+        O retry cobre apenas a abertura do stream; o slot do semáforo fica
+        ocupado até o último token. Se o consumidor parar antes do fim
+        (cliente desconectado, task cancelada), a resposta HTTP é fechada
+        e a conexão volta ao pool.
+        """
+
+        async with self._semaphore:
+            stream = await self._with_retries(
+                lambda: self.async_client.chat.completions.create(
+                    model = self.chat_model,
+                    messages = self._build_messages(prompt, system_prompt),
+                    temperature = temperature,
+                    max_tokens = max_tokens,
+                    stream = True
+                ),
+                limit=False
+            )
+
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+
+    async def aclose(self):
+        """
+        Fecha os pools de conexões (chamado no shutdown da aplicação).
+        """
+        self.client.close()
+        await self.async_client.close()
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    @staticmethod
+    def _build_messages(prompt: str, system_prompt: Optional[str] = None) -> List[dict]:
+        messages = []
 
         if system_prompt:
-            menssages.append({
+            messages.append({
                 "role": "system",
                 "content": system_prompt
             })
 
-        menssages.append({
+        messages.append({
             "role": "user",
             "content": prompt
         })
 
-        response = self.client.chat.completions.create(
-            model = self.chat_model,
-            messages = menssages,
-            temperature = temperature,
-            max_tokens = max_tokens
+        return messages
+
+    def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        response = self._with_retries_sync(
+            lambda: self.client.embeddings.create(
+                model=self.embedding_model,
+                input=texts
+            )
         )
 
-        return response.choices[0].message.content.strip()
+        return [item.embedding for item in response.data]
+
+    async def _acreate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        response = await self._with_retries(
+            lambda: self.async_client.embeddings.create(
+                model=self.embedding_model,
+                input=texts
+            )
+        )
+
+        return [item.embedding for item in response.data]
+
+    async def _with_retries(self, call: Callable[[], Awaitable[T]], limit: bool = True) -> T:
+        """
+        Executa call repetindo em erros transitórios. Com limit, cada tentativa
+        ocupa um slot do semáforo (liberado durante a espera do backoff).
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                if not limit:
+                    return await call()
+                async with self._semaphore:
+                    return await call()
+
+            except (openai.APIStatusError, openai.APIConnectionError) as e:
+                if attempt == self.max_retries or not self._is_retryable(e):
+                    raise
+
+                delay = self._retry_delay(e, attempt)
+                logger.warning(
+                    f"Chamada ao LLM falhou ({type(e).__name__}); "
+                    f"nova tentativa {attempt + 1}/{self.max_retries} em {delay:.2f}s."
+                )
+                await asyncio.sleep(delay)
+
+    def _with_retries_sync(self, call: Callable[[], T]) -> T:
+        """
+        Versão síncrona de _with_retries (mesma política, sem semáforo).
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call()
+
+            except (openai.APIStatusError, openai.APIConnectionError) as e:
+                if attempt == self.max_retries or not self._is_retryable(e):
+                    raise
+
+                delay = self._retry_delay(e, attempt)
+                logger.warning(
+                    f"Chamada ao LLM falhou ({type(e).__name__}); "
+                    f"nova tentativa {attempt + 1}/{self.max_retries} em {delay:.2f}s."
+                )
+                time.sleep(delay)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, openai.APIConnectionError): # Inclui APITimeoutError
+            return True
+        return error.status_code == 429 or error.status_code >= 500
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Backoff exponencial com full jitter; Retry-After do provider tem prioridade.
+        """
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+
+        try:
+            if retry_after is not None:
+                return float(retry_after)
+        except ValueError:
+            pass
 
-         
\ No newline at end of file
+        return random.uniform(0, self.retry_base_delay * (2 ** attempt))
@@ -0,0 +1,248 @@
+# Re-ranking dos trechos recuperados com um cross-encoder local (CPU):
+# - O agente busca mais candidatos que o top_k (ex.: 30) e o cross-encoder
+#   pontua cada par (pergunta, trecho) lendo os dois juntos: ordena melhor
+#   que o cosseno dos embeddings, e poucos trechos bons bastam ao LLM
+# - Orçamento de latência por requisição: os pares são pontuados em lotes,
+#   na ordem da busca, enquanto o tempo estimado do próximo lote couber no
+#   orçamento. Sob carga (todas as vagas ocupadas até o prazo) o re-ranking
+#   é pulado e vale a ordem da busca
+# - Scores de (pergunta, trecho) ficam num LRU em memória: perguntas
+#   repetidas (ou reformuladas sobre os mesmos trechos) não refazem o forward
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+import hashlib
+import logging
+import threading
+import time
+
+from app.services.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Reordena resultados de busca com um cross-encoder, dentro de um
+    orçamento de latência.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1",
+        batch_size: int = 16,
+        latency_budget: float = 0.3,
+        max_concurrency: int = 2,
+        cache_size: int = 20000
+    ):
+        """
+        Args:
+            model_name (str): Cross-encoder do HuggingFace (padrão: multilíngue)
+            batch_size (int): Pares por forward do modelo
+            latency_budget (float): Segundos por requisição (espera por uma
+                vaga + inferência)
+            max_concurrency (int): Re-rankings simultâneos (forwards em CPU
+                competem pelos mesmos núcleos)
+            cache_size (int): Scores (pergunta, trecho) mantidos no LRU
+        """
+        from sentence_transformers import CrossEncoder # Só com re-ranking habilitado
+
+        logger.info(f"Carregando cross-encoder: {model_name}")
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.batch_size = batch_size
+        self.latency_budget = latency_budget
+        self.cache_size = cache_size
+
+        self._slots = threading.Semaphore(max_concurrency)
+        self._cache: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seconds_per_pair: Optional[float] = None # Média móvel medida nos forwards
+
+        self._hits = 0
+        self._misses = 0
+        self._skipped = 0 # Requisições sem re-ranking (sem vaga ou sem tempo)
+        self._truncated = 0 # Requisições em que parte dos candidatos ficou sem score
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def rerank(
+        self,
+        query: str,
+        results: List[Dict[str, Any]],
+        top_k: int,
+        budget: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Reordena os resultados da busca pelo cross-encoder e mantém top_k.
+
+        Cada resultado pontuado ganha rerank_score (e score passa a ser ele;
+        o score da busca fica em retrieval_score). Candidatos que ficaram sem
+        score (orçamento esgotado) entram depois dos pontuados, na ordem da
+        busca, com o menor score pontuado.
+
+        Args:
+            query (str): Pergunta
+            results (List[Dict]): Candidatos, na ordem da busca
+            top_k (int): Quantidade de resultados mantidos
+            budget (float): Segundos disponíveis (padrão: latency_budget)
+        """
+        if len(results) <= 1:
+            return results[:top_k]
+
+        deadline = time.perf_counter() + (self.latency_budget if budget is None else budget)
+        keys = [self._key(query, doc.get("text", "")) for doc in results]
+        scores = self._lookup(keys)
+
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        if missing:
+            if not self._slots.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+                return self._skip(results, top_k, scores, keys)
+            try:
+                self._score(query, results, keys, missing, scores, deadline)
+            finally:
+                self._slots.release()
+
+        if not scores:
+            return self._skip(results, top_k, scores, keys)
+
+        if len(scores) < len(set(keys)):
+            with self._lock:
+                self._truncated += 1
+
+        return self._order(results, keys, scores, top_k)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Contadores desde o início do processo.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "skipped": self._skipped,
+                "truncated": self._truncated,
+                "seconds_per_pair": self._seconds_per_pair,
+            }
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _score(
+        self,
+        query: str,
+        results: List[Dict[str, Any]],
+        keys: List[bytes],
+        missing: List[int],
+        scores: Dict[bytes, float],
+        deadline: float
+    ):
+        """
+        Pontua os candidatos sem score em lotes, na ordem da busca, parando
+        quando o próximo lote estimado não couber até o prazo.
+        """
+        pending, seen = [], set() # Um par por trecho distinto
+        for i in missing:
+            if keys[i] not in seen:
+                seen.add(keys[i])
+                pending.append(i)
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+
+            remaining = deadline - time.perf_counter()
+            estimate = (self._seconds_per_pair or 0.0) * len(batch)
+            if remaining <= 0 or estimate > remaining:
+                return
+
+            began = time.perf_counter()
+            batch_scores = self.model.predict(
+                [(query, results[i].get("text", "")) for i in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            elapsed = time.perf_counter() - began
+
+            computed = {keys[i]: float(score) for i, score in zip(batch, batch_scores)}
+            scores.update(computed)
+            self._remember(computed, elapsed / len(batch))
+
+    def _order(
+        self,
+        results: List[Dict[str, Any]],
+        keys: List[bytes],
+        scores: Dict[bytes, float],
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        scored = [(scores[key], i) for i, key in enumerate(keys) if key in scores]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        floor = scored[-1][0]
+
+        reranked = []
+        for score, i in scored:
+            reranked.append({
+                **results[i],
+                "retrieval_score": results[i].get("score"),
+                "rerank_score": score,
+                "score": score,
+            })
+        for i, key in enumerate(keys):
+            if key not in scores:
+                reranked.append({**results[i], "retrieval_score": results[i].get("score"), "score": floor})
+
+        return reranked[:top_k]
+
+    def _skip(
+        self,
+        results: List[Dict[str, Any]],
+        top_k: int,
+        scores: Dict[bytes, float],
+        keys: List[bytes]
+    ) -> List[Dict[str, Any]]:
+        """
+        Sem tempo para o modelo: usa os scores em cache, se houver algum,
+        senão a ordem da busca.
+        """
+        with self._lock:
+            self._skipped += 1
+        if scores:
+            return self._order(results, keys, scores, top_k)
+        return results[:top_k]
+
+    def _key(self, query: str, text: str) -> bytes:
+        payload = f"{normalize_text(query)}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).digest()
+
+    def _lookup(self, keys: Sequence[bytes]) -> Dict[bytes, float]:
+        found: Dict[bytes, float] = {}
+        with self._lock:
+            for key in keys:
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = score
+                    self._hits += 1
+                else:
+                    self._misses += 1
+        return found
+
+    def _remember(self, computed: Dict[bytes, float], seconds_per_pair: float):
+        with self._lock:
+            for key, score in computed.items():
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+            # Média móvel: se adapta à carga da máquina sem oscilar a cada lote
+            if self._seconds_per_pair is None:
+                self._seconds_per_pair = seconds_per_pair
+            else:
+                self._seconds_per_pair = 0.8 * self._seconds_per_pair + 0.2 * seconds_per_pair
@@ -0,0 +1,49 @@
+# Contagem de tokens para montar prompts dentro do orçamento do modelo.
+# Usa tiktoken quando instalado; sem ele, estima ~4 caracteres por token
+# (suficiente para empacotar contexto com folga).
+
+from functools import lru_cache
+from typing import Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def get_token_counter(model: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Retorna uma função texto -> quantidade de tokens para o modelo.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken não instalado: contagem de tokens estimada por caracteres.")
+        return estimate_tokens
+
+    try:
+        encoding = _encoding(tiktoken, model)
+    except Exception: # Ex.: vocabulário não baixado e sem acesso à rede
+        logger.warning(
+            f"Tokenizer de {model or 'o200k_base'} indisponível: contagem de tokens estimada por caracteres.",
+            exc_info=True
+        )
+        return estimate_tokens
+
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _encoding(tiktoken, model: Optional[str]):
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("o200k_base")
+    except KeyError: # Modelo que o tiktoken não conhece
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    return get_token_counter(model)(text)
@@ -0,0 +1,234 @@
+# Catálogo de conteúdo do VectorStore (dedup por hash):
+# - documents: filename -> hash do arquivo inteiro (uploads idênticos são pulados)
+# - chunks: (filename, hash do chunk) -> linha do store (só chunks novos ou
+#   alterados de uma revisão são vetorizados; os que sumiram viram tombstones)
+#
+# - meta: geração do store a que as linhas se referem (a renumeração da
+#   compactação é aplicada uma única vez por geração)
+#
+# SQLite da biblioteca padrão: em memória no backend "memory" e em
+# VECTOR_DB_PATH/catalog.sqlite no backend "disk" (compartilhado entre
+# workers, modo WAL).
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import hashlib
+import sqlite3
+import threading
+
+HASH_READ_SIZE = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    filename TEXT PRIMARY KEY,
+    file_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_file_hash ON documents (file_hash);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    filename TEXT NOT NULL,
+    chunk_hash TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    PRIMARY KEY (filename, chunk_hash)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+"""
+
+
+def hash_file(path: Union[str, Path]) -> str:
+    """
+    SHA-256 do arquivo, lido em blocos.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_READ_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_chunk(text: str) -> str:
+    """
+    SHA-256 do texto do chunk com espaços normalizados: mudanças só de
+    quebra de linha/indentação não geram um novo embedding.
+    """
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+class DocumentCatalog:
+    """
+    Mapeia documentos e chunks (por hash de conteúdo) para linhas do store.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            path (str | Path): Arquivo SQLite; None = catálogo em memória
+        """
+        self._conn = sqlite3.connect(
+            str(path) if path else ":memory:",
+            check_same_thread=False, # Acesso serializado por self._lock
+            timeout=30
+        )
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def find_file(self, file_hash: str) -> Optional[str]:
+        """
+        Retorna o filename já ingerido com esse conteúdo (ou None).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT filename FROM documents WHERE file_hash = ? LIMIT 1",
+                (file_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def chunk_rows(self, filename: str) -> Dict[str, int]:
+        """
+        hash do chunk -> linha do store, para os chunks vivos do documento.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_hash, row_id FROM chunks WHERE filename = ?",
+                (filename,)
+            ).fetchall()
+        return dict(rows)
+
+    def add_chunks(self, entries: Iterable[Tuple[str, str, int]]):
+        """
+        Registra (filename, chunk_hash, row_id) das linhas recém-gravadas.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (filename, chunk_hash, row_id) VALUES (?, ?, ?)",
+                entries
+            )
+
+    def commit_document(
+        self,
+        filename: str,
+        file_hash: str,
+        chunk_hashes: Iterable[str]
+    ) -> List[int]:
+        """
+        Registra a nova versão do documento e remove do catálogo os chunks
+        que não fazem mais parte dela.
+
+        Returns:
+            List[int]: Linhas do store a marcar como tombstone
+        """
+        keep = set(chunk_hashes)
+
+        with self._lock, self._conn:
+            current = self._conn.execute(
+                "SELECT chunk_hash, row_id FROM chunks WHERE filename = ?",
+                (filename,)
+            ).fetchall()
+            stale = [(chunk_hash, row_id) for chunk_hash, row_id in current if chunk_hash not in keep]
+
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE filename = ? AND chunk_hash = ?",
+                [(filename, chunk_hash) for chunk_hash, _ in stale]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (filename, file_hash) VALUES (?, ?)",
+                (filename, file_hash)
+            )
+
+        return [row_id for _, row_id in stale]
+
+    def delete_document(self, filename: str) -> List[int]:
+        """
+        Remove o documento e seus chunks do catálogo.
+
+        Returns:
+            List[int]: Linhas do store a marcar como tombstone
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT row_id FROM chunks WHERE filename = ?",
+                (filename,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM chunks WHERE filename = ?", (filename,))
+            self._conn.execute("DELETE FROM documents WHERE filename = ?", (filename,))
+
+        return [row_id for (row_id,) in rows]
+
+    @property
+    def generation(self) -> int:
+        """
+        Geração do store a que as linhas do catálogo se referem.
+        """
+        with self._lock:
+            return self._generation()
+
+    def set_generation(self, generation: int):
+        """
+        Registra a geração sem renumerar (catálogo já renumerado antes de
+        a geração ser registrada nele).
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE meta SET value = ? WHERE key = 'generation' AND value < ?",
+                (generation, generation)
+            )
+
+    def remap_rows(self, live_rows: Sequence[int], generation: Optional[int] = None) -> bool:
+        """
+        Renumera as linhas após a compactação: live_rows[i] passa a ser a
+        linha i. Chunks em linhas fora de live_rows saem do catálogo.
+
+        Com generation, a renumeração é idempotente: só é aplicada se o
+        catálogo ainda estiver numa geração anterior, e a nova geração é
+        gravada na mesma transação (replay seguro após uma queda).
+
+        Returns:
+            bool: False se o catálogo já estava nessa geração
+        """
+        with self._lock, self._conn:
+            if generation is not None:
+                self._conn.execute("BEGIN IMMEDIATE") # Serializa replays de outros processos
+                if self._generation() >= generation:
+                    return False
+                self._conn.execute(
+                    "UPDATE meta SET value = ? WHERE key = 'generation'", (generation,)
+                )
+
+            self._conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS row_map (old INTEGER PRIMARY KEY, new INTEGER NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM row_map")
+            self._conn.executemany(
+                "INSERT INTO row_map (old, new) VALUES (?, ?)",
+                ((int(old), new) for new, old in enumerate(live_rows))
+            )
+            self._conn.execute("DELETE FROM chunks WHERE row_id NOT IN (SELECT old FROM row_map)")
+            self._conn.execute(
+                "UPDATE chunks SET row_id = (SELECT new FROM row_map WHERE old = chunks.row_id)"
+            )
+            self._conn.execute("DELETE FROM row_map")
+
+        return True
+
+    def copy_to(self, other: "DocumentCatalog"):
+        """
+        Copia todo o conteúdo para outro catálogo (API de backup do SQLite).
+        """
+        with self._lock, other._lock:
+            self._conn.backup(other._conn)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _generation(self) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
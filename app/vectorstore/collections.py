@@ -0,0 +1,396 @@
+# Coleções (namespaces) do vector store, uma por unidade de negócio/tenant:
+# - Cada coleção é um VectorStore independente: matriz/segmentos, índices
+#   (vetorial, BM25, metadata) e catálogo de dedup próprios. Uma busca só
+#   toca a memória da sua coleção
+# - Backend "disk": a coleção padrão fica em VECTOR_DB_PATH (layout já
+#   existente) e as demais em VECTOR_DB_PATH/collections/<nome>. Coleções
+#   são abertas sob demanda e podem ser descarregadas (evict) da memória
+# - Backend "memory": as coleções vivem só enquanto o processo vive
+# - Escritas (ingestão, remoção de documentos) e a compactação de uma coleção
+#   são serializadas por writer(); a compactação troca o store da coleção por
+#   um novo, e buscas em andamento terminam no store antigo
+# - Leitores (reader/writer) são contados por store: um store substituído
+#   (compactação) ou descarregado (evict) só é fechado quando o último
+#   leitor o libera
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import json
+import logging
+import re
+import shutil
+import threading
+import time
+
+from app.core.config import Settings
+from app.vectorstore.factory import build_vector_store
+from app.vectorstore.persistent import MANIFEST_FILE
+from app.vectorstore.store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "default"
+COLLECTIONS_DIR = "collections"
+_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class CollectionNotFoundError(Exception):
+    """
+    Levantada quando a coleção não existe.
+    """
+
+
+class CollectionExistsError(Exception):
+    """
+    Levantada ao criar uma coleção que já existe.
+    """
+
+
+class CollectionManager:
+    """
+    Cria, abre, descarrega e remove coleções do vector store.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        factory: Callable[[Settings, Optional[str]], VectorStore] = build_vector_store
+    ):
+        """
+        Args:
+            settings (Settings): Backend e caminho base (VECTOR_DB_PATH)
+            factory (Callable): Cria o store de uma coleção a partir de
+                (settings, path); path é None no backend em memória
+        """
+        self.settings = settings
+        self.factory = factory
+        self.persistent = settings.VECTOR_STORE_BACKEND.lower() == "disk"
+        self.root = Path(settings.VECTOR_DB_PATH)
+
+        self._stores: Dict[str, VectorStore] = {} # Coleções carregadas
+        self._readers: Dict[int, int] = {} # id(store) -> leitores em andamento
+        self._closing: Dict[int, VectorStore] = {} # Fora da coleção, esperando o último leitor
+        self._writers: Dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+
+        if self.persistent:
+            self.get(DEFAULT_COLLECTION) # Abre (ou cria) o layout existente em VECTOR_DB_PATH
+        else:
+            self.create(DEFAULT_COLLECTION)
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def get(self, name: str) -> VectorStore:
+        """
+        Store da coleção, abrindo-a do disco se ainda não estiver carregada.
+
+        Raises:
+            CollectionNotFoundError: Coleção inexistente
+        """
+        with self._lock:
+            return self._get(name)
+
+    def create(self, name: str) -> VectorStore:
+        """
+        Raises:
+            ValueError: Nome inválido
+            CollectionExistsError: Coleção já existe
+        """
+        self._validate(name)
+
+        with self._lock:
+            if name in self._stores or (self.persistent and self._exists_on_disk(name)):
+                raise CollectionExistsError(f"Coleção já existe: {name}")
+
+            path = None
+            if self.persistent:
+                path = self._path(name)
+                path.mkdir(parents=True, exist_ok=True)
+            store = self._stores[name] = self.factory(self.settings, str(path) if path else None)
+
+        logger.info(f"Coleção {name} criada.")
+        return store
+
+    def drop(self, name: str):
+        """
+        Remove a coleção e seus arquivos. A coleção padrão não pode ser removida.
+
+        Raises:
+            ValueError: Coleção padrão
+            CollectionNotFoundError: Coleção inexistente
+        """
+        if name == DEFAULT_COLLECTION:
+            raise ValueError("A coleção padrão não pode ser removida")
+
+        with self._lock:
+            store = self._stores.pop(name, None)
+            on_disk = self.persistent and self._exists_on_disk(name)
+            if store is None and not on_disk:
+                raise CollectionNotFoundError(f"Coleção não encontrada: {name}")
+
+            self._close_when_idle(store)
+            if on_disk:
+                shutil.rmtree(self._path(name), ignore_errors=True)
+
+        logger.info(f"Coleção {name} removida.")
+
+    def load(self, name: str) -> VectorStore:
+        """
+        Carrega a coleção e aquece os índices (busca vetorial, BM25 e metadata),
+        para que a primeira consulta não pague esse custo.
+        """
+        store = self.get(name)
+        store.warmup()
+        return store
+
+    def evict(self, name: str):
+        """
+        Descarrega a coleção da memória (só no backend "disk": os dados
+        continuam nos arquivos e ela é reaberta na próxima consulta).
+        Buscas e escritas em andamento terminam no store descarregado, que
+        é fechado quando o último leitor o libera.
+
+        Raises:
+            ValueError: Backend em memória
+            CollectionNotFoundError: Coleção inexistente
+        """
+        if not self.persistent:
+            raise ValueError("Coleções em memória não podem ser descarregadas")
+
+        with self._lock:
+            if not self._exists_on_disk(name):
+                raise CollectionNotFoundError(f"Coleção não encontrada: {name}")
+            self._close_when_idle(self._stores.pop(name, None))
+
+        logger.info(f"Coleção {name} descarregada da memória.")
+
+    @contextmanager
+    def reader(self, name: str) -> Iterator[VectorStore]:
+        """
+        Store atual da coleção, que não é fechado enquanto estiver em uso
+        (uma compactação ou um evict só o tiram da coleção). Usado pelas
+        buscas durante todo o request.
+
+        Raises:
+            CollectionNotFoundError: Coleção inexistente
+        """
+        store = self._acquire(name)
+        try:
+            yield store
+        finally:
+            self._release(store)
+
+    @contextmanager
+    def writer(self, name: str) -> Iterator[VectorStore]:
+        """
+        Store atual da coleção com o lock de escrita dela: ingestões,
+        remoções e a compactação da mesma coleção não se intercalam.
+        Buscas não usam esse lock.
+
+        Raises:
+            CollectionNotFoundError: Coleção inexistente
+        """
+        with self._lock:
+            lock = self._writers.setdefault(name, threading.RLock())
+        with lock, self.reader(name) as store:
+            yield store
+
+    def compact(self, name: str) -> Dict[str, Any]:
+        """
+        Remove fisicamente as linhas tombstone da coleção e troca o store
+        pelo compactado (índices já construídos). Escritas na coleção esperam
+        o fim da compactação; buscas seguem no store antigo até a troca.
+
+        Returns:
+            Dict[str, Any]: rows_before, rows_after, removed_rows e seconds
+
+        Raises:
+            CollectionNotFoundError: Coleção inexistente
+        """
+        start = time.perf_counter()
+
+        with self.writer(name) as store:
+            rows_before = len(store)
+
+            if self.persistent:
+                removed = store.compact()
+                if removed == 0:
+                    fresh = store
+                else:
+                    fresh = self.factory(self.settings, str(self._path(name)))
+                    fresh.warmup()
+            elif store.deleted_count == 0:
+                fresh, removed = store, 0
+            else:
+                fresh = self.factory(self.settings, None)
+                removed = store.compact_into(fresh)
+
+            with self._lock:
+                if fresh is not store and self._stores.get(name) is store:
+                    self._stores[name] = fresh
+                    self._close_when_idle(store)
+
+        result = {
+            "rows_before": rows_before,
+            "rows_after": rows_before - removed,
+            "removed_rows": removed,
+            "seconds": time.perf_counter() - start,
+        }
+        logger.info(f"Coleção {name} compactada: {result}")
+        return result
+
+    def loaded(self) -> List[str]:
+        """
+        Coleções carregadas em memória neste processo.
+        """
+        with self._lock:
+            return sorted(self._stores)
+
+    def names(self) -> List[str]:
+        """
+        Coleções existentes (carregadas ou não), em ordem alfabética.
+        """
+        with self._lock:
+            names = set(self._stores)
+            if self.persistent:
+                names.add(DEFAULT_COLLECTION)
+                directory = self.root / COLLECTIONS_DIR
+                if directory.is_dir():
+                    names.update(path.name for path in directory.iterdir() if path.is_dir())
+        return sorted(names)
+
+    def stats(self, name: str) -> Dict[str, Any]:
+        """
+        Estatísticas da coleção. Coleções não carregadas são descritas pelo
+        manifesto, sem abri-las.
+
+        Raises:
+            CollectionNotFoundError: Coleção inexistente
+        """
+        with self._lock:
+            store = self._stores.get(name)
+
+        if store is not None:
+            lexical = store.lexical_index
+            return {
+                "name": name,
+                "loaded": True,
+                "rows": len(store),
+                "deleted_rows": store.deleted_count,
+                "dead_ratio": store.dead_ratio,
+                "dim": store.dim,
+                "memory_bytes": store.memory_bytes + (lexical.nbytes if lexical is not None else 0),
+            }
+
+        if not self.persistent or not self._exists_on_disk(name):
+            raise CollectionNotFoundError(f"Coleção não encontrada: {name}")
+
+        manifest = self._read_manifest(name)
+        rows, deleted = manifest.get("count", 0), manifest.get("tombstones", 0)
+        return {
+            "name": name,
+            "loaded": False,
+            "rows": rows,
+            "deleted_rows": deleted, # Entradas de tombstone (aproximado: podem se repetir)
+            "dead_ratio": min(1.0, deleted / rows) if rows else 0.0,
+            "dim": manifest.get("dim"),
+            "memory_bytes": 0,
+        }
+
+    def close(self):
+        """
+        Fecha todas as coleções carregadas (shutdown).
+        """
+        with self._lock:
+            for store in (*self._stores.values(), *self._closing.values()):
+                self._close(store)
+            self._stores.clear()
+            self._closing.clear()
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _get(self, name: str) -> VectorStore:
+        """
+        Implementação de get. Chamado com self._lock.
+        """
+        store = self._stores.get(name)
+        if store is not None and not store.is_stale:
+            return store
+
+        if store is not None: # Compactado por outro processo: reabre a nova geração
+            self._close_when_idle(store)
+
+        if not self.persistent or not self._exists_on_disk(name):
+            raise CollectionNotFoundError(f"Coleção não encontrada: {name}")
+
+        store = self._stores[name] = self.factory(self.settings, str(self._path(name)))
+        logger.info(f"Coleção {name} carregada ({len(store)} vetores).")
+        return store
+
+    def _acquire(self, name: str) -> VectorStore:
+        with self._lock:
+            store = self._get(name)
+            self._readers[id(store)] = self._readers.get(id(store), 0) + 1
+            return store
+
+    def _release(self, store: VectorStore):
+        """
+        Libera um leitor; o último leitor de um store já fora da coleção o fecha.
+        """
+        key = id(store)
+        with self._lock:
+            remaining = self._readers[key] - 1
+            if remaining:
+                self._readers[key] = remaining
+                return
+            del self._readers[key]
+            store = self._closing.pop(key, None)
+
+        self._close(store)
+
+    def _close_when_idle(self, store: Optional[VectorStore]):
+        """
+        Fecha o store agora ou, se houver leitores, quando o último o
+        liberar. Chamado com self._lock.
+        """
+        if store is None:
+            return
+        if id(store) in self._readers:
+            self._closing[id(store)] = store
+        else:
+            self._close(store)
+
+    def _path(self, name: str) -> Path:
+        if name == DEFAULT_COLLECTION:
+            return self.root
+        return self.root / COLLECTIONS_DIR / name
+
+    def _exists_on_disk(self, name: str) -> bool:
+        if name == DEFAULT_COLLECTION:
+            return True # Criada (vazia) na primeira abertura
+        return _NAME_RE.match(name) is not None and self._path(name).is_dir()
+
+    def _read_manifest(self, name: str) -> Dict[str, Any]:
+        try:
+            return json.loads((self._path(name) / MANIFEST_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def _validate(name: str):
+        if not _NAME_RE.match(name) or name == COLLECTIONS_DIR:
+            raise ValueError(
+                "Nome de coleção inválido: use até 64 caracteres entre "
+                "letras minúsculas, dígitos, '-' e '_'"
+            )
+
+    @staticmethod
+    def _close(store: Optional[VectorStore]):
+        close = getattr(store, "close", None)
+        if close:
+            close()
@@ -0,0 +1,121 @@
+# Escolhe a implementação do VectorStore a partir das configurações.
+# Mantém rotas, agentes e testes desacoplados do backend concreto.
+
+from typing import Optional, Union
+import logging
+
+from app.core.config import Settings, get_settings
+from app.vectorstore.store import VectorStore
+from app.vectorstore.persistent import PersistentVectorStore
+from app.vectorstore.index import FlatIndex, IVFIndex
+from app.vectorstore.filters import MetadataIndex
+from app.vectorstore.lexical import BM25Index
+from app.vectorstore.quantization import ScalarQuantizer, ProductQuantizer
+
+logger = logging.getLogger(__name__)
+
+
+def build_index(settings: Optional[Settings] = None) -> Union[FlatIndex, IVFIndex]:
+    """
+    Cria o índice configurado em Settings.VECTOR_INDEX_TYPE.
+
+    - "flat": busca exata
+    - "ivf": busca aproximada (nprobe ajusta recall x latência); enquanto o
+      store tiver menos de IVF_MIN_TRAIN_SIZE linhas, a busca continua exata
+    """
+    settings = settings or get_settings()
+    index_type = settings.VECTOR_INDEX_TYPE.lower()
+
+    if index_type == "flat":
+        return FlatIndex()
+
+    if index_type == "ivf":
+        return IVFIndex(
+            nlist=settings.IVF_NLIST,
+            nprobe=settings.IVF_NPROBE,
+            min_train_size=settings.IVF_MIN_TRAIN_SIZE
+        )
+
+    raise ValueError(f"VECTOR_INDEX_TYPE inválido: {settings.VECTOR_INDEX_TYPE}")
+
+
+def build_quantizer(
+    settings: Optional[Settings] = None
+) -> Optional[Union[ScalarQuantizer, ProductQuantizer]]:
+    """
+    Cria o quantizador configurado em Settings.VECTOR_QUANTIZATION.
+
+    - "none": busca sobre float32
+    - "sq8": int8 por dimensão (~4x menos memória)
+    - "pq": PQ_SUBVECTORS bytes por vetor (ex.: 48 bytes para dim 384)
+    """
+    settings = settings or get_settings()
+    quantization = settings.VECTOR_QUANTIZATION.lower()
+
+    if quantization == "none":
+        return None
+
+    if quantization == "sq8":
+        return ScalarQuantizer()
+
+    if quantization == "pq":
+        return ProductQuantizer(
+            num_subvectors=settings.PQ_SUBVECTORS,
+            min_train_size=settings.PQ_MIN_TRAIN_SIZE
+        )
+
+    raise ValueError(f"VECTOR_QUANTIZATION inválido: {settings.VECTOR_QUANTIZATION}")
+
+
+def build_lexical_index(settings: Optional[Settings] = None) -> Optional[BM25Index]:
+    """
+    Cria o índice BM25 (None se Settings.LEXICAL_INDEX_ENABLED for falso).
+    """
+    settings = settings or get_settings()
+
+    if not settings.LEXICAL_INDEX_ENABLED:
+        return None
+
+    return BM25Index(k1=settings.BM25_K1, b=settings.BM25_B)
+
+
+def build_metadata_index(settings: Optional[Settings] = None) -> MetadataIndex:
+    """
+    Cria o índice dos campos de Settings.FILTERABLE_FIELDS.
+    """
+    settings = settings or get_settings()
+    return MetadataIndex(fields=settings.FILTERABLE_FIELDS)
+
+
+def build_vector_store(
+    settings: Optional[Settings] = None,
+    path: Optional[str] = None
+) -> VectorStore:
+    """
+    Cria o VectorStore configurado em Settings.VECTOR_STORE_BACKEND.
+
+    - "memory": matriz em RAM (perdida ao reiniciar). Com quantização, só
+      os códigos ficam em RAM: RERANK_FACTOR é ignorado (o re-rank exigiria
+      manter também a matriz float32, anulando a economia)
+    - "disk": segmentos memory-mapped em path (padrão: Settings.VECTOR_DB_PATH);
+      o re-rank lê só as linhas candidatas do disco
+    """
+    settings = settings or get_settings()
+    backend = settings.VECTOR_STORE_BACKEND.lower()
+    options = {
+        "index": build_index(settings),
+        "quantizer": build_quantizer(settings),
+        "rerank_factor": settings.RERANK_FACTOR,
+        "lexical_index": build_lexical_index(settings),
+        "metadata_index": build_metadata_index(settings),
+    }
+
+    if backend == "memory":
+        if options["quantizer"] is not None:
+            options["rerank_factor"] = 0
+        return VectorStore(**options)
+
+    if backend == "disk":
+        return PersistentVectorStore(path or settings.VECTOR_DB_PATH, **options)
+
+    raise ValueError(f"VECTOR_STORE_BACKEND inválido: {settings.VECTOR_STORE_BACKEND}")
@@ -0,0 +1,128 @@
+# Filtros de metadados do VectorStore:
+# - Para cada campo filtrável (ex.: filename, tenant), cada valor aponta para
+#   a lista ordenada dos ids das linhas que o têm (array uint32 compacto)
+# - Um filtro vira uma máscara booleana (n,) montada a partir dessas listas,
+#   sem ler os metadados: a busca vetorial pontua só as linhas da máscara
+#
+# Sintaxe: {"filename": "contrato.pdf"} ou {"tenant": ["rh", "juridico"]};
+# campos diferentes são combinados com E, valores de uma lista com OU.
+
+from array import array
+from typing import Any, Dict, Iterable, Optional, Sequence
+import threading
+
+import numpy as np
+
+Filter = Dict[str, Any]
+
+
+def filter_key(filter: Optional[Filter]) -> tuple:
+    """
+    Forma canônica e hashable de um filtro (ex.: chave de cache).
+    """
+    if not filter:
+        return ()
+    return tuple(sorted(
+        (field, tuple(sorted(map(str, _values(value)))))
+        for field, value in filter.items()
+    ))
+
+
+def _values(value: Any) -> Sequence[Any]:
+    return value if isinstance(value, (list, tuple, set)) else [value]
+
+
+class MetadataIndex:
+    """
+    Índice invertido campo -> valor -> ids (ordenados) das linhas.
+    """
+
+    def __init__(self, fields: Iterable[str] = ("filename",)):
+        """
+        Args:
+            fields (Iterable[str]): Campos de metadata indexados. Filtros em
+                outros campos são rejeitados (exigiriam ler todas as linhas)
+        """
+        self.fields = tuple(fields)
+        self._postings: Dict[str, Dict[str, array]] = {field: {} for field in self.fields}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def add(self, metadatas: Iterable[Dict[str, Any]]):
+        """
+        Indexa os metadados das próximas linhas (ids len(self), len(self) + 1, ...).
+        """
+        with self._lock:
+            for metadata in metadatas:
+                metadata = metadata or {}
+                for field in self.fields:
+                    value = metadata.get(field)
+                    if value is None:
+                        continue
+                    postings = self._postings[field]
+                    ids = postings.get(str(value))
+                    if ids is None:
+                        ids = postings[str(value)] = array("I")
+                    ids.append(self._count)
+                self._count += 1
+
+    def mask(self, filter: Filter, size: int) -> np.ndarray:
+        """
+        Máscara booleana (size,) das linhas que satisfazem o filtro.
+
+        Raises:
+            ValueError: Campo não indexado
+        """
+        self.validate(filter)
+
+        result = np.ones(size, dtype=np.bool_)
+        with self._lock:
+            for field, value in filter.items():
+                field_mask = np.zeros(size, dtype=np.bool_)
+                for item in _values(value):
+                    ids = self._postings[field].get(str(item))
+                    if ids is not None:
+                        rows = np.frombuffer(ids, dtype=np.uint32)
+                        field_mask[rows[rows < size]] = True
+                result &= field_mask
+        return result
+
+    def validate(self, filter: Optional[Filter]):
+        """
+        Raises:
+            ValueError: Filtro com campo não indexado
+        """
+        unknown = [field for field in (filter or {}) if field not in self._postings]
+        if unknown:
+            raise ValueError(
+                f"Campo(s) não filtrável(is): {', '.join(unknown)}. "
+                f"Disponíveis: {', '.join(self.fields)}"
+            )
+
+    def values(self, field: str, live: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """
+        Valores indexados de um campo -> quantidade de linhas.
+
+        Args:
+            live (np.ndarray): Se informada, conta só as linhas vivas da
+                máscara e omite valores sem nenhuma
+        """
+        with self._lock:
+            postings = self._postings.get(field, {})
+            if live is None:
+                return {value: len(ids) for value, ids in postings.items()}
+
+            counts = {}
+            for value, ids in postings.items():
+                rows = np.frombuffer(ids, dtype=np.uint32)
+                count = int(np.count_nonzero(live[rows[rows < len(live)]]))
+                if count:
+                    counts[value] = count
+            return counts
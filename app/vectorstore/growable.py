@@ -0,0 +1,63 @@
+# Array NumPy com crescimento geométrico para inserções incrementais.
+# Usado pela matriz de embeddings do VectorStore e pelos códigos quantizados.
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class GrowableArray:
+    """
+    Buffer contíguo (capacidade, *row_shape) que dobra de tamanho quando enche.
+    Append amortizado O(1) e view sem cópia das linhas ocupadas.
+    """
+
+    def __init__(self, dtype, initial_capacity: int = 1024):
+        self.dtype = np.dtype(dtype)
+        self._initial_capacity = max(1, initial_capacity)
+        self._data: Optional[np.ndarray] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def row_shape(self) -> Optional[Tuple[int, ...]]:
+        return None if self._data is None else self._data.shape[1:]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes ocupados pelas linhas válidas (ignora a folga de capacidade).
+        """
+        return 0 if self._data is None else self._size * self._data[0].nbytes
+
+    def view(self) -> np.ndarray:
+        """
+        View (sem cópia) das linhas ocupadas.
+        """
+        if self._data is None:
+            return np.empty((0,), dtype=self.dtype)
+        return self._data[:self._size]
+
+    def append(self, rows: np.ndarray):
+        rows = np.asarray(rows, dtype=self.dtype)
+        count = len(rows)
+
+        if self._data is None:
+            capacity = max(self._initial_capacity, count)
+            self._data = np.empty((capacity, *rows.shape[1:]), dtype=self.dtype)
+        elif rows.shape[1:] != self._data.shape[1:]:
+            raise ValueError(
+                f"Formato da linha {rows.shape[1:]} difere do buffer {self._data.shape[1:]}"
+            )
+
+        required = self._size + count
+        if required > len(self._data):
+            capacity = max(required, len(self._data) * 2)
+            grown = np.empty((capacity, *self._data.shape[1:]), dtype=self.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+        self._data[self._size:required] = rows
+        self._size = required
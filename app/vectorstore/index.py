@@ -0,0 +1,305 @@
+# Índices de busca do VectorStore:
+# - FlatIndex: busca exata (um GEMM + argpartition), ideal para corpora pequenos
+# - IVFIndex: busca aproximada (k-means esférico como quantizador grosso),
+#   visita apenas as nprobe listas mais próximas da query
+#
+# Os índices guardam apenas ids de linhas; os vetores continuam no store
+# (matriz em RAM, memmap ou códigos quantizados) e são passados na busca.
+
+from array import array
+from typing import List, Optional, Tuple, Union
+import logging
+
+import numpy as np
+
+from app.vectorstore.quantization import ScalarQuantizer, ProductQuantizer
+
+logger = logging.getLogger(__name__)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Índices dos top_k maiores scores por linha, em ordem decrescente.
+    Usa argpartition (O(n)) e ordena apenas os k selecionados.
+    """
+    n = scores.shape[1]
+    k = min(top_k, n)
+
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(n), (scores.shape[0], 1))
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def score_rows(
+    vectors: Union[np.ndarray, ScalarQuantizer, ProductQuantizer],
+    queries: np.ndarray,
+    ids: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Scores (m, n) entre queries e linhas do store, sejam elas float32
+    ou códigos quantizados (ver quantization.py).
+    """
+    if isinstance(vectors, np.ndarray):
+        rows = vectors if ids is None else vectors[ids]
+        return queries @ rows.T
+    return vectors.score(queries, ids)
+
+
+class FlatIndex:
+    """
+    Índice exato: pontua todas as linhas do store.
+    """
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        """
+        Nada a fazer: a busca exata lê a matriz do store diretamente.
+        """
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        vectors: np.ndarray,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            queries (np.ndarray): Queries normalizadas (m, dim)
+            top_k (int): Quantidade de resultados por query
+            vectors: Linhas normalizadas do store (n, dim) ou códigos quantizados
+            mask (np.ndarray): Linhas elegíveis (bool); None = todas. Pode ser
+                menor que vectors (linhas além dela são ignoradas)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: scores e ids (m, k), ordem decrescente.
+            Com mask, posições sem candidato vêm como -1 com score -inf.
+        """
+        if mask is None:
+            similarities = score_rows(vectors, queries) # (m, n) similaridades cosseno
+            ids = top_k_indices(similarities, top_k)
+            return np.take_along_axis(similarities, ids, axis=1), ids
+
+        allowed = np.flatnonzero(mask)
+
+        if len(allowed) < len(mask) // 2:
+            # Máscara seletiva: pontua só as linhas elegíveis
+            similarities = score_rows(vectors, queries, allowed)
+            best = top_k_indices(similarities, top_k)
+            scores = np.take_along_axis(similarities, best, axis=1)
+            ids = allowed[best]
+        else:
+            similarities = score_rows(vectors, queries)[:, :len(mask)]
+            similarities[:, ~mask] = -np.inf
+            ids = top_k_indices(similarities, top_k)
+            scores = np.take_along_axis(similarities, ids, axis=1)
+
+        return scores, np.where(np.isfinite(scores), ids, -1)
+
+
+class IVFIndex:
+    """
+    Inverted File Index em NumPy puro.
+
+    - Treino: k-means esférico sobre uma amostra, quando o store atinge
+      min_train_size linhas. Antes disso a busca é exata (fallback flat).
+    - Inserção incremental: cada nova linha vai para a lista do centróide
+      mais próximo (os centróides não são re-treinados).
+    - Busca: nprobe listas por query; maior nprobe = mais recall, mais latência.
+    """
+
+    def __init__(
+        self,
+        nlist: int = 256,
+        nprobe: int = 8,
+        min_train_size: int = 10000,
+        kmeans_iters: int = 20,
+        max_train_samples: int = 100000,
+        seed: int = 42
+    ):
+        """
+        Args:
+            nlist (int): Quantidade máxima de listas (centróides)
+            nprobe (int): Listas visitadas por query
+            min_train_size (int): Abaixo disso, busca exata
+            kmeans_iters (int): Iterações do k-means
+            max_train_samples (int): Tamanho máximo da amostra de treino
+            seed (int): Semente do gerador aleatório
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iters = kmeans_iters
+        self.max_train_samples = max_train_samples
+        self._rng = np.random.default_rng(seed)
+
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[array] = []
+        self._pending_vectors: List[np.ndarray] = [] # Linhas recebidas antes do treino
+        self._pending_ids: List[np.ndarray] = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        """
+        Insere linhas (normalizadas) no índice.
+
+        Args:
+            vectors (np.ndarray): Novas linhas (n, dim)
+            ids (np.ndarray): Ids das linhas no store (n,)
+        """
+        if len(ids) == 0:
+            return
+
+        self._count += len(ids)
+
+        if self.is_trained:
+            self._assign(vectors, ids)
+            return
+
+        self._pending_vectors.append(np.array(vectors, dtype=np.float32))
+        self._pending_ids.append(np.asarray(ids, dtype=np.int64))
+
+        if self._count >= self.min_train_size:
+            pending = np.concatenate(self._pending_vectors)
+            pending_ids = np.concatenate(self._pending_ids)
+            self._pending_vectors, self._pending_ids = [], []
+
+            self._train(pending)
+            self._assign(pending, pending_ids)
+
+    def train(self, vectors: np.ndarray):
+        """
+        Treina os centróides sobre uma amostra de vectors (ex.: o memmap do
+        store inteiro: só as linhas sorteadas são lidas) e distribui nas
+        listas as linhas já recebidas. Nada a fazer se já treinado.
+        """
+        if self.is_trained:
+            return
+
+        self._train(vectors)
+
+        if self._pending_ids:
+            pending = np.concatenate(self._pending_vectors)
+            pending_ids = np.concatenate(self._pending_ids)
+            self._pending_vectors, self._pending_ids = [], []
+            self._assign(pending, pending_ids)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        vectors: np.ndarray,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mesma interface de FlatIndex.search. Ids ausentes (listas com menos
+        de top_k candidatos) vêm como -1 com score -inf.
+        """
+        if not self.is_trained:
+            return FlatIndex().search(queries, top_k, vectors, mask)
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = top_k_indices(queries @ self.centroids.T, nprobe) # (m, nprobe)
+
+        scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), top_k), -1, dtype=np.int64)
+
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            # tobytes: cópia atômica, sem exportar o buffer da lista (um
+            # append concorrente não pode redimensionar um buffer exportado)
+            candidates = np.concatenate([
+                np.frombuffer(self._lists[l].tobytes(), dtype=np.int64) for l in lists
+            ])
+            if mask is not None:
+                candidates = candidates[candidates < len(mask)]
+                candidates = candidates[mask[candidates]]
+            if len(candidates) == 0:
+                continue
+
+            candidate_scores = score_rows(vectors, query.reshape(1, -1), candidates)[0]
+            best = top_k_indices(candidate_scores.reshape(1, -1), top_k)[0]
+
+            scores[i, :len(best)] = candidate_scores[best]
+            ids[i, :len(best)] = candidates[best]
+
+        return scores, ids
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _train(self, vectors: np.ndarray):
+        """
+        k-means esférico (produto escalar + renormalização dos centróides).
+        Usa ~39 pontos por centróide no mínimo, como recomendado pelo FAISS.
+        """
+        nlist = max(1, min(self.nlist, len(vectors) // 39))
+
+        if len(vectors) > self.max_train_samples:
+            # Linhas em ordem: leitura sequencial quando vectors é um memmap
+            sample = vectors[np.sort(self._rng.choice(len(vectors), self.max_train_samples, replace=False))]
+        else:
+            sample = np.asarray(vectors, dtype=np.float32)
+
+        centroids = sample[self._rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            assignments = self._nearest(sample, centroids)
+
+            counts = np.bincount(assignments, minlength=nlist)
+
+            # Soma por cluster com reduceat sobre as linhas ordenadas por cluster
+            order = np.argsort(assignments, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            sums = np.zeros_like(centroids)
+            non_empty = counts > 0
+            sums[non_empty] = np.add.reduceat(sample[order], starts[non_empty], axis=0)
+
+            empty = counts == 0
+            if empty.any(): # Re-semeia clusters vazios com pontos aleatórios
+                sums[empty] = sample[self._rng.choice(len(sample), int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids.astype(np.float32)
+        self._lists = [array("q") for _ in range(nlist)]
+
+        logger.info(f"IVFIndex treinado com {nlist} listas sobre {len(sample)} vetores.")
+
+    def _assign(self, vectors: np.ndarray, ids: np.ndarray):
+        assignments = self._nearest(vectors, self.centroids)
+
+        order = np.argsort(assignments, kind="stable")
+        sorted_lists = assignments[order]
+        sorted_ids = np.asarray(ids, dtype=np.int64)[order]
+
+        boundaries = np.flatnonzero(np.diff(sorted_lists)) + 1
+        for group in np.split(np.arange(len(order)), boundaries):
+            self._lists[sorted_lists[group[0]]].extend(sorted_ids[group].tolist())
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+        """
+        Centróide mais próximo de cada linha, em blocos para limitar memória.
+        """
+        return np.concatenate([
+            np.argmax(vectors[i:i + batch_size] @ centroids.T, axis=1)
+            for i in range(0, len(vectors), batch_size)
+        ])
@@ -0,0 +1,178 @@
+# Índice léxico (BM25) do VectorStore, para buscas por termos exatos que a
+# similaridade cosseno não captura bem (números de contrato, SKUs, nomes):
+# - Índice invertido incremental: cada termo aponta para arrays compactos
+#   (uint32 com os ids das linhas, uint16 com as frequências)
+# - Tokenização sem acentos e em minúsculas; códigos como "CT-2024/0012"
+#   são indexados inteiros e também pelas partes
+# - Ids seguem a ordem das linhas do store; tombstones saem pela máscara
+#   da busca (N e o tamanho médio ainda os contam, como no Lucene)
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import math
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from app.vectorstore.growable import GrowableArray
+from app.vectorstore.index import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+(?:[-./]\w+)*")
+_PART_RE = re.compile(r"[-./]")
+MAX_TERM_FREQUENCY = 65535 # Limite do uint16 das postings
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Termos do texto (minúsculas, sem acentos). Tokens compostos também
+    geram as partes: "CT-2024/0012" -> ["ct-2024/0012", "ct", "2024", "0012"].
+    """
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+
+    terms = []
+    for token in _TOKEN_RE.findall(folded):
+        terms.append(token)
+        if _PART_RE.search(token):
+            terms.extend(part for part in _PART_RE.split(token) if part)
+    return terms
+
+
+class BM25Index:
+    """
+    Índice invertido em memória com ranking BM25 (Okapi).
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1 (float): Saturação da frequência do termo
+            b (float): Peso da normalização pelo tamanho do chunk
+        """
+        self.k1 = k1
+        self.b = b
+
+        self._terms: Dict[str, int] = {} # termo -> posição em _ids/_tfs
+        self._ids: List[array] = [] # Postings: ids das linhas (uint32)
+        self._tfs: List[array] = [] # Postings: frequência do termo (uint16)
+        self._lengths = GrowableArray(np.float32) # Termos por linha
+        self._total_length = 0.0
+        self._lock = threading.Lock() # Busca (to_thread) x ingestão
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._terms)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes das postings e dos tamanhos (sem o dicionário de termos).
+        """
+        postings = sum(ids.itemsize * len(ids) + tfs.itemsize * len(tfs) for ids, tfs in zip(self._ids, self._tfs))
+        return postings + self._lengths.nbytes
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def add(self, texts: Iterable[str]):
+        """
+        Indexa textos como as próximas linhas (ids len(self), len(self) + 1, ...).
+        """
+        with self._lock:
+            row_id = len(self._lengths)
+            lengths = []
+
+            for text in texts:
+                counts: Dict[str, int] = {}
+                for term in tokenize(text or ""):
+                    counts[term] = counts.get(term, 0) + 1
+
+                for term, count in counts.items():
+                    slot = self._terms.get(term)
+                    if slot is None:
+                        slot = self._terms[term] = len(self._ids)
+                        self._ids.append(array("I"))
+                        self._tfs.append(array("H"))
+                    self._ids[slot].append(row_id)
+                    self._tfs[slot].append(min(count, MAX_TERM_FREQUENCY))
+
+                lengths.append(sum(counts.values()))
+                row_id += 1
+
+            self._lengths.append(np.asarray(lengths, dtype=np.float32))
+            self._total_length += sum(lengths)
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            query (str): Texto da consulta
+            top_k (int): Quantidade de resultados
+            mask (np.ndarray): Linhas elegíveis (bool, n); None = todas
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: scores BM25 e ids, em ordem
+            decrescente (apenas linhas com ao menos um termo da query)
+        """
+        with self._lock:
+            scores = self._score(query)
+
+        if scores is None or top_k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        if mask is not None:
+            known = min(len(mask), len(scores))
+            scores[:known][~mask[:known]] = 0.0
+            scores[known:] = 0.0 # Linhas que o chamador ainda não conhece
+
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        best = top_k_indices(scores[matched].reshape(1, -1), top_k)[0]
+        ids = matched[best]
+        return scores[ids], ids.astype(np.int64)
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _score(self, query: str) -> Optional[np.ndarray]:
+        """
+        Acumula os scores BM25 dos termos da query num vetor denso (n,).
+        Chamado com o lock (as postings não podem crescer durante a leitura).
+        """
+        n = len(self._lengths)
+        slots = {self._terms[term] for term in tokenize(query) if term in self._terms}
+        if n == 0 or not slots:
+            return None
+
+        lengths = self._lengths.view()
+        average = self._total_length / n or 1.0
+        scores = np.zeros(n, dtype=np.float32)
+
+        for slot in slots:
+            ids = np.frombuffer(self._ids[slot], dtype=np.uint32)
+            tfs = np.frombuffer(self._tfs[slot], dtype=np.uint16).astype(np.float32)
+
+            df = len(ids)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * lengths[ids] / average)
+
+            # Cada linha aparece uma única vez por termo: soma sem np.add.at
+            scores[ids] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        return scores
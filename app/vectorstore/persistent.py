@@ -0,0 +1,586 @@
+# Backend persistente do VectorStore:
+# - Embeddings em um segmento float32 bruto, append-only, aberto com np.memmap
+# - Metadados em um sidecar JSONL + índice de offsets (uint64), lidos sob demanda
+# - Manifesto (dim, contagem) gravado atomicamente: é o ponto de commit
+# - Vários workers (uvicorn) compartilham as mesmas páginas via page cache do SO
+#
+# Layout em VECTOR_DB_PATH:
+#   vectors.f32     -> linhas normalizadas (count, dim) float32
+#   documents.jsonl -> uma linha JSON por chunk
+#   documents.idx   -> offset inicial (uint64) de cada linha do JSONL
+#   tombstones.u64  -> ids (uint64) das linhas removidas, append-only
+#   catalog.sqlite  -> hashes de arquivos/chunks para dedup (ver catalog.py)
+#   remap.<g>.u64   -> linhas vivas da geração anterior (renumeração do catálogo)
+#   manifest.json   -> {"dim", "count", "documents_bytes", "tombstones", "generation"}
+#   store.lock      -> lock exclusivo (fcntl) usado pelos escritores
+#
+# A compactação (compact) regrava só as linhas vivas em segmentos de uma nova
+# geração (ex.: vectors.1.f32) e troca de geração pelo manifesto. Quem ainda
+# tem a geração anterior aberta continua lendo os arquivos já removidos (o SO
+# os mantém enquanto estiverem mapeados) e passa a ser is_stale: a coleção
+# é reaberta na próxima consulta. O catálogo (SQLite) não troca junto com o
+# manifesto: a renumeração das linhas fica gravada em remap.<g>.u64 antes do
+# commit e é aplicada depois dele, uma única vez por geração (ver
+# DocumentCatalog.remap_rows). Se o processo cair entre o commit e a
+# renumeração, quem abrir o store a refaz.
+
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+import fcntl
+import functools
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from app.vectorstore.catalog import DocumentCatalog
+from app.vectorstore.store import COMPACTION_BATCH, VectorStore
+from app.vectorstore.index import FlatIndex, IVFIndex
+from app.vectorstore.filters import MetadataIndex
+from app.vectorstore.lexical import BM25Index
+from app.vectorstore.quantization import ScalarQuantizer, ProductQuantizer
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+DOCUMENTS_FILE = "documents.jsonl"
+OFFSETS_FILE = "documents.idx"
+TOMBSTONES_FILE = "tombstones.u64"
+CATALOG_FILE = "catalog.sqlite"
+REMAP_FILE = "remap.u64"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "store.lock"
+SEGMENT_FILES = (VECTORS_FILE, DOCUMENTS_FILE, OFFSETS_FILE, TOMBSTONES_FILE)
+INDEX_SYNC_BATCH = 65536 # Linhas do memmap indexadas por vez
+
+
+def _refreshed(method: Callable) -> Callable:
+    """
+    Operação pública do VectorStore precedida de um único refresh(): as
+    chamadas aninhadas (ex.: similarity_search -> similarity_search_many,
+    fallbacks do prefilter) usam a mesma visão.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(self._view, "pinned", False):
+            return method(self, *args, **kwargs)
+
+        self.refresh()
+        self._view.pinned = True
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._view.pinned = False
+    return wrapper
+
+
+class StaleStoreError(Exception):
+    """
+    Levantada ao escrever num store cuja geração foi compactada por outro
+    processo (a coleção precisa ser reaberta).
+    """
+
+
+class PersistentVectorStore(VectorStore):
+    """
+    Vector store persistente em disco, baseado em memory-mapping.
+
+    A abertura é praticamente instantânea: nada é carregado em RAM,
+    as páginas dos vetores são trazidas pelo SO conforme a busca as toca
+    e os metadados são lidos apenas para os resultados retornados.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index: Optional[Union[FlatIndex, IVFIndex]] = None,
+        quantizer: Optional[Union[ScalarQuantizer, ProductQuantizer]] = None,
+        rerank_factor: int = 0,
+        lexical_index: Optional[BM25Index] = None,
+        metadata_index: Optional[MetadataIndex] = None
+    ):
+        """
+        Args:
+            path (str): Diretório do índice (normalmente Settings.VECTOR_DB_PATH)
+            index (FlatIndex | IVFIndex): Índice de busca, reconstruído a partir
+                do memmap na primeira busca (padrão: exato)
+            quantizer (ScalarQuantizer | ProductQuantizer): Códigos em RAM para
+                a busca; os float32 ficam só no disco
+            rerank_factor (int): Re-rank exato lendo apenas as linhas candidatas
+                do memmap (0 = desligado)
+            lexical_index (BM25Index): Índice léxico em RAM, reconstruído a
+                partir do sidecar JSONL na primeira busca léxica
+            metadata_index (MetadataIndex): Campos filtráveis, reconstruídos
+                do sidecar da mesma forma
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        super().__init__(
+            index=index,
+            quantizer=quantizer,
+            rerank_factor=rerank_factor,
+            catalog=DocumentCatalog(self.path / CATALOG_FILE),
+            lexical_index=lexical_index,
+            metadata_index=metadata_index
+        )
+
+        self._dim: Optional[int] = None
+        self._count = 0
+        self._documents_bytes = 0
+        self._tombstones = 0 # Entradas de tombstones.u64 já aplicadas em _deleted_mask
+        self._deleted_mask = np.zeros(0, dtype=np.bool_)
+        self._manifest_key: Optional[tuple] = None
+        self._opened = False # Já leu algum manifesto (fixa a geração)
+        self._stale = False
+        self._view = threading.local() # Operação pública em andamento na thread (ver _refreshed)
+
+        self._vectors: Optional[np.memmap] = None
+        self._offsets: Optional[np.memmap] = None
+        self._documents_fd: Optional[int] = None
+
+        self.refresh()
+
+        logger.info(
+            f"PersistentVectorStore aberto em {self.path} ({self._count} vetores)."
+        )
+
+    # Contagem e vetores da última visão: as operações públicas abaixo chamam
+    # refresh() uma vez na entrada e a busca lê _count/_vectors direto (um
+    # stat por busca, não um por acesso)
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            return np.empty((0, self._dim or 0), dtype=np.float32)
+        return self._vectors
+
+    @property
+    def version(self) -> str:
+        self.refresh()
+        return super().version
+
+    @property
+    def is_stale(self) -> bool:
+        self.refresh() # Consultado pelo CollectionManager a cada acesso à coleção
+        return self._stale
+
+    similarity_search = _refreshed(VectorStore.similarity_search)
+    lexical_search = _refreshed(VectorStore.lexical_search)
+    hybrid_search = _refreshed(VectorStore.hybrid_search)
+    prefilter_search = _refreshed(VectorStore.prefilter_search)
+    search_many = _refreshed(VectorStore.search_many)
+    similarity_search_many = _refreshed(VectorStore.similarity_search_many)
+    filter_values = _refreshed(VectorStore.filter_values)
+    warmup = _refreshed(VectorStore.warmup)
+
+    # Linhas vindas do catálogo (compartilhado) podem ser de outro processo
+    delete_rows = _refreshed(VectorStore.delete_rows)
+    delete_document = _refreshed(VectorStore.delete_document)
+    commit_document = _refreshed(VectorStore.commit_document)
+
+    # ==========================
+    # PUBLIC API
+    # ==========================
+
+    def refresh(self):
+        """
+        Remapeia os arquivos se outro processo tiver commitado novas linhas.
+        Custo de um stat() quando nada mudou.
+        """
+        manifest_path = self.path / MANIFEST_FILE
+
+        try:
+            stat = manifest_path.stat()
+        except FileNotFoundError:
+            return
+
+        key = (stat.st_ino, stat.st_mtime_ns) # os.replace gera um novo inode a cada commit
+        if key == self._manifest_key or self._stale:
+            return
+
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        self._manifest_key = key
+
+        generation = manifest.get("generation", 0)
+        if self._opened and generation != self._generation:
+            # Compactado: mantém a visão atual (ids antigos) até ser reaberto
+            self._stale = True
+            logger.info(f"{self.path} compactado (geração {generation}); store será reaberto.")
+            return
+
+        if not self._opened:
+            self._replay_remap(generation)
+
+        self._opened = True
+        self._generation = generation
+        self._remap(
+            dim=manifest["dim"],
+            count=manifest["count"],
+            documents_bytes=manifest["documents_bytes"],
+            tombstones=manifest.get("tombstones", 0)
+        )
+
+    def iter_documents(self) -> Iterator[Tuple[int, Dict]]:
+        """
+        Varre o sidecar JSONL sequencialmente (sem um pread por linha).
+        """
+        self.refresh()
+        count, deleted = self._count, self._deleted_mask.copy()
+        if count == 0:
+            return
+
+        # Pelo descritor já aberto: segue válido mesmo após uma compactação
+        with os.fdopen(os.dup(self._documents_fd), "rb") as f:
+            f.seek(0)
+            for idx in range(count):
+                line = f.readline()
+                if not deleted[idx]:
+                    yield idx, json.loads(line)
+
+    def compact(self) -> int:
+        """
+        Regrava as linhas vivas numa nova geração de segmentos, commita pelo
+        manifesto e renumera o catálogo. Roda sob o lock dos escritores
+        (appends e tombstones de outros processos esperam); buscas não são
+        bloqueadas. Depois do commit este objeto fica is_stale: abra um novo
+        store no mesmo path para ver a geração compactada.
+
+        Returns:
+            int: Quantidade de linhas removidas
+        """
+        with open(self.path / LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._manifest_key = None
+                self.refresh()
+                self._check_writable()
+
+                count, removed = self._count, self._deleted_count
+                if removed == 0:
+                    return 0
+
+                generation = self._generation + 1
+                live_rows = np.flatnonzero(~self._deleted_mask)
+                documents_bytes = self._write_generation(generation, live_rows)
+
+                self._write_manifest(self._dim, len(live_rows), documents_bytes, 0, generation)
+                self.catalog.remap_rows(live_rows, generation)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        # Mapeamentos e descritores abertos mantêm os dados da geração antiga
+        for filename in SEGMENT_FILES:
+            self._file(filename, generation - 1).unlink(missing_ok=True)
+        self._file(REMAP_FILE, generation).unlink(missing_ok=True)
+
+        self.refresh()
+        logger.info(
+            f"{self.path} compactado para a geração {generation}: "
+            f"{removed} linhas removidas, {count - removed} mantidas."
+        )
+        return removed
+
+    def close(self):
+        """
+        Libera os mapeamentos e o descritor do sidecar de metadados.
+        """
+        self._vectors = None
+        self._offsets = None
+        if self._documents_fd is not None:
+            os.close(self._documents_fd)
+            self._documents_fd = None
+        self.catalog.close()
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _file(self, filename: str, generation: Optional[int] = None) -> Path:
+        """
+        Caminho de um segmento na geração informada (padrão: a atual).
+        A geração 0 mantém os nomes originais.
+        """
+        generation = self._generation if generation is None else generation
+        if generation == 0:
+            return self.path / filename
+        stem, suffix = filename.split(".", 1)
+        return self.path / f"{stem}.{generation}.{suffix}"
+
+    def _check_writable(self):
+        if self._stale:
+            raise StaleStoreError(f"{self.path} foi compactado por outro processo; reabra a coleção")
+
+    def _replay_remap(self, generation: int):
+        """
+        Aplica ao catálogo a renumeração de uma compactação commitada cujo
+        processo caiu antes de renumerá-lo (no-op se já aplicada).
+        """
+        if self.catalog.generation >= generation:
+            return
+
+        remap = self._file(REMAP_FILE, generation)
+        try:
+            live_rows = np.fromfile(remap, dtype=np.uint64).astype(np.int64)
+        except FileNotFoundError:
+            # Compactado antes de o catálogo registrar gerações: já renumerado
+            self.catalog.set_generation(generation)
+            return
+
+        if self.catalog.remap_rows(live_rows, generation):
+            logger.warning(f"{self.path}: renumeração do catálogo da geração {generation} refeita.")
+        remap.unlink(missing_ok=True)
+
+    def _write_generation(self, generation: int, live_rows: np.ndarray) -> int:
+        """
+        Grava os segmentos da nova geração só com as linhas vivas, em lotes
+        (um pread do sidecar por lote), e a renumeração do catálogo.
+        Retorna o tamanho do novo JSONL.
+        """
+        live = np.zeros(self._count, dtype=np.bool_)
+        live[live_rows] = True
+        position = 0
+
+        with open(self._file(VECTORS_FILE, generation), "wb") as vectors, \
+                open(self._file(DOCUMENTS_FILE, generation), "wb") as documents, \
+                open(self._file(OFFSETS_FILE, generation), "wb") as offsets:
+
+            for start in range(0, self._count, COMPACTION_BATCH):
+                end = min(start + COMPACTION_BATCH, self._count)
+                keep = live[start:end]
+                if not keep.any():
+                    continue
+
+                begin = int(self._offsets[start])
+                stop = int(self._offsets[end]) if end < self._count else self._documents_bytes
+                lines = os.pread(self._documents_fd, stop - begin, begin).splitlines(keepends=True)
+                lines = [line for line, alive in zip(lines, keep) if alive]
+
+                line_offsets = np.empty(len(lines), dtype=np.uint64)
+                for i, line in enumerate(lines):
+                    line_offsets[i] = position
+                    position += len(line)
+
+                vectors.write(np.ascontiguousarray(self._vectors[start:end][keep]).tobytes())
+                documents.write(b"".join(lines))
+                offsets.write(line_offsets.tobytes())
+
+            for f in (vectors, documents, offsets):
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._file(TOMBSTONES_FILE, generation).write_bytes(b"")
+
+        with open(self._file(REMAP_FILE, generation), "wb") as remap:
+            remap.write(live_rows.astype(np.uint64).tobytes())
+            remap.flush()
+            os.fsync(remap.fileno())
+
+        return position
+
+    def _remap(self, dim: Optional[int], count: int, documents_bytes: int, tombstones: int):
+        self._dim = dim
+        self._count = count
+        self._documents_bytes = documents_bytes
+        self._load_tombstones(count, tombstones)
+
+        if count == 0 or dim is None:
+            self._vectors = None
+            self._offsets = None
+            return
+
+        # mode="r": páginas somente leitura, compartilhadas entre processos
+        self._vectors = np.memmap(
+            self._file(VECTORS_FILE),
+            dtype=np.float32,
+            mode="r",
+            shape=(count, dim)
+        )
+        self._offsets = np.memmap(
+            self._file(OFFSETS_FILE),
+            dtype=np.uint64,
+            mode="r",
+            shape=(count,)
+        )
+
+        if self._documents_fd is None:
+            self._documents_fd = os.open(self._file(DOCUMENTS_FILE), os.O_RDONLY)
+
+    def _load_tombstones(self, count: int, tombstones: int):
+        """
+        Ajusta a máscara ao número de linhas e aplica apenas as entradas
+        de tombstones.u64 commitadas desde o último remap.
+        """
+        if len(self._deleted_mask) != count:
+            mask = np.zeros(count, dtype=np.bool_)
+            keep = min(count, len(self._deleted_mask))
+            mask[:keep] = self._deleted_mask[:keep]
+            self._deleted_mask = mask
+
+        if tombstones < self._tombstones: # Arquivos recriados: relê do início
+            self._deleted_mask[:] = False
+            self._tombstones = 0
+
+        if tombstones > self._tombstones:
+            row_ids = np.fromfile(
+                self._file(TOMBSTONES_FILE),
+                dtype=np.uint64,
+                count=tombstones - self._tombstones,
+                offset=self._tombstones * 8
+            ).astype(np.int64)
+            self._deleted_mask[row_ids] = True
+            self._tombstones = tombstones
+
+        self._deleted_count = int(np.count_nonzero(self._deleted_mask))
+
+    def _live_mask(self) -> Optional[np.ndarray]:
+        if self._deleted_count == 0:
+            return None
+        return ~self._deleted_mask
+
+    def _mark_deleted(self, row_ids: np.ndarray):
+        """
+        Acrescenta os ids a tombstones.u64 sob lock e commita pelo manifesto.
+        """
+        with open(self.path / LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._manifest_key = None
+                self.refresh()
+                self._check_writable()
+
+                self._append_bytes(
+                    TOMBSTONES_FILE,
+                    self._tombstones * 8,
+                    row_ids.astype(np.uint64).tobytes()
+                )
+                self._write_manifest(
+                    self._dim,
+                    self._count,
+                    self._documents_bytes,
+                    self._tombstones + len(row_ids)
+                )
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        self.refresh()
+
+    def _sync_index(self):
+        """
+        Indexa (e quantiza) as linhas commitadas que ainda não estão no índice,
+        inclusive as gravadas por outros processos. As linhas são lidas do
+        memmap em lotes; um IVF ainda sem treino é treinado antes sobre uma
+        amostra do store inteiro (nem o treino nem as listas copiam o
+        memmap para a RAM). Usa a visão do último refresh (feito na entrada
+        da busca).
+        """
+        vectors, count = self._vectors, self._count
+        if vectors is None or count <= self._indexed:
+            return
+
+        index = self.index
+        if (
+            isinstance(index, IVFIndex)
+            and not index.is_trained
+            and len(index) + count - self._indexed >= index.min_train_size
+        ):
+            index.train(vectors[:count])
+
+        for start in range(self._indexed, count, INDEX_SYNC_BATCH):
+            self._index_rows(vectors[start:min(start + INDEX_SYNC_BATCH, count)])
+
+    def _get_document(self, idx: int) -> Dict:
+        start = int(self._offsets[idx])
+        end = (
+            int(self._offsets[idx + 1])
+            if idx + 1 < self._count
+            else self._documents_bytes
+        )
+        raw = os.pread(self._documents_fd, end - start, start)
+        return json.loads(raw)
+
+    def _documents_range(self, start: int, end: int) -> List[Dict]:
+        """
+        Lê as linhas [start, end) do sidecar com um único pread.
+        """
+        if end <= start:
+            return []
+        begin = int(self._offsets[start])
+        stop = int(self._offsets[end]) if end < self._count else self._documents_bytes
+        raw = os.pread(self._documents_fd, stop - begin, begin)
+        return [json.loads(line) for line in raw.splitlines()]
+
+    def _append(self, embeddings: np.ndarray, docs: List[Dict]) -> int:
+        """
+        Acrescenta linhas aos segmentos sob lock exclusivo e commita
+        atualizando o manifesto. Bytes além da última contagem commitada
+        (escrita interrompida) são descartados antes do append.
+        Retorna o id da primeira linha gravada.
+        """
+        count, dim = embeddings.shape
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        with open(self.path / LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._manifest_key = None # Força releitura do estado commitado
+                self.refresh()
+                self._check_writable()
+                self._check_dim(dim)
+
+                committed = self._count
+                documents_bytes = self._documents_bytes
+
+                lines = [
+                    (json.dumps(doc, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                    for doc in docs
+                ]
+                offsets = np.empty(count, dtype=np.uint64)
+                position = documents_bytes
+                for i, line in enumerate(lines):
+                    offsets[i] = position
+                    position += len(line)
+
+                self._append_bytes(VECTORS_FILE, committed * dim * 4, embeddings.tobytes())
+                self._append_bytes(DOCUMENTS_FILE, documents_bytes, b"".join(lines))
+                self._append_bytes(OFFSETS_FILE, committed * 8, offsets.tobytes())
+
+                self._write_manifest(dim, committed + count, position, self._tombstones)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        self.refresh()
+        return committed
+
+    def _append_bytes(self, filename: str, committed_size: int, payload: bytes):
+        with open(self._file(filename), "ab") as f:
+            f.truncate(committed_size)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_manifest(
+        self,
+        dim: int,
+        count: int,
+        documents_bytes: int,
+        tombstones: int,
+        generation: Optional[int] = None
+    ):
+        manifest_path = self.path / MANIFEST_FILE
+        tmp_path = manifest_path.with_suffix(".tmp")
+
+        tmp_path.write_text(
+            json.dumps({
+                "dim": dim,
+                "count": count,
+                "documents_bytes": documents_bytes,
+                "tombstones": tombstones,
+                "generation": self._generation if generation is None else generation
+            }),
+            encoding="utf-8"
+        )
+        os.replace(tmp_path, manifest_path) # Rename atômico = commit
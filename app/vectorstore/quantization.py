@@ -0,0 +1,299 @@
+# Quantização dos embeddings armazenados:
+# - ScalarQuantizer (sq8): int8 por dimensão + uma escala float32 por linha (~4x menor)
+# - ProductQuantizer (pq): m subvetores, 256 centróides cada, 1 byte por subvetor
+#
+# A busca é assimétrica (ADC): a query continua em float32 e é comparada
+# diretamente com os códigos, sem reconstruir os vetores da base.
+# Os dois expõem a mesma interface (add / score) usada pelos índices, e
+# reconstruct / share_training para a compactação sem os vetores float32.
+
+from typing import Optional, Tuple
+import logging
+
+import numpy as np
+
+from app.vectorstore.growable import GrowableArray
+
+logger = logging.getLogger(__name__)
+
+
+class ScalarQuantizer:
+    """
+    Quantização escalar simétrica int8 por linha.
+
+    Como os vetores são normalizados, uma escala por linha (max|v| / 127)
+    preserva bem o produto escalar e dispensa treino: cada inserção é
+    codificada imediatamente.
+    """
+
+    def __init__(self, block_size: int = 65536):
+        """
+        Args:
+            block_size (int): Linhas decodificadas por vez na busca exaustiva
+        """
+        self.block_size = block_size
+        self._codes = GrowableArray(np.int8)
+        self._scales = GrowableArray(np.float32)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self._codes.nbytes + self._scales.nbytes
+
+    def add(self, vectors: np.ndarray):
+        """
+        Codifica e armazena novas linhas (n, dim).
+        """
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+
+        self._codes.append(codes)
+        self._scales.append(scales.astype(np.float32))
+
+    def score(self, queries: np.ndarray, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Produto escalar aproximado entre queries (m, dim) e as linhas.
+
+        Args:
+            queries (np.ndarray): Queries normalizadas em float32
+            ids (np.ndarray): Linhas a pontuar (None = todas)
+
+        Returns:
+            np.ndarray: Scores (m, n)
+        """
+        # Escalas antes dos códigos: add() grava os códigos primeiro, então
+        # toda escala lida já tem o seu código (append concorrente)
+        scales = self._scales.view()
+        codes = self._codes.view()[:len(scales)]
+
+        if ids is not None:
+            return (queries @ codes[ids].astype(np.float32).T) * scales[ids]
+
+        # Decodifica em blocos para não materializar a base inteira em float32
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), self.block_size):
+            end = start + self.block_size
+            block = codes[start:end].astype(np.float32)
+            scores[:, start:end] = (queries @ block.T) * scales[start:end]
+        return scores
+
+    def reconstruct(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Vetores aproximados (n, dim) das linhas ids. Recodificá-los devolve
+        os mesmos códigos (a maior componente vira exatamente 127).
+        """
+        return self._codes.view()[ids].astype(np.float32) * self._scales.view()[ids][:, None]
+
+    def share_training(self, source: "ScalarQuantizer"):
+        """
+        Nada a fazer: a quantização escalar não tem treino.
+        """
+
+
+class ProductQuantizer:
+    """
+    Product Quantization com 256 centróides (1 byte) por subespaço.
+
+    Precisa de treino (k-means por subespaço). Até atingir min_train_size
+    linhas, os vetores ficam em float32 e a busca é exata; no treino todos
+    são codificados e o buffer float é descartado.
+    """
+
+    def __init__(
+        self,
+        num_subvectors: int = 48,
+        min_train_size: int = 10000,
+        kmeans_iters: int = 15,
+        max_train_samples: int = 65536,
+        block_size: int = 65536,
+        seed: int = 42
+    ):
+        """
+        Args:
+            num_subvectors (int): Quantidade de subespaços (m); ajustado para
+                o maior divisor da dimensão que não o ultrapasse
+            min_train_size (int): Linhas necessárias para treinar
+            kmeans_iters (int): Iterações do k-means de cada subespaço
+            max_train_samples (int): Tamanho máximo da amostra de treino
+            block_size (int): Linhas pontuadas por vez na busca exaustiva
+            seed (int): Semente do gerador aleatório
+        """
+        self.num_subvectors = num_subvectors
+        self.min_train_size = min_train_size
+        self.kmeans_iters = kmeans_iters
+        self.max_train_samples = max_train_samples
+        self.block_size = block_size
+        self._rng = np.random.default_rng(seed)
+
+        self.codebooks: Optional[np.ndarray] = None # (m, 256, dsub)
+        self._codes = GrowableArray(np.uint8)
+        self._pending = GrowableArray(np.float32) # Linhas em float32 antes do treino (contíguas)
+
+    def __len__(self) -> int:
+        return len(self._codes) + len(self._pending)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def nbytes(self) -> int:
+        codebooks = 0 if self.codebooks is None else self.codebooks.nbytes
+        return self._codes.nbytes + self._pending.nbytes + codebooks
+
+    def add(self, vectors: np.ndarray):
+        """
+        Codifica e armazena novas linhas (n, dim), treinando quando possível.
+        """
+        if self.is_trained:
+            self._codes.append(self._encode(vectors))
+            return
+
+        self._pending.append(vectors)
+
+        if len(self._pending) >= self.min_train_size:
+            # Codebooks publicados só depois dos códigos: buscas concorrentes
+            # veem as linhas float32 ou todos os códigos
+            pending = self._pending.view()
+            codebooks = self._train(pending)
+            self._codes.append(self._encode(pending, codebooks))
+            self.codebooks = codebooks
+            self._pending = GrowableArray(np.float32)
+
+    def score(self, queries: np.ndarray, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Mesma interface de ScalarQuantizer.score, via tabelas de lookup (ADC).
+        """
+        pending, codebooks = self._snapshot()
+        if codebooks is None:
+            vectors = pending.view() if len(pending) else np.empty((0, queries.shape[1]), np.float32)
+            rows = vectors if ids is None else vectors[ids]
+            return queries @ rows.T
+
+        m, _, dsub = codebooks.shape
+
+        # LUT[q, j, c] = <query_j, centróide c do subespaço j>
+        lut = np.einsum(
+            "qjd,jcd->qjc",
+            queries.reshape(len(queries), m, dsub),
+            codebooks
+        )
+
+        codes = self._codes.view()
+        if ids is not None:
+            return self._lookup(lut, codes[ids])
+
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), self.block_size):
+            end = start + self.block_size
+            scores[:, start:end] = self._lookup(lut, codes[start:end])
+        return scores
+
+    def reconstruct(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Vetores (n, dim) das linhas ids: os centróides dos códigos, ou as
+        próprias linhas float32 antes do treino. Com os mesmos codebooks,
+        recodificá-los devolve os mesmos códigos.
+        """
+        pending, codebooks = self._snapshot()
+        if codebooks is None:
+            return pending.view()[ids]
+
+        m, _, dsub = codebooks.shape
+        codes = self._codes.view()[ids]
+        return codebooks[np.arange(m), codes].reshape(len(codes), m * dsub)
+
+    def share_training(self, source: "ProductQuantizer"):
+        """
+        Adota os codebooks já treinados de source (ex.: store compactado),
+        em vez de treinar de novo sobre vetores reconstruídos.
+        """
+        if source.is_trained and len(self._pending) == 0:
+            self.codebooks = source.codebooks
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    def _snapshot(self) -> Tuple[GrowableArray, Optional[np.ndarray]]:
+        """
+        (_pending, codebooks) lidos nesta ordem: add publica os codebooks
+        antes de trocar _pending, então sem codebooks o buffer lido ainda
+        é o anterior ao treino (e com o buffer novo, vazio, os codebooks
+        já estão publicados).
+        """
+        pending = self._pending
+        return pending, self.codebooks
+
+    @staticmethod
+    def _lookup(lut: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        m = lut.shape[1]
+        subspaces = np.arange(m)
+        return np.stack([
+            query_lut[subspaces, codes].sum(axis=1) for query_lut in lut
+        ]).astype(np.float32)
+
+    def _train(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Codebooks (m, 256, dsub) treinados sobre uma amostra de vectors.
+        """
+        dim = vectors.shape[1]
+        m = max(d for d in range(1, min(self.num_subvectors, dim) + 1) if dim % d == 0)
+        dsub = dim // m
+
+        if len(vectors) > self.max_train_samples:
+            vectors = vectors[self._rng.choice(len(vectors), self.max_train_samples, replace=False)]
+
+        subvectors = vectors.reshape(len(vectors), m, dsub)
+        codebooks = np.stack([
+            self._kmeans(subvectors[:, j, :], min(256, len(vectors)))
+            for j in range(m)
+        ]).astype(np.float32)
+
+        logger.info(f"ProductQuantizer treinado: m={m}, dsub={dsub}, amostra={len(vectors)}.")
+        return codebooks
+
+    def _encode(self, vectors: np.ndarray, codebooks: Optional[np.ndarray] = None) -> np.ndarray:
+        codebooks = self.codebooks if codebooks is None else codebooks
+        m, _, dsub = codebooks.shape
+        subvectors = vectors.reshape(len(vectors), m, dsub)
+
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        for j in range(m):
+            codes[:, j] = self._nearest(subvectors[:, j, :], codebooks[j])
+        return codes
+
+    def _kmeans(self, data: np.ndarray, k: int) -> np.ndarray:
+        """
+        k-means L2 simples (Lloyd). Clusters vazios são re-semeados.
+        """
+        centroids = data[self._rng.choice(len(data), k, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            assignments = self._nearest(data, centroids)
+            counts = np.bincount(assignments, minlength=k)
+
+            # bincount ponderado por coluna: bem mais rápido que np.add.at
+            sums = np.stack([
+                np.bincount(assignments, weights=data[:, d], minlength=k)
+                for d in range(data.shape[1])
+            ], axis=1)
+
+            empty = counts == 0
+            sums[empty] = data[self._rng.choice(len(data), int(empty.sum()))]
+            counts[empty] = 1
+            centroids = sums / counts[:, None]
+
+        if k < 256: # Completa o codebook para manter códigos de 1 byte
+            centroids = np.concatenate([centroids, np.repeat(centroids[:1], 256 - k, axis=0)])
+
+        return centroids
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # argmin ||x - c||² = argmax (x·c - ||c||²/2)
+        return np.argmax(data @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
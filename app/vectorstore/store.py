@@ -3,84 +3,887 @@
 # - Fazer busca semântica por similaridade
 # - Ser simples, rápido e 100% gratuito
 # - Facilmente trocável depois por FAISS, Chroma, Pinecone etc.
+#
+# Os embeddings ficam em uma única matriz float32 contígua (crescimento
+# geométrico) com as linhas já normalizadas. Assim a similaridade cosseno
+# vira um produto matriz-vetor e o top-k sai de um np.argpartition.
+# A busca em si é delegada a um índice (exato ou IVF, ver index.py), que
+# pode pontuar os vetores float32 ou códigos quantizados (ver quantization.py).
+#
+# Linhas substituídas (ex.: chunks removidos numa nova versão do documento)
+# não são apagadas: viram tombstones e saem dos resultados da busca. O
+# catálogo (ver catalog.py) liga documentos e hashes de chunks às linhas.
+# Documentos podem ser removidos (delete_document) ou substituídos
+# (upsert_document) a qualquer momento; a compactação (compact_into) copia
+# só as linhas vivas para um store novo, que substitui o antigo na coleção.
+#
+# Um índice léxico BM25 opcional (ver lexical.py) acompanha as linhas e
+# permite busca híbrida (fusão RRF com a vetorial) ou pré-filtro léxico.
+# Campos de metadata filtráveis (ver filters.py) restringem qualquer busca
+# às linhas de um documento/tenant antes da pontuação.
 
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Sequence, Set, Tuple, Union
 import numpy as np
+import hashlib
 import logging
+import threading
+
+from app.vectorstore.catalog import DocumentCatalog, hash_chunk
+from app.vectorstore.filters import Filter, MetadataIndex
+from app.vectorstore.growable import GrowableArray
+from app.vectorstore.index import FlatIndex, IVFIndex, top_k_indices
+from app.vectorstore.lexical import BM25Index
+from app.vectorstore.quantization import ScalarQuantizer, ProductQuantizer
 
 logger = logging.getLogger(__name__)
 
+SEARCH_MODES = ("vector", "hybrid", "prefilter")
+SECONDARY_SYNC_BATCH = 10000 # Linhas lidas por vez ao alimentar os índices léxico/metadata
+COMPACTION_BATCH = 10000 # Linhas copiadas por vez na compactação
+RRF_K = 60 # Constante do Reciprocal Rank Fusion (busca híbrida)
+
 class VectorStore:
     """
     Vetor store simples em memória para MVP.
 
     Responsabilidades:
-    - Armazenar embeddings
+    - Armazenar embeddings (matriz float32 normalizada e/ou códigos quantizados)
     - Executar busca por similaridade (cosine)
     """
 
-    def __init__(self):
-        self.vectors: List[np.ndarray] = [] # Lista de embeddings
+    def __init__(
+        self,
+        initial_capacity: int = 1024,
+        index: Optional[Union[FlatIndex, IVFIndex]] = None,
+        quantizer: Optional[Union[ScalarQuantizer, ProductQuantizer]] = None,
+        rerank_factor: int = 0,
+        catalog: Optional[DocumentCatalog] = None,
+        lexical_index: Optional[BM25Index] = None,
+        metadata_index: Optional[MetadataIndex] = None
+    ):
+        """
+        Args:
+            initial_capacity (int): Quantidade inicial de linhas reservadas na matriz
+            index (FlatIndex | IVFIndex): Índice de busca (padrão: exato)
+            quantizer (ScalarQuantizer | ProductQuantizer): Se informado, a busca
+                usa os códigos quantizados
+            rerank_factor (int): Com quantização, busca top_k * rerank_factor
+                candidatos e reordena com os vetores float32 exatos (0 = desligado).
+                No backend em memória isso exige manter a matriz float32 em RAM.
+            catalog (DocumentCatalog): Catálogo de hashes (padrão: em memória)
+            lexical_index (BM25Index): Índice léxico para busca híbrida e
+                pré-filtro (None = apenas busca vetorial)
+            metadata_index (MetadataIndex): Campos filtráveis (padrão: filename)
+        """
+        self._matrix = GrowableArray(np.float32, initial_capacity) # Embeddings normalizados
+        self._dim: Optional[int] = None
+        self._size = 0 # Quantidade de linhas ocupadas
         self.documents: List[Dict] = [] # Metadados dos documentos
+        self._deleted = GrowableArray(np.bool_, initial_capacity) # Tombstones por linha
+        self._deleted_count = 0
+        self._generation = 0 # Incrementada a cada compactação (ids das linhas mudam)
+        self.catalog = catalog if catalog is not None else DocumentCatalog()
+
+        self.index = index if index is not None else FlatIndex()
+        self.quantizer = quantizer
+        self.rerank_factor = rerank_factor if quantizer is not None else 0
+        self._indexed = 0 # Linhas já inseridas no índice/quantizador
+
+        self.lexical_index = lexical_index
+        self.metadata_index = metadata_index if metadata_index is not None else MetadataIndex()
+        self._secondary_lock = threading.Lock()
+
+        # Sem quantização a busca usa a própria matriz; com quantização ela só
+        # é mantida em RAM se o re-rank exato estiver ligado
+        self._keep_vectors = quantizer is None or self.rerank_factor > 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dim(self) -> Optional[int]:
+        """
+        Dimensão dos embeddings armazenados (None se o store estiver vazio).
+        """
+        return self._dim
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        View (sem cópia) das linhas ocupadas da matriz de embeddings.
+        Vazia quando o store guarda apenas códigos quantizados.
+        """
+        return self._matrix.view()
+
+    @property
+    def version(self) -> str:
+        """
+        Versão do corpus: muda a cada append, tombstone ou compactação
+        (dentro de uma geração, linhas só crescem e tombstones nunca são
+        desfeitos). Usada para invalidar caches.
+        """
+        return f"{self._generation}:{len(self)}:{self._deleted_count}"
+
+    @property
+    def deleted_count(self) -> int:
+        """
+        Linhas marcadas como tombstone (ignoradas pela busca).
+        """
+        return self._deleted_count
+
+    @property
+    def dead_ratio(self) -> float:
+        """
+        Fração das linhas que são tombstones (gatilho da compactação).
+        """
+        size = len(self)
+        return self._deleted_count / size if size else 0.0
+
+    @property
+    def is_stale(self) -> bool:
+        """
+        True se o store foi substituído por uma compactação e deve ser
+        reaberto (só acontece no backend persistente).
+        """
+        return False
 
-    def add_documents(self, docs: List[Dict]):
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Bytes em RAM dos vetores (matriz float32 + códigos quantizados).
+        """
+        quantized = self.quantizer.nbytes if self.quantizer is not None else 0
+        return self._matrix.nbytes + quantized
+
+    def add_documents(self, docs: List[Dict]) -> List[int]:
         """
         Adiciona documentos vetorizados ao store.
 
+        Chunks com metadata["filename"] e metadata["chunk_hash"] são
+        registrados no catálogo (dedup de re-ingestões).
+
         Args:
             docs (List[Dict]): Lista de chunks com embeddings
+
+        Returns:
+            List[int]: Linhas atribuídas aos chunks, na ordem recebida
         """
 
-        for doc in docs:
-            embedding = np.array(doc["embedding"], dtype=np.float32)
-            self.vectors.append(embedding)
-            self.documents.append(doc)
+        if not docs:
+            return []
+
+        embeddings = np.asarray(
+            [doc["embedding"] for doc in docs],
+            dtype=np.float32
+        ) # Empilha os embeddings em uma matriz (n, dim)
+
+        # O embedding já vive na matriz, não duplica nos metadados
+        start = self._append(
+            self._normalize(embeddings),
+            [{k: v for k, v in doc.items() if k != "embedding"} for doc in docs]
+        )
+        row_ids = list(range(start, start + len(docs)))
+        self._sync_secondary()
+
+        entries = []
+        for row_id, doc in zip(row_ids, docs):
+            metadata = doc.get("metadata") or {}
+            if "filename" in metadata and "chunk_hash" in metadata:
+                entries.append((metadata["filename"], metadata["chunk_hash"], row_id))
+        if entries:
+            self.catalog.add_chunks(entries)
 
         logger.info(f"Adicionados {len(docs)} documentos ao vetor store.")
+        return row_ids
+
+    def iter_documents(self) -> Iterator[Tuple[int, Dict]]:
+        """
+        Percorre (linha, metadados) de todas as linhas vivas, em ordem de
+        inserção. Para processamentos sobre o corpus inteiro (ex.: resumo).
+        """
+        deleted = self._deleted.view()
+        for idx in range(len(self.documents)):
+            if not deleted[idx]:
+                yield idx, self._get_document(idx)
+
+    def delete_rows(self, row_ids: Sequence[int]):
+        """
+        Marca linhas como tombstone: continuam no armazenamento, mas não
+        aparecem mais nos resultados da busca.
+        """
+        row_ids = np.unique(np.asarray(row_ids, dtype=np.int64))
+        if len(row_ids) == 0:
+            return
+
+        if row_ids[0] < 0 or row_ids[-1] >= len(self):
+            raise IndexError("Linha fora do intervalo do store")
+
+        self._mark_deleted(row_ids)
+        logger.info(f"{len(row_ids)} linhas marcadas como tombstone.")
+
+    def find_file(self, file_hash: str) -> Optional[str]:
+        """
+        Retorna o filename já ingerido com o mesmo conteúdo (ou None).
+        """
+        return self.catalog.find_file(file_hash)
+
+    def known_chunks(self, filename: str) -> Dict[str, int]:
+        """
+        Hashes dos chunks vivos de um documento -> linha do store.
+        """
+        return self.catalog.chunk_rows(filename)
+
+    def commit_document(
+        self,
+        filename: str,
+        file_hash: str,
+        chunk_hashes: Sequence[str],
+        reused: Optional[Dict[str, Dict]] = None
+    ) -> int:
+        """
+        Fecha a ingestão de uma versão do documento: grava o hash do arquivo
+        e marca como tombstone os chunks da versão anterior que não estão
+        em chunk_hashes.
+
+        Args:
+            reused (Dict[str, Dict]): chunk_hash -> linha (sem embedding) dos
+                chunks reaproveitados, como na nova versão. As linhas cujo
+                chunk_id/page/metadados mudaram são regravadas com o mesmo
+                vetor: chunk_id continua sendo a posição no documento atual
+
+        Returns:
+            int: Quantidade de linhas marcadas como tombstone (sem contar as regravadas)
+        """
+        if reused:
+            self._rewrite_reused(filename, reused)
+        stale = self.catalog.commit_document(filename, file_hash, chunk_hashes)
+        self.delete_rows(stale)
+        return len(stale)
+
+    def delete_document(self, filename: str) -> int:
+        """
+        Remove o documento: tira-o do catálogo e marca suas linhas como
+        tombstone (inclusive chunks gravados sem chunk_hash, encontrados
+        pelo índice de metadata quando filename é filtrável).
+
+        Returns:
+            int: Quantidade de linhas vivas removidas (0 = documento inexistente)
+        """
+        rows = set(self.catalog.delete_document(filename))
+        if "filename" in self.metadata_index.fields:
+            rows.update(np.flatnonzero(self._filter_mask({"filename": filename})).tolist())
+
+        row_ids = np.asarray(sorted(rows), dtype=np.int64)
+        live = self._live_mask()
+        removed = len(row_ids) if live is None else int(np.count_nonzero(live[row_ids]))
+
+        self.delete_rows(row_ids)
+        return removed
+
+    def upsert_document(
+        self,
+        filename: str,
+        docs: List[Dict],
+        file_hash: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Grava (ou substitui) todos os chunks de um documento de uma vez:
+        chunks com hash já presente no documento são reaproveitados, os
+        novos são adicionados e os que sumiram viram tombstones.
+
+        Args:
+            filename (str): Documento (gravado em metadata["filename"])
+            docs (List[Dict]): Chunks vetorizados da nova versão
+            file_hash (str): Hash do arquivo de origem (padrão: derivado
+                dos hashes dos chunks)
+
+        Returns:
+            Dict[str, int]: chunks_added, chunks_reused e chunks_tombstoned
+        """
+        known = self.known_chunks(filename)
+        chunk_hashes: List[str] = [] # Ordem da nova versão (hash do arquivo)
+        seen: Set[str] = set()
+        pending: List[Dict] = []
+        reused: Dict[str, Dict] = {}
+
+        for doc in docs:
+            metadata = {**(doc.get("metadata") or {}), "filename": filename}
+            chunk_hash = metadata.setdefault("chunk_hash", hash_chunk(doc.get("text", "")))
+            if chunk_hash not in seen:
+                if chunk_hash in known:
+                    reused[chunk_hash] = {k: v for k, v in doc.items() if k != "embedding"}
+                    reused[chunk_hash]["metadata"] = metadata
+                else:
+                    pending.append({**doc, "metadata": metadata})
+            chunk_hashes.append(chunk_hash)
+            seen.add(chunk_hash)
+
+        self.add_documents(pending)
+
+        if file_hash is None:
+            file_hash = hashlib.sha256("\n".join(chunk_hashes).encode("utf-8")).hexdigest()
+        tombstoned = self.commit_document(filename, file_hash, chunk_hashes, reused=reused)
+
+        return {
+            "chunks_added": len(pending),
+            "chunks_reused": len(chunk_hashes) - len(pending),
+            "chunks_tombstoned": tombstoned,
+        }
+
+    def compact_into(self, target: "VectorStore") -> int:
+        """
+        Copia as linhas vivas (vetores, metadados e catálogo renumerado)
+        para target, um store vazio com a mesma configuração. Este store
+        não é alterado: buscas em andamento continuam válidas até a troca.
+        Escritas concorrentes neste store não são copiadas (o chamador as
+        bloqueia, ver CollectionManager.compact).
+
+        Sem a matriz float32 (quantizado sem re-rank), os vetores são
+        reconstruídos dos códigos e target herda o treino do quantizador:
+        os códigos copiados são os mesmos.
+
+        Returns:
+            int: Quantidade de linhas removidas
+        """
+        size = len(self)
+        live = self._live_mask()
+        live_rows = np.arange(size) if live is None else np.flatnonzero(live[:size])
+
+        vectors = self.vectors if self._keep_vectors else None
+        if vectors is None:
+            target.quantizer.share_training(self.quantizer)
+
+        for start in range(0, len(live_rows), COMPACTION_BATCH):
+            rows = live_rows[start:start + COMPACTION_BATCH]
+            batch = vectors[rows] if vectors is not None else self.quantizer.reconstruct(rows)
+            target._append(batch, [self.documents[idx] for idx in rows.tolist()])
+
+        self.catalog.copy_to(target.catalog)
+        target.catalog.remap_rows(live_rows, self._generation + 1)
+        target._generation = self._generation + 1
+        target.warmup()
+
+        logger.info(f"Compactação: {size - len(live_rows)} linhas removidas, {len(live_rows)} mantidas.")
+        return size - len(live_rows)
 
     def similarity_search(
-            self,
-            query_embedding: List[float],
-            top_k: int = 5
-        ) -> List[Dict]: 
-            """
-            Retorna os top_k documentos mais similares.
-
-            Args:
-                query_embedding (List[float]): Vetor da query
-                top_k (int): Quantidade de resultados
-
-            Returns:
-                List[Dict]: Documentos mais similares
-            """
-
-            if not self.vectors:
-                return []
-            
-            query_vec = np.array(query_embedding, dtype=np.float32) # Converte a query em numpy array
-
-            similarities = [
-                 self._cosine_similarity(query_vec, vec)
-                    for vec in self.vectors
-            ] # Calcula similaridades
-
-            top_indices = np.argsort(similarities)[-top_k:][::-1] # Índices dos top_k mais similares (argsort - ordena)
-
-            results = []
-            for idx in top_indices:
-                doc = self.documents[idx].copy()
-                doc["score"] = similarities[idx]
-                results.append(doc)
-            
-            return results
-    
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter: Optional[Filter] = None
+    ) -> List[Dict]:
+        """
+        Retorna os top_k documentos mais similares.
+
+        Args:
+            query_embedding (List[float]): Vetor da query
+            top_k (int): Quantidade de resultados
+            filter (Dict): Restringe a busca por metadata, ex.:
+                {"filename": "contrato.pdf"} (ver filters.py)
+
+        Returns:
+            List[Dict]: Documentos mais similares
+        """
+
+        return self.similarity_search_many([query_embedding], top_k=top_k, filter=filter)[0]
+
+    def search(
+        self,
+        query: str,
+        query_embedding: List[float],
+        top_k: int = 5,
+        mode: str = "vector",
+        filter: Optional[Filter] = None
+    ) -> List[Dict]:
+        """
+        Ponto único de busca dos agentes.
+
+        Args:
+            query (str): Texto da query (usado pelos modos léxicos)
+            query_embedding (List[float]): Vetor da query
+            top_k (int): Quantidade de resultados
+            mode (str): "vector" | "hybrid" (RRF) | "prefilter" (BM25 limita
+                os candidatos da busca vetorial)
+            filter (Dict): Filtro de metadata aplicado antes da pontuação
+        """
+        if mode == "vector":
+            return self.similarity_search(query_embedding, top_k=top_k, filter=filter)
+        if mode == "hybrid":
+            return self.hybrid_search(query, query_embedding, top_k=top_k, filter=filter)
+        if mode == "prefilter":
+            return self.prefilter_search(query, query_embedding, top_k=top_k, filter=filter)
+        raise ValueError(f"Modo de busca inválido: {mode}")
+
+    def lexical_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter: Optional[Filter] = None
+    ) -> List[Dict]:
+        """
+        Retorna os top_k documentos pelo ranking BM25 (score = BM25).
+        """
+        if self.lexical_index is None:
+            raise ValueError("Índice léxico desligado neste store")
+
+        scores, ids = self._lexical_search(query, top_k, self._filter_mask(filter))
+        return self._build_results(ids, scores)
+
+    def hybrid_search(
+        self,
+        query: str,
+        query_embedding: List[float],
+        top_k: int = 5,
+        fetch_k: Optional[int] = None,
+        rrf_k: int = RRF_K,
+        filter: Optional[Filter] = None
+    ) -> List[Dict]:
+        """
+        Funde os rankings vetorial e BM25 por Reciprocal Rank Fusion:
+        score = soma de 1 / (rrf_k + posição) nas duas listas. Sem índice
+        léxico, equivale a similarity_search.
+
+        Args:
+            fetch_k (int): Candidatos de cada ranking (padrão: top_k * 4)
+            rrf_k (int): Constante do RRF (maior = posições pesam menos)
+
+        Returns:
+            List[Dict]: Documentos com score (RRF), vector_score e lexical_score
+        """
+        if self.lexical_index is None:
+            return self.similarity_search(query_embedding, top_k=top_k, filter=filter)
+
+        fetch_k = fetch_k or top_k * 4
+        filter_mask = self._filter_mask(filter)
+        vector_scores, vector_ids = self._vector_search(
+            self._query_matrix([query_embedding]), fetch_k, mask=filter_mask
+        )
+        return self._fuse(query, vector_scores[0], vector_ids[0], top_k, fetch_k, rrf_k, filter_mask)
+
+    def prefilter_search(
+        self,
+        query: str,
+        query_embedding: List[float],
+        top_k: int = 5,
+        max_candidates: int = 2000,
+        filter: Optional[Filter] = None
+    ) -> List[Dict]:
+        """
+        Busca vetorial exata restrita às max_candidates linhas mais bem
+        ranqueadas pelo BM25: em corpora grandes pontua poucos milhares de
+        linhas em vez de todas. Sem candidatos léxicos (ou sem índice
+        léxico), cai na busca vetorial normal.
+        """
+        if self.lexical_index is None or len(self) == 0:
+            return self.similarity_search(query_embedding, top_k=top_k, filter=filter)
+
+        filter_mask = self._filter_mask(filter)
+        _, candidates = self._lexical_search(query, max_candidates, filter_mask)
+        if len(candidates) == 0:
+            return self.similarity_search(query_embedding, top_k=top_k, filter=filter)
+
+        mask = np.zeros(len(self), dtype=np.bool_)
+        mask[candidates] = True
+
+        # Candidatos já são poucos: FlatIndex pontua só eles (sem perda de recall do IVF)
+        scores, ids = self._vector_search(
+            self._query_matrix([query_embedding]), top_k, mask=mask, index=FlatIndex()
+        )
+        return self._build_results(ids[0], scores[0])
+
+    def search_many(
+        self,
+        queries: Sequence[str],
+        query_embeddings: Sequence[Sequence[float]],
+        top_k: int = 5,
+        mode: str = "vector",
+        filter: Optional[Filter] = None
+    ) -> List[List[Dict]]:
+        """
+        search para várias queries de uma vez: a parte vetorial dos modos
+        "vector" e "hybrid" é um único GEMM, e linhas recuperadas por mais
+        de uma query são lidas uma única vez. "prefilter" (candidatos
+        diferentes por query) roda query a query.
+
+        Returns:
+            List[List[Dict]]: Resultados de cada query, na ordem recebida
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Modo de busca inválido: {mode}")
+        if len(queries) == 0:
+            return []
+        if mode == "prefilter":
+            return [
+                self.prefilter_search(query, embedding, top_k=top_k, filter=filter)
+                for query, embedding in zip(queries, query_embeddings)
+            ]
+
+        filter_mask = self._filter_mask(filter)
+        documents: Dict[int, Dict] = {}
+
+        if mode == "vector" or self.lexical_index is None:
+            scores, ids = self._vector_search(self._query_matrix(query_embeddings), top_k, mask=filter_mask)
+            return [
+                self._build_results(row_ids, row_scores, documents)
+                for row_ids, row_scores in zip(ids, scores)
+            ]
+
+        fetch_k = top_k * 4
+        scores, ids = self._vector_search(self._query_matrix(query_embeddings), fetch_k, mask=filter_mask)
+        return [
+            self._fuse(query, row_scores, row_ids, top_k, fetch_k, RRF_K, filter_mask, documents)
+            for query, row_ids, row_scores in zip(queries, ids, scores)
+        ]
+
+    def similarity_search_many(
+        self,
+        queries: Sequence[Sequence[float]],
+        top_k: int = 5,
+        filter: Optional[Filter] = None
+    ) -> List[List[Dict]]:
+        """
+        Busca em lote: pontua todas as queries com um único GEMM.
+
+        Args:
+            queries (Sequence[Sequence[float]]): Vetores das queries (m, dim)
+            top_k (int): Quantidade de resultados por query
+            filter (Dict): Filtro de metadata comum a todas as queries
+
+        Returns:
+            List[List[Dict]]: Para cada query, os documentos mais similares
+        """
+
+        query_matrix = self._query_matrix(queries)
+        scores, ids = self._vector_search(query_matrix, top_k, mask=self._filter_mask(filter))
+
+        return [
+            self._build_results(row_ids, row_scores)
+            for row_ids, row_scores in zip(ids, scores)
+        ]
+
+    def warmup(self):
+        """
+        Indexa de uma vez as linhas pendentes (índice vetorial, BM25 e
+        metadata), que de outra forma seriam indexadas na primeira busca.
+        """
+        self._sync_index()
+        self._sync_secondary()
+
+    def filter_values(self, field: str) -> Dict[str, int]:
+        """
+        Valores de um campo filtrável -> quantidade de chunks vivos (ex.:
+        para listar documentos ou tenants disponíveis).
+        """
+        self._sync_secondary()
+        return self.metadata_index.values(field, self._live_mask())
+
+    # ==========================
+    # INTERNAL METHODS
+    # ==========================
+
+    @staticmethod
+    def _query_matrix(queries: Sequence[Sequence[float]]) -> np.ndarray:
+        query_matrix = np.asarray(queries, dtype=np.float32)
+        if query_matrix.ndim == 1:
+            query_matrix = query_matrix.reshape(1, -1)
+        return query_matrix
+
+    def _vector_search(
+        self,
+        query_matrix: np.ndarray,
+        top_k: int,
+        mask: Optional[np.ndarray] = None,
+        index: Optional[Union[FlatIndex, IVFIndex]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores e ids (m, k) da busca vetorial. mask restringe as linhas
+        (sempre combinada com os tombstones); index sobrescreve o do store.
+        """
+        # Linhas publicadas (_size): um append concorrente já pode ter
+        # alimentado índice, quantizador e matriz além delas
+        size = len(self) if mask is None else min(len(self), len(mask))
+
+        if size == 0 or top_k <= 0 or (mask is not None and not mask[:size].any()):
+            empty = (len(query_matrix), 0)
+            return np.empty(empty, dtype=np.float32), np.empty(empty, dtype=np.int64)
+
+        self._check_dim(query_matrix.shape[1])
+        self._sync_index()
+
+        query_matrix = self._normalize(query_matrix)
+        index = index if index is not None else self.index
+
+        if mask is not None and isinstance(index, IVFIndex) and index.is_trained:
+            # Filtro mais seletivo que as listas visitadas: busca exata nas
+            # linhas filtradas é mais barata e não perde recall
+            visited = len(mask) * min(index.nprobe, len(index.centroids)) / len(index.centroids)
+            if np.count_nonzero(mask) <= visited:
+                index = FlatIndex()
+
+        live = self._live_mask()
+        if mask is None:
+            mask = live
+        elif live is not None:
+            mask = mask[:size] & live[:size]
+
+        if mask is not None:
+            mask = mask[:size]
+        elif self.quantizer is not None or not isinstance(index, FlatIndex):
+            # Códigos e listas do IVF não são fatiados: a máscara limita a size
+            mask = np.ones(size, dtype=np.bool_)
+
+        if self.quantizer is None:
+            return index.search(query_matrix, top_k, self.vectors[:size], mask)
+
+        fetch = top_k * self.rerank_factor if self.rerank_factor else top_k
+        scores, ids = index.search(query_matrix, fetch, self.quantizer, mask)
+
+        if self.rerank_factor:
+            scores, ids = self._rerank(query_matrix, ids, top_k)
+        return scores, ids
+
+    def _lexical_search(
+        self,
+        query: str,
+        top_k: int,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores e ids BM25 entre as linhas vivas (e da mask, se informada).
+        """
+        self._sync_secondary()
+
+        live = self._live_mask()
+        if mask is None:
+            mask = live
+        elif live is not None:
+            mask = mask & live
+
+        return self.lexical_index.search(query, top_k, mask)
+
+    def _fuse(
+        self,
+        query: str,
+        vector_scores: np.ndarray,
+        vector_ids: np.ndarray,
+        top_k: int,
+        fetch_k: int,
+        rrf_k: int,
+        filter_mask: Optional[np.ndarray] = None,
+        documents: Optional[Dict[int, Dict]] = None
+    ) -> List[Dict]:
+        """
+        Fusão RRF do ranking vetorial de uma query com o seu ranking BM25.
+        """
+        lexical_scores, lexical_ids = self._lexical_search(query, fetch_k, filter_mask)
+
+        fused: Dict[int, float] = {}
+        components: Dict[int, Dict[str, float]] = {}
+        rankings = (
+            ("vector_score", vector_ids, vector_scores),
+            ("lexical_score", lexical_ids, lexical_scores),
+        )
+        for name, ids, scores in rankings:
+            rank = 0
+            for idx, score in zip(ids.tolist(), scores.tolist()):
+                if idx < 0:
+                    continue
+                rank += 1
+                fused[idx] = fused.get(idx, 0.0) + 1.0 / (rrf_k + rank)
+                components.setdefault(idx, {})[name] = score
+
+        best = sorted(fused, key=fused.get, reverse=True)[:top_k]
+        results = self._build_results(
+            np.asarray(best, dtype=np.int64),
+            np.asarray([fused[idx] for idx in best], dtype=np.float32),
+            documents
+        )
+        for doc, idx in zip(results, best):
+            doc.update(components[idx])
+        return results
+
+    def _rewrite_reused(self, filename: str, reused: Dict[str, Dict]):
+        """
+        Regrava, com o vetor já calculado, os chunks reaproveitados cuja linha
+        difere da nova versão (ex.: um trecho inserido antes deles desloca
+        chunk_id e page). Sem isso, ContextPacker e o resumo map-reduce
+        ordenariam e fundiriam trechos pela posição da versão antiga.
+        """
+        known = self.known_chunks(filename)
+        rows: List[int] = []
+        docs: List[Dict] = []
+
+        for chunk_hash, doc in reused.items():
+            row = known.get(chunk_hash)
+            if row is not None and self._get_document(row) != doc:
+                rows.append(row)
+                docs.append(doc)
+
+        if not rows:
+            return
+
+        row_ids = np.asarray(rows, dtype=np.int64)
+        vectors = self.vectors[row_ids] if self._keep_vectors else self.quantizer.reconstruct(row_ids)
+        self.add_documents([{**doc, "embedding": vector} for doc, vector in zip(docs, vectors)])
+        self.delete_rows(rows)
+        logger.info(f"{len(rows)} chunks reaproveitados de {filename} regravados na nova posição.")
+
+    def _filter_mask(self, filter: Optional[Filter]) -> Optional[np.ndarray]:
+        """
+        Máscara das linhas que satisfazem o filtro (None sem filtro).
+        """
+        if not filter:
+            return None
+        self._sync_secondary()
+        return self.metadata_index.mask(filter, len(self))
+
+    def _sync_secondary(self):
+        """
+        Alimenta os índices léxico e de metadata com as linhas que eles
+        ainda não viram (no backend persistente, inclusive as gravadas por
+        outros processos). Cada lote de linhas é lido uma única vez.
+        """
+        indexes = [index for index in (self.lexical_index, self.metadata_index) if index is not None]
+
+        with self._secondary_lock:
+            total = len(self)
+            for start in range(min(len(index) for index in indexes), total, SECONDARY_SYNC_BATCH):
+                end = min(start + SECONDARY_SYNC_BATCH, total)
+                docs = self._documents_range(start, end)
+
+                if self.lexical_index is not None and len(self.lexical_index) < end:
+                    pending = docs[len(self.lexical_index) - start:]
+                    self.lexical_index.add(doc.get("text", "") for doc in pending)
+
+                if len(self.metadata_index) < end:
+                    pending = docs[len(self.metadata_index) - start:]
+                    self.metadata_index.add(doc.get("metadata") for doc in pending)
+
+    def _documents_range(self, start: int, end: int) -> List[Dict]:
+        """
+        Metadados das linhas [start, end), sem cópia (somente leitura).
+        """
+        return self.documents[start:end]
+
+    def _rerank(self, queries: np.ndarray, ids: np.ndarray, top_k: int):
+        """
+        Recalcula com float32 exato os scores dos candidatos quantizados
+        e mantém os top_k. Lê apenas as linhas candidatas da matriz (ou memmap).
+        """
+        vectors = self.vectors
+        exact = np.full(ids.shape, -np.inf, dtype=np.float32)
+
+        for i, (query, row_ids) in enumerate(zip(queries, ids)):
+            valid = row_ids >= 0
+            exact[i, valid] = vectors[row_ids[valid]] @ query
+
+        order = top_k_indices(exact, top_k)
+        scores = np.take_along_axis(exact, order, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+
+        return scores, np.where(np.isfinite(scores), ids, -1)
+
+    def _build_results(
+        self,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        documents: Optional[Dict[int, Dict]] = None
+    ) -> List[Dict]:
+        """
+        Monta a lista de resultados (metadados + score) para uma query.
+        documents (linha -> metadados) é compartilhado entre as queries de
+        um lote: cada linha é lida uma única vez.
+        """
+        results = []
+        for idx, score in zip(indices, scores):
+            if idx < 0: # Índices aproximados podem devolver menos de top_k
+                continue
+            idx = int(idx)
+            if documents is None:
+                doc = self._get_document(idx)
+            else:
+                if idx not in documents:
+                    documents[idx] = self._get_document(idx)
+                doc = documents[idx].copy()
+            doc["score"] = float(score)
+            results.append(doc)
+        return results
+
+    def _index_rows(self, vectors: np.ndarray):
+        """
+        Insere no índice (e no quantizador) as linhas seguintes às já indexadas.
+        """
+        if len(vectors) == 0:
+            return
+
+        ids = np.arange(self._indexed, self._indexed + len(vectors), dtype=np.int64)
+
+        if self.quantizer is not None:
+            self.quantizer.add(vectors)
+        self.index.add(vectors, ids)
+
+        self._indexed += len(vectors)
+
+    def _live_mask(self) -> Optional[np.ndarray]:
+        """
+        Linhas elegíveis para a busca (None quando não há tombstones).
+        """
+        if self._deleted_count == 0:
+            return None
+        return ~self._deleted.view()
+
+    def _mark_deleted(self, row_ids: np.ndarray):
+        deleted = self._deleted.view()
+        self._deleted_count += int(np.count_nonzero(~deleted[row_ids]))
+        deleted[row_ids] = True
+
+    def _sync_index(self):
+        """
+        Garante que o índice cobre todas as linhas do store. No backend em
+        memória isso já acontece no append.
+        """
+
+    def _get_document(self, idx: int) -> Dict:
+        """
+        Retorna uma cópia dos metadados da linha idx.
+        """
+        return self.documents[idx].copy()
+
+    def _append(self, embeddings: np.ndarray, docs: List[Dict]) -> int:
+        """
+        Indexa as novas linhas e as guarda na matriz (se necessário).
+        Retorna o id da primeira linha gravada.
+
+        Chamado por um escritor de cada vez (CollectionManager.writer), mas
+        concorrente com buscas: _size é publicado por último, depois de
+        todas as estruturas já terem as linhas, e as buscas se limitam a ele.
+        """
+        self._check_dim(embeddings.shape[1])
+        self._dim = embeddings.shape[1]
+
+        self._index_rows(embeddings)
+
+        if self._keep_vectors:
+            self._matrix.append(embeddings)
+
+        start = self._size
+        self._deleted.append(np.zeros(len(embeddings), dtype=np.bool_))
+        self.documents.extend(docs)
+        self._size += len(embeddings)
+
+        return start
+
+    def _check_dim(self, dim: int):
+        if self.dim is not None and dim != self.dim:
+            raise ValueError(
+                f"Dimensão do embedding ({dim}) difere da dimensão do store ({self.dim})"
+            )
+
     @staticmethod
-    def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
         """
-        Calcula similaridade cosseno entre dois vetores.
+        Normaliza as linhas (norma L2 = 1). Vetores nulos permanecem nulos.
         """
-        denom = np.linalg.norm(a) * np.linalg.norm(b) # Normalização (linalg - norma do vetor)
-        if denom == 0:
-            return 0.0
-        return float(np.dot(a, b) / denom) # Produto escalar dividido pela normalização
-    
\ No newline at end of file
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
@@ -0,0 +1,72 @@
+# Benchmark recall@k x latência: IVFIndex vs busca exata (FlatIndex).
+#
+# Uso (a partir da raiz do repositório):
+#   python -m benchmarks.ann_recall --n 200000 --dim 384 --queries 200
+#
+# Os dados são sintéticos e agrupados (mistura de gaussianas na esfera),
+# o que se aproxima mais de embeddings reais do que ruído uniforme.
+
+import argparse
+import time
+
+import numpy as np
+
+from app.vectorstore.index import FlatIndex, IVFIndex
+
+
+def make_dataset(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    data = centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def timed_search(index, queries: np.ndarray, top_k: int, vectors: np.ndarray):
+    latencies = []
+    all_ids = []
+    for query in queries: # Uma query por vez, como no QAAgent
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), top_k, vectors)
+        latencies.append(time.perf_counter() - start)
+        all_ids.append(ids[0])
+    return np.array(all_ids), np.array(latencies) * 1000
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = make_dataset(args.n, args.dim, clusters=max(1, args.n // 500), rng=rng)
+    queries = make_dataset(args.queries, args.dim, clusters=max(1, args.queries // 10), rng=rng)
+
+    truth, flat_ms = timed_search(FlatIndex(), queries, args.top_k, vectors)
+    print(f"flat      recall@{args.top_k}=1.000  p50={np.percentile(flat_ms, 50):7.2f}ms  p99={np.percentile(flat_ms, 99):7.2f}ms")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(nlist=args.nlist, min_train_size=1)
+    ivf.add(vectors, np.arange(len(vectors), dtype=np.int64))
+    print(f"ivf build ({len(ivf.centroids)} listas): {time.perf_counter() - start:.1f}s")
+
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, ivf_ms = timed_search(ivf, queries, args.top_k, vectors)
+        print(
+            f"nprobe={nprobe:<3d} recall@{args.top_k}={recall_at_k(found, truth):.3f}  "
+            f"p50={np.percentile(ivf_ms, 50):7.2f}ms  p99={np.percentile(ivf_ms, 99):7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Benchmark de throughput do TextChunker (MB/s) em textos de vários MB:
+# modo "chars" x modo "tokens" (offsets + tokenizer do modelo de embeddings).
+#
+# Uso (a partir da raiz do repositório):
+#   python -m benchmarks.chunker_throughput --mb 8 --pages 400
+#   python -m benchmarks.chunker_throughput --tokenizer sentence-transformers/all-MiniLM-L6-v2 --tokens 256
+#
+# O texto é sintético (frases de tamanho variável sobre um vocabulário
+# fixo), dividido em páginas como as do DocumentParser. No modo "tokens" o
+# benchmark também re-tokeniza cada chunk e confere que nenhum passa da janela.
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from app.document_pipeline.chunker import PAGE_SEPARATOR, TextChunker
+
+WORDS = (
+    "contrato cláusula pagamento rescisão multa prazo empresa fornecedor "
+    "juros reajuste vigência garantia obrigação responsabilidade confidencialidade "
+    "the agreement shall terminate upon written notice payment invoice"
+).split()
+
+
+def make_pages(megabytes: float, num_pages: int, rng: random.Random) -> List[Dict]:
+    page_chars = int(megabytes * 2**20 / num_pages)
+    pages = []
+    for number in range(1, num_pages + 1):
+        sentences, size = [], 0
+        while size < page_chars:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 30)))
+            sentence = sentence.capitalize() + rng.choice(".!?;,")
+            sentences.append(sentence)
+            size += len(sentence) + 1
+        pages.append({"page_number": number, "text": " ".join(sentences)})
+    return pages
+
+
+def run(name: str, chunker: TextChunker, pages: List[Dict], repeat: int):
+    megabytes = sum(len(page["text"]) for page in pages) / 2**20
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = list(chunker.iter_chunks(pages))
+        best = min(best, time.perf_counter() - start)
+
+    print(
+        f"{name:<8} {megabytes:6.1f} MB  {len(chunks):7d} chunks  "
+        f"{megabytes / best:7.2f} MB/s  {best:6.2f} s"
+    )
+    return chunks
+
+
+def check_windows(chunker: TextChunker, pages: List[Dict], chunks: List[Dict]):
+    """
+    Confere os invariantes do modo "tokens": texto == fatia [start, end) do
+    documento e, re-tokenizado com os tokens especiais, dentro da janela.
+    """
+    source = PAGE_SEPARATOR.join(page["text"] for page in pages if page["text"])
+    longest = 0
+    for chunk in chunks:
+        assert source[chunk["start"]:chunk["end"]] == chunk["text"]
+        longest = max(longest, len(chunker.tokenizer(chunk["text"])["input_ids"]))
+
+    print(f"maior chunk: {longest} tokens (janela: {chunker.chunk_size})")
+    assert longest <= chunker.chunk_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mb", type=float, default=8)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=800)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--tokenizer", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--tokens", type=int, default=256)
+    parser.add_argument("--token-overlap", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-check", action="store_true")
+    args = parser.parse_args()
+
+    pages = make_pages(args.mb, args.pages, random.Random(0))
+
+    run("chars", TextChunker(args.chunk_size, args.chunk_overlap), pages, args.repeat)
+
+    chunker = TextChunker(args.tokens, args.token_overlap, mode="tokens", tokenizer=args.tokenizer)
+    chunks = run("tokens", chunker, pages, args.repeat)
+    if not args.skip_check:
+        check_windows(chunker, pages, chunks)
+
+
+if __name__ == "__main__":
+    main()
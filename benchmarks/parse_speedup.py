@@ -0,0 +1,117 @@
+# Benchmark da conversão paralela por intervalos de páginas do DocumentParser:
+# um único DocumentConverter.convert x pool de processos com conversores
+# aquecidos, num PDF sintético de centenas de páginas.
+#
+# Uso (a partir da raiz do repositório):
+#   python -m benchmarks.parse_speedup --pages 300 --workers 4
+#   python -m benchmarks.parse_speedup --pdf ./corpus/relatorio.pdf --workers 8
+#
+# O PDF sintético é gerado sem dependências (texto em Helvetica, várias
+# linhas por página). A primeira conversão de cada modo não é medida:
+# o carregamento dos modelos do Docling não entra na comparação.
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from app.document_pipeline.parser import DocumentParser
+
+WORDS = (
+    "contrato cláusula pagamento rescisão multa prazo empresa fornecedor "
+    "juros reajuste vigência garantia obrigação responsabilidade relatório"
+).split()
+
+
+def make_pdf(path: Path, num_pages: int, lines_per_page: int, rng: random.Random):
+    """
+    Grava um PDF mínimo (1.4) com num_pages páginas de texto corrido.
+    """
+    def escape(text: str) -> bytes:
+        encoded = text.encode("latin-1", errors="replace")
+        return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"", # Pages, preenchido depois das páginas
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for number in range(1, num_pages + 1):
+        lines = [f"Página {number}"] + [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))).capitalize() + "."
+            for _ in range(lines_per_page)
+        ]
+        content = b"BT /F1 10 Tf 14 TL 50 800 Td " + b" ".join(b"(" + escape(line) + b") '" for line in lines) + b" ET"
+
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+
+    objects[1] = b"<< /Type /Pages /Count %d /Kids [%s] >>" % (
+        num_pages, b" ".join(b"%d 0 R" % kid for kid in kids)
+    )
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def timed_parse(name: str, parser: DocumentParser, path: Path, repeat: int):
+    parser.parse(path) # Aquecimento (modelos do Docling, processos do pool)
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed = parser.parse(path)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"{name:<14} {parsed['num_pages']:5d} páginas  {best:7.2f} s  {parsed['num_pages'] / best:6.1f} páginas/s")
+    return parsed, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdf", default=None, help="PDF real (padrão: sintético)")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.pdf) if args.pdf else Path(tmp) / "synthetic.pdf"
+        if not args.pdf:
+            make_pdf(path, args.pages, args.lines, random.Random(0))
+
+        single, single_seconds = timed_parse("1 processo", DocumentParser(), path, args.repeat)
+
+        parallel_parser = DocumentParser(parallel_workers=args.workers, parallel_min_pages=1)
+        try:
+            parallel, parallel_seconds = timed_parse(
+                f"{args.workers} processos", parallel_parser, path, args.repeat
+            )
+        finally:
+            parallel_parser.close()
+
+    assert parallel["pages"] == single["pages"], "Páginas diferentes entre os modos"
+    assert all(page["text"] for page in single["pages"]), "Páginas sem texto"
+    print(f"speedup: {single_seconds / parallel_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
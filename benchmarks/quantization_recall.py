@@ -0,0 +1,75 @@
+# Benchmark memória x recall@k dos modos de quantização do VectorStore.
+#
+# Uso (a partir da raiz do repositório):
+#   python -m benchmarks.quantization_recall --n 100000 --dim 384
+#
+# Embeddings reais têm dimensão intrínseca baixa (a energia se concentra em
+# poucas direções). Os dados sintéticos seguem isso: um espaço latente de
+# --intrinsic-dim dimensões projetado em --dim, mais um pouco de ruído.
+# Ruído isotrópico puro seria o pior caso para PQ e não representa o uso real.
+
+import argparse
+import time
+
+import numpy as np
+
+from app.vectorstore.store import VectorStore
+from app.vectorstore.quantization import ScalarQuantizer, ProductQuantizer
+from benchmarks.ann_recall import recall_at_k
+
+
+def make_embeddings(n: int, dim: int, intrinsic_dim: int, rng: np.random.Generator) -> np.ndarray:
+    decay = 1 / np.sqrt(np.arange(1, intrinsic_dim + 1)) # Espectro decrescente
+    projection = rng.normal(size=(intrinsic_dim, dim)).astype(np.float32) * decay[:, None]
+    latent = rng.normal(size=(n, intrinsic_dim)).astype(np.float32)
+    data = latent @ projection + 0.05 * rng.normal(size=(n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def evaluate(name: str, store: VectorStore, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, top_k: int):
+    store.add_documents([{"embedding": v, "row": i} for i, v in enumerate(vectors)])
+
+    start = time.perf_counter()
+    results = store.similarity_search_many(queries, top_k=top_k)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    found = np.array([[doc["row"] for doc in row] for row in results])
+    print(
+        f"{name:<16} memória={store.memory_bytes / 2**20:8.1f} MiB  "
+        f"recall@{top_k}={recall_at_k(found, truth):.3f}  {elapsed_ms:6.2f} ms/query"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--intrinsic-dim", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--pq-subvectors", type=int, default=48)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = make_embeddings(args.n + args.queries, args.dim, args.intrinsic_dim, rng)
+    vectors, queries = data[:args.n], data[args.n:]
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.top_k]
+
+    def pq():
+        return ProductQuantizer(num_subvectors=args.pq_subvectors, min_train_size=1)
+
+    evaluate("float32", VectorStore(), vectors, queries, truth, args.top_k)
+    evaluate("sq8", VectorStore(quantizer=ScalarQuantizer()), vectors, queries, truth, args.top_k)
+    evaluate("pq", VectorStore(quantizer=pq()), vectors, queries, truth, args.top_k)
+    # Com re-rank em memória a matriz float32 continua em RAM; no backend
+    # em disco ela fica no memmap e só os códigos contam
+    evaluate(
+        "pq + re-rank",
+        VectorStore(quantizer=pq(), rerank_factor=args.rerank_factor),
+        vectors, queries, truth, args.top_k
+    )
+
+
+if __name__ == "__main__":
+    main()
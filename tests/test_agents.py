@@ -0,0 +1,144 @@
+# Fluxo RAG de ponta a ponta: ingestão (.txt, sem Docling) -> store em
+# memória -> pergunta ao QAAgent. Modelo de embeddings e LLM são
+# substituídos por dublês determinísticos; o resto do pipeline é o real.
+
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import re
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from app.agents.qa import QAAgent
+from app.document_pipeline.chunker import TextChunker
+from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.document_pipeline.ingestion import IngestionPipeline
+from app.document_pipeline.parser import DocumentParser
+from app.services.answer_cache import SemanticAnswerCache
+from app.vectorstore.store import VectorStore
+
+DIM = 64
+
+
+class HashingModel:
+    """
+    Bag-of-words com hashing: textos com palavras em comum ficam próximos.
+    Mesma interface de SentenceTransformer.encode usada pelo gerador.
+    """
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, normalize_embeddings=True):
+        vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % DIM] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class FakeEmbeddings(EmbeddingsGenerator):
+    def __init__(self):
+        self.model_name = "hashing"
+        self.model = HashingModel()
+        self.cache = None
+
+
+class FakeLLM:
+    """
+    Devolve o prompt recebido; embeddings do provider não podem ser usados
+    pelos agentes (outro espaço vetorial e outra dimensão).
+    """
+
+    chat_model = "gpt-4o-mini"
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        return prompt
+
+    async def agenerate(self, prompt, system_prompt=None, **kwargs):
+        return self.generate(prompt, system_prompt)
+
+    def embed_text(self, text):
+        raise AssertionError("agentes devem vetorizar a pergunta com o embedder dos chunks")
+
+    async def aembed_text(self, text):
+        self.embed_text(text)
+
+    async def aembed_texts(self, texts):
+        self.embed_text(texts[0])
+
+
+@pytest.fixture
+def agent(tmp_path):
+    embedder = FakeEmbeddings()
+    store = VectorStore()
+    pipeline = IngestionPipeline(
+        parser=DocumentParser(),
+        chunker=TextChunker(chunk_size=200, chunk_overlap=20),
+        embedder=embedder,
+        vector_store=store,
+        batch_size=4
+    )
+
+    documents = {
+        "ferias.txt": "Política de férias. Cada colaborador tem direito a trinta dias de férias por ano.",
+        "reembolso.txt": "Política de reembolso. Despesas de viagem são reembolsadas em até dez dias úteis.",
+        "seguranca.txt": "Segurança da informação. Senhas devem ser trocadas a cada noventa dias.",
+    }
+    for name, text in documents.items():
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        pipeline.ingest(path)
+
+    return QAAgent(llm_service=FakeLLM(), vector_store=store, embedder=embedder, top_k=1)
+
+
+def test_run_retrieves_chunk_indexed_by_same_model(agent):
+    answer = agent.run("Quantos dias de férias tem cada colaborador?")
+
+    assert "trinta dias de férias" in answer
+    assert "reembolso" not in answer.lower()
+
+
+def test_async_paths_use_chunk_embedder(agent):
+    answer = asyncio.run(agent.arun("Em quanto tempo despesas de viagem são reembolsadas?"))
+    assert "dez dias úteis" in answer
+
+    async def collect():
+        return [item async for item in agent.arun_many(["Senhas devem ser trocadas quando?"])]
+
+    (result,) = asyncio.run(collect())
+    assert result["sources"][0]["source"] == "seguranca.txt"
+
+
+def test_answer_is_cached_under_corpus_version_seen_by_search(agent):
+    agent.answer_cache = SemanticAnswerCache(threshold=0.99)
+    question = "Quantos dias de férias tem cada colaborador?"
+    generate = agent.llm_service.generate
+
+    def generate_while_deleting(prompt, system_prompt=None, **kwargs):
+        agent.vector_store.delete_document("ferias.txt") # Corpus muda durante a geração
+        return generate(prompt, system_prompt)
+
+    agent.llm_service.generate = generate_while_deleting
+    assert "trinta dias de férias" in agent.run(question)
+
+    # A resposta citava um documento removido: não vale para a nova versão
+    agent.llm_service.generate = generate
+    assert "trinta dias de férias" not in agent.run(question)
+
+
+def test_api_deps_import_without_sentence_transformers():
+    # Reranker e embeddings carregam sentence_transformers só quando instanciados
+    code = "import sys; sys.modules['sentence_transformers'] = None; import app.api.deps"
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[1],
+        env={**os.environ, "OPENAI_API_KEY": "test"},
+        check=True
+    )
@@ -0,0 +1,22 @@
+from app.services.answer_cache import CachedAnswer, SemanticAnswerCache
+
+NAMESPACE = ("qa", 5, 1)
+
+
+def test_expired_answers_are_skipped_on_get_and_dropped_on_put(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.answer_cache.time.monotonic", lambda: now[0])
+
+    cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=10)
+    cache.put(NAMESPACE, [1.0, 0.0], CachedAnswer(answer="antiga"))
+    now[0] += 5
+    cache.put(NAMESPACE, [0.95, 0.3], CachedAnswer(answer="recente"))
+    assert cache.get(NAMESPACE, [1.0, 0.0]).answer == "antiga"
+
+    # A mais parecida venceu: a consulta cai na outra, ainda válida
+    now[0] += 6
+    assert cache.get(NAMESPACE, [1.0, 0.0]).answer == "recente"
+    assert cache.stats()["entries"] == 2
+
+    cache.put(NAMESPACE, [0.0, 1.0], CachedAnswer(answer="nova"))
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,46 @@
+# Ingestão em massa com o pool de parse compartilhado (como nos jobs da API):
+# arquivos .txt, sem Docling; o modelo de embeddings é um dublê.
+
+import os
+
+import numpy as np
+
+from app.document_pipeline.bulk import BulkIngestor, parse_pool
+from app.document_pipeline.embeddings import EmbeddingsGenerator
+from app.vectorstore.store import VectorStore
+
+
+class OnesModel:
+    def encode(self, texts, batch_size=32, show_progress_bar=False, normalize_embeddings=True):
+        return np.ones((len(texts), 8), dtype=np.float32) / np.sqrt(8)
+
+
+class FakeEmbeddings(EmbeddingsGenerator):
+    def __init__(self):
+        self.model_name = "ones"
+        self.model = OnesModel()
+        self.cache = None
+
+
+def test_shared_parse_pool_outlives_bulk_ingestions(tmp_path):
+    pool = parse_pool({}, {"chunk_size": 200, "chunk_overlap": 0}, workers=1)
+    store = VectorStore()
+    ingestor = BulkIngestor(FakeEmbeddings(), store, executor=pool)
+
+    try:
+        worker = pool.submit(os.getpid).result()
+
+        for batch in range(2):
+            root = tmp_path / f"carga{batch}"
+            root.mkdir()
+            for i in range(3):
+                (root / f"doc{i}.txt").write_text(f"Carga {batch}, documento {i}.", encoding="utf-8")
+
+            stats = ingestor.ingest_directory(root)
+            assert stats["files_processed"] == 3 and stats["files_failed"] == 0
+
+        # Mesmo processo (já inicializado) atendeu as duas cargas
+        assert pool.submit(os.getpid).result() == worker
+        assert len(store) == 6
+    finally:
+        pool.shutdown()
@@ -0,0 +1,77 @@
+# Modo "tokens" do TextChunker com um tokenizer dublê: cada palavra vira
+# pedaços de até 4 letras (como subwords) e a pontuação é um token à parte.
+
+import re
+from types import SimpleNamespace
+
+from app.document_pipeline.chunker import PAGE_SEPARATOR, TextChunker
+
+
+class PieceTokenizer:
+    model_max_length = 512
+
+    def __init__(self):
+        self.backend_tokenizer = self
+
+    def encode(self, text, add_special_tokens=False):
+        return SimpleNamespace(offsets=[m.span() for m in re.finditer(r"\w{1,4}|[^\w\s]", text)])
+
+    def num_special_tokens_to_add(self):
+        return 2 # [CLS] e [SEP]
+
+
+def chunks_of(pages, chunk_size=10, chunk_overlap=0):
+    chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap, mode="tokens", tokenizer=PieceTokenizer())
+    return list(chunker.iter_chunks(pages))
+
+
+def page(text, number=1):
+    return {"page_number": number, "text": text}
+
+
+def test_chunks_fill_the_window_without_special_tokens():
+    text = " ".join(f"w{i}" for i in range(20))
+
+    chunks = chunks_of([page(text)])
+
+    assert [chunk["tokens"] for chunk in chunks] == [8, 8, 4]
+    assert [chunk["chunk_id"] for chunk in chunks] == [0, 1, 2]
+    assert " ".join(chunk["text"] for chunk in chunks) == text
+    assert all(text[chunk["start"]:chunk["end"]] == chunk["text"] for chunk in chunks)
+
+
+def test_cut_prefers_sentence_end_in_second_half():
+    chunks = chunks_of([page("aa bb cc dd ee. ff gg hh ii jj kk")])
+
+    assert chunks[0]["text"] == "aa bb cc dd ee."
+    assert chunks[1]["text"] == "ff gg hh ii jj kk"
+
+
+def test_cut_falls_back_to_word_boundary():
+    # "hhhhiiii" são dois tokens sem espaço: cortar em 8 tokens partiria a palavra
+    chunks = chunks_of([page("aa bb cc dd ee ff gg hhhhiiii jj")])
+
+    assert chunks[0]["text"] == "aa bb cc dd ee ff gg"
+    assert chunks[0]["tokens"] == 7
+    assert chunks[1]["text"] == "hhhhiiii jj"
+
+
+def test_overlap_starts_at_word_boundary():
+    # Os últimos 3 tokens do 1º chunk são "ffff", "gg", "hh": "ffff" é meio de palavra
+    chunks = chunks_of([page("aa bb cc dd eeeeffff gg hh ii jj")], chunk_overlap=3)
+
+    assert chunks[0]["text"] == "aa bb cc dd eeeeffff gg hh"
+    assert chunks[1]["text"] == "gg hh ii jj"
+    assert chunks[1]["start"] == chunks[0]["end"] - len("gg hh")
+
+
+def test_chunks_span_pages_with_document_offsets():
+    pages = [page("aa bb cc", 1), page("", 2), page("dd ee ff gg hh ii", 3)]
+    document = PAGE_SEPARATOR.join(p["text"] for p in pages if p["text"]) # Como DocumentParser.parse
+
+    chunks = chunks_of(pages)
+
+    assert [(chunk["page"], chunk["pages"]) for chunk in chunks] == [(1, [1, 3]), (3, [3])]
+    assert chunks[0]["text"] == "aa bb cc\ndd ee ff gg hh"
+    assert chunks[1]["text"] == "ii"
+    assert all(document[chunk["start"]:chunk["end"]] == chunk["text"] for chunk in chunks)
@@ -0,0 +1,99 @@
+# Empacotamento do contexto (ContextPacker) e contagem de tokens. O packer
+# conta 1 token por caractere: o orçamento fica exato e fácil de conferir.
+
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents.context import ContextPacker
+from app.services.tokenizer import estimate_tokens, get_token_counter
+
+OVERLAP = "cláusula de reajuste anual pelo IPCA"
+
+
+def result(source, chunk_id, text, score):
+    return {"chunk_id": chunk_id, "text": text, "score": score, "metadata": {"filename": source, "page": 1}}
+
+
+def packer(budget=10000, duplicate_threshold=0.9):
+    packer = ContextPacker(token_budget=budget, duplicate_threshold=duplicate_threshold)
+    packer.count_tokens = len
+    return packer
+
+
+def test_consecutive_chunks_are_merged_without_repeating_overlap():
+    packed = packer().pack([
+        result("a.txt", 1, f"{OVERLAP} e multa de dez por cento.", 0.7),
+        result("a.txt", 0, f"O contrato prevê {OVERLAP}", 0.9),
+        result("a.txt", 3, "Foro da comarca de São Paulo.", 0.5), # Não é vizinho do 1
+    ])
+
+    assert packed.chunks_merged == 1 and packed.chunks_used == 3
+    assert packed.text == (
+        f"[Fonte: a.txt, Página: 1]\nO contrato prevê {OVERLAP} e multa de dez por cento.\n\n"
+        "[Fonte: a.txt, Página: 1]\nForo da comarca de São Paulo."
+    )
+
+
+def test_near_duplicates_keep_the_best_scored():
+    notice = (
+        "Este documento é confidencial e destinado exclusivamente ao uso interno da empresa e de seus "
+        "parceiros autorizados, não podendo ser copiado, distribuído ou divulgado a terceiros sem a "
+        "autorização prévia e por escrito da diretoria"
+    )
+
+    packed = packer().pack([
+        result("a.txt", 0, notice + ".", 0.6),
+        result("b.txt", 0, notice + " jurídica.", 0.8),
+        result("c.txt", 0, "Prazo de vigência de 24 meses.", 0.4),
+    ])
+
+    assert packed.duplicates_dropped == 1 and packed.chunks_used == 2
+    assert "[Fonte: b.txt" in packed.text and "[Fonte: a.txt" not in packed.text
+
+
+def test_dissimilar_segments_are_kept():
+    packed = packer(duplicate_threshold=0.9).pack([
+        result("a.txt", 0, "um dois três quatro cinco seis", 0.9),
+        result("b.txt", 0, "um dois três quatro cinco sete", 0.8),
+    ])
+
+    assert packed.duplicates_dropped == 0
+
+
+def test_budget_counts_separators_and_skips_only_what_does_not_fit():
+    parts = ["[Fonte: a.txt, Página: 1]\nprimeiro", "[Fonte: b.txt, Página: 1]\nsegundo trecho", "[Fonte: c.txt, Página: 1]\nc"]
+    results = [
+        result("a.txt", 0, "primeiro", 0.9),
+        result("b.txt", 0, "segundo trecho", 0.8),
+        result("c.txt", 0, "c", 0.7),
+    ]
+
+    exact = len("\n\n".join(parts))
+    packed = packer(budget=exact).pack(results)
+    assert packed.tokens_used == exact == len(packed.text)
+    assert packed.chunks_used == 3 and packed.chunks_dropped == 0
+
+    # Um token a menos: o separador antes do 3º trecho já não cabe
+    assert packer(budget=exact - 1).pack(results).chunks_dropped == 1
+
+    # O 2º (com separador) não cabe, mas o 3º, menor e de score mais baixo, ainda entra
+    packed = packer(budget=len(parts[0]) + len(parts[1]) + 1).pack(results)
+    assert packed.text == "\n\n".join([parts[0], parts[2]])
+    assert packed.chunks_dropped == 1 and packed.tokens_used == len(parts[0]) + 2 + len(parts[2])
+
+
+def test_token_counter_falls_back_when_tiktoken_fails(monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("sem rede para baixar o vocabulário")
+
+    fake = SimpleNamespace(encoding_for_model=unavailable, get_encoding=unavailable)
+    monkeypatch.setitem(sys.modules, "tiktoken", fake)
+    get_token_counter.cache_clear()
+
+    try:
+        assert get_token_counter("gpt-4o-mini") is estimate_tokens
+        assert get_token_counter(None) is estimate_tokens
+    finally:
+        get_token_counter.cache_clear()
@@ -0,0 +1,49 @@
+# Gravação do upload e submit do job fora do event loop.
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from types import SimpleNamespace
+
+from starlette.datastructures import UploadFile
+
+from app.api.routes.documents import save_upload, submit_upload
+
+CONTENT = b"conteudo do documento " * 1000
+
+
+def test_save_upload_copies_and_hashes_in_blocks():
+    upload = UploadFile(io.BytesIO(CONTENT), filename="contrato.pdf")
+
+    path, file_hash = asyncio.run(save_upload(upload, read_size=4096))
+
+    try:
+        assert path.endswith(".pdf")
+        assert open(path, "rb").read() == CONTENT
+        assert file_hash == hashlib.sha256(CONTENT).hexdigest()
+    finally:
+        os.unlink(path)
+
+
+def test_submit_upload_runs_catalog_queries_off_the_event_loop():
+    calls = []
+
+    def submit(path, **kwargs):
+        calls.append((threading.get_ident(), kwargs))
+        os.unlink(path)
+        return SimpleNamespace(to_dict=lambda: {"job_id": "1"})
+
+    jobs = SimpleNamespace(pending=0, max_pending=1, submit=submit)
+
+    async def run():
+        upload = UploadFile(io.BytesIO(CONTENT), filename="a.txt")
+        result = await submit_upload(upload, "a.txt", None, jobs, "default", 4096, replace=True)
+        return threading.get_ident(), result
+
+    loop_thread, result = asyncio.run(run())
+
+    (thread, kwargs), = calls
+    assert result == {"job_id": "1"} and thread != loop_thread
+    assert kwargs["replace"] is True and kwargs["file_hash"] == hashlib.sha256(CONTENT).hexdigest()
@@ -0,0 +1,118 @@
+# Filtros de metadados: máscaras do MetadataIndex, troca do IVF pela busca
+# exata em filtros seletivos, campos não indexados (400 na API) e
+# interação com tombstones.
+
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import numpy as np
+import pytest
+
+from app.agents.qa import QAAgent
+from app.api.deps import get_registry, qa_agent
+from app.api.routes.agents import router
+from app.core.config import Settings
+from app.vectorstore.filters import MetadataIndex
+from app.vectorstore.index import FlatIndex, IVFIndex
+from app.vectorstore.store import VectorStore
+
+ROWS = [
+    {"filename": "a.pdf", "tenant": "rh"},
+    {"filename": "b.pdf", "tenant": "juridico"},
+    {"filename": "c.pdf", "tenant": "rh"},
+    {"filename": "d.pdf"}, # Sem tenant
+]
+
+
+def test_mask_combines_fields_with_and_and_values_with_or():
+    index = MetadataIndex(fields=("filename", "tenant"))
+    index.add(ROWS)
+
+    assert index.mask({"tenant": "rh"}, 4).tolist() == [True, False, True, False]
+    assert index.mask({"tenant": ["rh", "juridico"]}, 4).tolist() == [True, True, True, False]
+    assert index.mask({"tenant": "rh", "filename": "c.pdf"}, 4).tolist() == [False, False, True, False]
+    assert not index.mask({"tenant": "financeiro"}, 4).any()
+
+    # Linhas além de size (ainda não publicadas pelo store) ficam de fora
+    assert index.mask({"tenant": "rh"}, 2).tolist() == [True, False]
+
+
+def test_unknown_field_is_rejected():
+    index = MetadataIndex()
+
+    with pytest.raises(ValueError, match="cliente"):
+        index.mask({"cliente": "acme"}, 0)
+
+
+def ivf_store(nprobe):
+    store = VectorStore(index=IVFIndex(nlist=16, nprobe=nprobe, min_train_size=1000))
+    rng = np.random.default_rng(0)
+    store.add_documents([
+        {"embedding": rng.normal(size=16).tolist(), "text": f"chunk {i}", "metadata": {"filename": f"doc{i % 10}.txt"}}
+        for i in range(2000)
+    ])
+    assert store.index.is_trained
+    return store, rng.normal(size=16)
+
+
+@pytest.mark.parametrize("nprobe, exact", [
+    (4, True),  # 200 linhas filtradas <= 2000 * 4/16 visitadas: busca exata
+    (1, False), # 200 > 125: o IVF continua mais barato
+])
+def test_selective_filter_switches_ivf_to_exact_search(monkeypatch, nprobe, exact):
+    store, query = ivf_store(nprobe)
+    calls = []
+    ivf_search = IVFIndex.search
+    monkeypatch.setattr(IVFIndex, "search", lambda self, *args: calls.append(self) or ivf_search(self, *args))
+
+    results = store.similarity_search(query, top_k=5, filter={"filename": "doc3.txt"})
+
+    assert (calls == []) is exact
+    assert {doc["metadata"]["filename"] for doc in results} == {"doc3.txt"}
+    if exact:
+        rows = np.arange(3, 2000, 10)
+        scores = store.vectors[rows] @ (query / np.linalg.norm(query))
+        assert [doc["text"] for doc in results] == [f"chunk {i}" for i in rows[np.argsort(-scores)[:5]]]
+
+
+def test_filter_excludes_tombstoned_rows():
+    store = VectorStore(index=FlatIndex())
+    for i, filename in enumerate(["a.pdf", "a.pdf", "b.pdf"]):
+        store.add_documents([{
+            "embedding": [1.0, float(i)],
+            "text": f"chunk {i}",
+            "metadata": {"filename": filename, "chunk_hash": f"h{i}"},
+        }])
+    store.delete_document("a.pdf")
+
+    assert store.similarity_search([1.0, 0.0], top_k=3, filter={"filename": "a.pdf"}) == []
+    assert [doc["text"] for doc in store.similarity_search([1.0, 0.0], top_k=3, filter={"filename": ["a.pdf", "b.pdf"]})] == ["chunk 2"]
+    assert store.filter_values("filename") == {"b.pdf": 1}
+
+
+class StubEmbeddings:
+    def embed_texts(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+
+class StubLLM:
+    chat_model = "gpt-4o-mini"
+
+    async def agenerate(self, prompt, system_prompt=None, **kwargs):
+        return "resposta"
+
+
+@pytest.mark.parametrize("path", ["/agents/qa", "/agents/qa/stream", "/agents/qa/batch"])
+def test_api_rejects_unknown_filter_field_with_400(path):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[qa_agent] = lambda: QAAgent(StubLLM(), VectorStore(), StubEmbeddings())
+    app.dependency_overrides[get_registry] = lambda: SimpleNamespace(settings=Settings(OPENAI_API_KEY="test"))
+
+    payload = {"question": "Qual o prazo?", "questions": ["Qual o prazo?"], "filter": {"cliente": "acme"}}
+    with TestClient(app) as client:
+        response = client.post(path, json=payload)
+
+    assert response.status_code == 400
+    assert "cliente" in response.json()["detail"]
@@ -0,0 +1,88 @@
+# Gravação dos eventos dos jobs de ingestão (thread consumidora do processo
+# da API). Os eventos são enfileirados direto, como os workers fariam.
+
+import time
+
+import pytest
+
+from app.core.config import Settings
+from app.services.jobs import IngestionJobManager
+from app.vectorstore.collections import DEFAULT_COLLECTION, CollectionManager
+
+
+def chunk(hash_, text):
+    return {
+        "embedding": [1.0, 0.0, 0.0, 0.0],
+        "text": text,
+        "metadata": {"filename": "doc.txt", "chunk_hash": hash_},
+    }
+
+
+STATS = {"pages_parsed": 1, "chunks_embedded": 2}
+
+
+def wait_finished(manager, *jobs):
+    deadline = time.time() + 10
+    while not all(manager.get(job.job_id).is_finished for job in jobs):
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def manager():
+    settings = Settings(OPENAI_API_KEY="test", VECTOR_STORE_BACKEND="memory")
+    collections = CollectionManager(settings)
+    manager = IngestionJobManager(collections, settings, max_workers=1)
+    yield manager
+    manager.shutdown()
+    collections.close()
+
+
+def test_concurrent_jobs_of_same_document_do_not_duplicate_chunks(manager):
+    # Os dois jobs receberam o mesmo snapshot (vazio) e vetorizaram tudo
+    jobs = [manager._create_job("doc.txt", DEFAULT_COLLECTION) for _ in range(2)]
+    for job in jobs:
+        manager._events.put(("batch", job.job_id, [chunk("h1", "um"), chunk("h2", "dois")]))
+    for job in jobs:
+        manager._events.put(("commit", job.job_id, ("doc.txt", "f1", ["h1", "h2"])))
+        manager._events.put(("completed", job.job_id, STATS))
+    wait_finished(manager, *jobs)
+
+    store = manager.collections.get(DEFAULT_COLLECTION)
+    assert [manager.get(job.job_id).status.value for job in jobs] == ["completed", "completed"]
+    assert len(store) == 2 and set(store.known_chunks("doc.txt")) == {"h1", "h2"}
+
+
+def test_commit_fails_when_reused_chunk_was_removed(manager):
+    with manager.collections.writer(DEFAULT_COLLECTION) as store:
+        store.add_documents([chunk("h1", "um")])
+        store.commit_document("doc.txt", "f1", ["h1"])
+
+    # Snapshot com h1: o worker só envia h2, mas o documento é removido antes do commit
+    job = manager._create_job("doc.txt", DEFAULT_COLLECTION)
+    manager._events.put(("batch", job.job_id, [chunk("h2", "dois")]))
+    with manager.collections.writer(DEFAULT_COLLECTION) as store:
+        store.delete_document("doc.txt")
+    manager._events.put(("commit", job.job_id, ("doc.txt", "f2", ["h1", "h2"])))
+    manager._events.put(("completed", job.job_id, STATS))
+    wait_finished(manager, job)
+
+    assert manager.get(job.job_id).status.value == "failed"
+    assert manager.collections.get(DEFAULT_COLLECTION).find_file("f2") is None
+
+
+def test_commit_rewrites_position_of_reused_chunks(manager):
+    with manager.collections.writer(DEFAULT_COLLECTION) as store:
+        store.add_documents([{**chunk("h1", "um"), "chunk_id": 0}])
+        store.commit_document("doc.txt", "f1", ["h1"])
+
+    # Nova versão com um trecho antes de h1: o worker só vetoriza h0
+    job = manager._create_job("doc.txt", DEFAULT_COLLECTION)
+    reused = {"h1": {"text": "um", "chunk_id": 1, "metadata": chunk("h1", "um")["metadata"]}}
+    manager._events.put(("batch", job.job_id, [{**chunk("h0", "zero"), "chunk_id": 0}]))
+    manager._events.put(("commit", job.job_id, ("doc.txt", "f2", ["h0", "h1"], reused)))
+    manager._events.put(("completed", job.job_id, STATS))
+    wait_finished(manager, job)
+
+    store = manager.collections.get(DEFAULT_COLLECTION)
+    assert sorted((doc["chunk_id"], doc["text"]) for _, doc in store.iter_documents()) == [(0, "zero"), (1, "um")]
@@ -0,0 +1,66 @@
+# Busca léxica do VectorStore: tokenização do BM25, fusão RRF (modo
+# "hybrid") e pré-filtro BM25 da busca vetorial (modo "prefilter").
+
+import pytest
+
+from app.vectorstore.lexical import BM25Index, tokenize
+from app.vectorstore.store import RRF_K, VectorStore
+
+DOCUMENTS = {
+    "a.txt": ("Contrato CT-2024/0012 de locação", [1.0, 0.0, 0.0]),
+    "b.txt": ("Ação de cobrança", [0.0, 1.0, 0.0]),
+    "c.txt": ("Relatório anual", [0.9, 0.1, 0.0]),
+}
+
+
+@pytest.fixture
+def store():
+    store = VectorStore(lexical_index=BM25Index())
+    for filename, (text, embedding) in DOCUMENTS.items():
+        store.upsert_document(filename, [{"chunk_id": 0, "text": text, "embedding": embedding}])
+    return store
+
+
+def filenames(results):
+    return [result["metadata"]["filename"] for result in results]
+
+
+def test_tokenize_folds_accents_and_splits_codes():
+    assert tokenize("Ação CT-2024/0012") == ["acao", "ct-2024/0012", "ct", "2024", "0012"]
+
+
+@pytest.mark.parametrize("query", ["CT-2024/0012", "ct-2024/0012", "0012", "LOCACAO"])
+def test_code_is_found_whole_by_parts_and_without_accents(store, query):
+    assert filenames(store.lexical_search(query, top_k=3)) == ["a.txt"]
+
+
+def test_accented_document_matches_unaccented_query(store):
+    assert filenames(store.lexical_search("acao", top_k=3)) == ["b.txt"]
+
+
+def test_hybrid_fuses_vector_and_lexical_ranks(store):
+    results = store.search("cobrança", [1.0, 0.0, 0.0], top_k=3, mode="hybrid")
+
+    # Vetorial: a, c, b. Léxico: só b. b soma as duas listas e fica em 1º
+    assert filenames(results) == ["b.txt", "a.txt", "c.txt"]
+    assert results[0]["score"] == pytest.approx(1 / (RRF_K + 3) + 1 / (RRF_K + 1))
+    assert results[1]["score"] == pytest.approx(1 / (RRF_K + 1))
+    assert "lexical_score" in results[0] and "lexical_score" not in results[1]
+    assert results[1]["vector_score"] == pytest.approx(1.0)
+
+
+def test_prefilter_limits_vector_search_to_lexical_candidates(store):
+    # a.txt é mais parecido com a query, mas só c.txt tem o termo
+    assert filenames(store.search("relatório", [1.0, 0.0, 0.0], top_k=2, mode="prefilter")) == ["c.txt"]
+
+
+def test_prefilter_without_lexical_hits_falls_back_to_vector_search(store):
+    assert filenames(store.search("inexistente", [1.0, 0.0, 0.0], top_k=2, mode="prefilter")) == ["a.txt", "c.txt"]
+
+
+def test_prefilter_ignores_deleted_candidates(store):
+    store.delete_document("c.txt")
+
+    # O único candidato léxico virou tombstone: cai na busca vetorial das linhas vivas
+    assert filenames(store.search("relatório", [1.0, 0.0, 0.0], top_k=2, mode="prefilter")) == ["a.txt", "b.txt"]
+    assert store.lexical_search("relatório", top_k=3) == []
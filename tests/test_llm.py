@@ -0,0 +1,206 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import asyncio
+import json
+import threading
+import time
+
+import openai
+import pytest
+
+from app.services.llm import LLMService
+
+
+class StubStream:
+    """
+    Stream do provider: emite os trechos com uma pausa entre eles e
+    registra se a resposta HTTP foi fechada.
+    """
+
+    def __init__(self, parts, delay=0.0):
+        self.parts = parts
+        self.delay = delay
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.sent == len(self.parts):
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay)
+        part = self.parts[self.sent]
+        self.sent += 1
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+
+    async def close(self):
+        self.closed = True
+
+
+def stub_service(stream):
+    service = LLMService(api_key="test")
+
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+
+    service.async_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    return service
+
+
+def test_astream_yields_all_parts_and_closes():
+    stream = StubStream(["Olá", ", ", "mundo"])
+    service = stub_service(stream)
+
+    async def collect():
+        return [part async for part in service.astream("oi")]
+
+    assert asyncio.run(collect()) == ["Olá", ", ", "mundo"]
+    assert stream.closed
+    assert service._semaphore._value == 64 # Slot devolvido
+
+
+def test_astream_cancelled_mid_stream_closes_response():
+    stream = StubStream([f"t{i}" for i in range(1000)], delay=0.01)
+    service = stub_service(stream)
+    received = []
+
+    async def consume():
+        async for part in service.astream("oi"):
+            received.append(part)
+
+    async def main():
+        task = asyncio.create_task(consume())
+        while len(received) < 3:
+            await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+    assert stream.closed
+    assert 3 <= stream.sent < 1000
+    assert service._semaphore._value == 64
+
+
+def test_astream_consumer_stopping_early_closes_response():
+    stream = StubStream(["a", "b", "c", "d"])
+    service = stub_service(stream)
+
+    async def first_two():
+        parts = service.astream("oi")
+        received = [await parts.__anext__(), await parts.__anext__()]
+        await parts.aclose() # Ex.: StreamingResponse com o cliente desconectado
+        return received
+
+    assert asyncio.run(first_two()) == ["a", "b"]
+    assert stream.closed and stream.sent == 2
+
+
+# ==========================
+# Retries contra um servidor mock
+# ==========================
+
+class MockProvider:
+    """
+    Servidor HTTP local compatível com a API da OpenAI: responde com os
+    status de `script` (em ordem) e depois 200, registrando cada requisição.
+    """
+
+    def __init__(self, script, retry_after=None):
+        self.script = list(script)
+        self.retry_after = retry_after
+        self.requests = [] # (path, instante)
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("content-length", 0)))
+                provider.requests.append((self.path, time.monotonic()))
+                status = provider.script.pop(0) if provider.script else 200
+
+                if status == 200 and self.path.endswith("/embeddings"):
+                    body = {"object": "list", "model": "m", "data": [
+                        {"object": "embedding", "index": 0, "embedding": [0.1, 0.2]}
+                    ], "usage": {"prompt_tokens": 1, "total_tokens": 1}}
+                elif status == 200:
+                    body = {"id": "c", "object": "chat.completion", "created": 0, "model": "m", "choices": [{
+                        "index": 0, "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": " resposta "},
+                    }]}
+                else:
+                    body = {"error": {"message": f"erro {status}", "type": "mock"}}
+
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(payload)))
+                if status == 429 and provider.retry_after is not None:
+                    self.send_header("retry-after", str(provider.retry_after))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def mock_service(provider, **kwargs):
+    return LLMService(api_key="test", base_url=provider.base_url, retry_base_delay=0.01, **kwargs)
+
+
+@pytest.mark.parametrize("call", ["generate", "embed_texts", "agenerate"])
+def test_retries_transient_errors_then_succeeds(call):
+    with MockProvider([429, 500, 503]) as provider:
+        service = mock_service(provider)
+        if call == "generate":
+            assert service.generate("oi") == "resposta"
+        elif call == "embed_texts":
+            assert service.embed_texts(["oi"]) == [[0.1, 0.2]]
+        else:
+            assert asyncio.run(service.agenerate("oi")) == "resposta"
+
+    assert len(provider.requests) == 4
+
+
+def test_sync_gives_up_after_max_retries():
+    with MockProvider([502] * 10) as provider:
+        service = mock_service(provider, max_retries=2)
+        with pytest.raises(openai.InternalServerError):
+            service.generate("oi")
+
+    assert len(provider.requests) == 3
+
+
+def test_sync_does_not_retry_client_errors():
+    with MockProvider([400]) as provider:
+        with pytest.raises(openai.BadRequestError):
+            mock_service(provider).generate("oi")
+
+    assert len(provider.requests) == 1
+
+
+def test_sync_honors_retry_after():
+    with MockProvider([429], retry_after=0.3) as provider:
+        assert mock_service(provider).generate("oi") == "resposta"
+
+    (_, first), (_, second) = provider.requests
+    assert second - first >= 0.3
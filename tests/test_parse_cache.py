@@ -0,0 +1,76 @@
+# Cache em disco da saída normalizada do parser: acertos e faltas,
+# entradas corrompidas e remoção das menos usadas (mtime) acima do limite.
+
+import gzip
+import os
+import time
+
+import pytest
+
+from app.document_pipeline.parse_cache import ParseCache
+
+VERSION = "2:docling-2.0.0"
+PAGES = [{"page_number": 1, "text": "Cláusula primeira."}, {"page_number": 2, "text": ""}, {"page_number": 3, "text": "Fim."}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ParseCache(tmp_path / "parse", max_bytes=1024**2)
+
+
+def test_hit_returns_normalized_output_and_version_is_part_of_the_key(cache):
+    assert cache.get("f1", VERSION) is None
+    cache.put("f1", VERSION, PAGES)
+
+    assert cache.get("f1", VERSION) == {
+        "num_pages": 3,
+        "text": "Cláusula primeira.\nFim.",
+        "pages": PAGES,
+    }
+    assert cache.get("f1", "3:docling-2.0.0") is None # Novo parser invalida a entrada
+    assert cache.get("f2", VERSION) is None
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 3)
+
+
+@pytest.mark.parametrize("content", [
+    b"isto nao e gzip",
+    gzip.compress(b"{\"pag"), # JSON truncado
+    gzip.compress(b"{\"paginas\": []}"), # Sem a chave pages
+])
+def test_corrupt_entry_is_a_miss_and_is_removed(cache, content):
+    cache.put("f1", VERSION, PAGES)
+    entry = cache._entry("f1", VERSION)
+    entry.write_bytes(content)
+
+    assert cache.get("f1", VERSION) is None
+    assert not entry.exists()
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(cache):
+    for name in ("a", "b"):
+        cache.put(name, VERSION, PAGES)
+    size = cache._entry("a", VERSION).stat().st_size # Mesmas páginas: entradas do mesmo tamanho
+    cache.max_bytes = 2 * size
+
+    now = time.time()
+    os.utime(cache._entry("a", VERSION), (now - 200, now - 200))
+    os.utime(cache._entry("b", VERSION), (now - 100, now - 100))
+    assert cache.get("a", VERSION) is not None # Leitura atualiza o mtime: "b" passa a ser a menos usada
+
+    cache.put("c", VERSION, PAGES)
+
+    assert cache.get("b", VERSION) is None
+    assert cache.get("a", VERSION) is not None and cache.get("c", VERSION) is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_entry_larger_than_max_bytes_is_not_written(cache):
+    cache.max_bytes = 10
+
+    cache.put("f1", VERSION, PAGES)
+
+    assert cache.stats()["entries"] == 0
+    assert list(cache.path.iterdir()) == [] # Nem temporários
@@ -0,0 +1,36 @@
+# Normalização da saída do Docling: o documento é um dublê com a mesma
+# forma do DoclingDocument (pages: page_no -> PageItem, export por página).
+
+from app.document_pipeline.parser import DocumentParser
+
+
+class FakeDoclingDocument:
+    def __init__(self, pages):
+        self.pages = {page_no: object() for page_no in pages} # PageItem não tem texto
+        self._texts = pages
+
+    def export_to_markdown(self, page_no=None):
+        if page_no is None:
+            return "\n\n".join(self._texts[n] for n in sorted(self._texts))
+        return self._texts[page_no]
+
+
+def test_pages_are_exported_by_page_number():
+    # Intervalo 3..4 de uma conversão paralela: page_no já é absoluto
+    document = FakeDoclingDocument({4: "Quarta página.\n", 3: "  Terceira página."})
+
+    pages = list(DocumentParser()._iter_pages(document))
+
+    assert pages == [
+        {"page_number": 3, "text": "Terceira página."},
+        {"page_number": 4, "text": "Quarta página."},
+    ]
+
+
+def test_document_without_pages_is_a_single_page():
+    document = FakeDoclingDocument({})
+    document.export_to_markdown = lambda page_no=None: "# Título\n\nCorpo do DOCX.\n"
+
+    assert list(DocumentParser()._iter_pages(document)) == [
+        {"page_number": 1, "text": "# Título\n\nCorpo do DOCX."}
+    ]
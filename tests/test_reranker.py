@@ -0,0 +1,108 @@
+# CrossEncoderReranker com um cross-encoder dublê (sentence_transformers
+# não é importado) e um relógio controlado pelos forwards do dublê.
+
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.reranker as reranker_module
+from app.services.reranker import CrossEncoderReranker
+
+SECONDS_PER_PAIR = 0.1
+
+
+class FakeCrossEncoder:
+    """
+    Score = palavras da pergunta presentes no trecho. Cada par "leva"
+    SECONDS_PER_PAIR no relógio do teste.
+    """
+
+    def __init__(self, model_name, device=None):
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.pairs.extend(pairs)
+        clock[0] += SECONDS_PER_PAIR * len(pairs)
+        return [float(len(set(query.split()) & set(text.split()))) for query, text in pairs]
+
+
+clock = [0.0]
+
+
+@pytest.fixture
+def make_reranker(monkeypatch):
+    clock[0] = 0.0
+    monkeypatch.setitem(sys.modules, "sentence_transformers", SimpleNamespace(CrossEncoder=FakeCrossEncoder))
+    monkeypatch.setattr(reranker_module, "time", SimpleNamespace(perf_counter=lambda: clock[0]))
+    return lambda **kwargs: CrossEncoderReranker(model_name="fake", **kwargs)
+
+
+def candidates(*texts):
+    return [{"text": text, "score": 1.0 - i / 10} for i, text in enumerate(texts)]
+
+
+def texts(results):
+    return [result["text"] for result in results]
+
+
+def test_rerank_orders_by_cross_encoder_and_keeps_top_k(make_reranker):
+    reranker = make_reranker()
+
+    results = reranker.rerank("multa rescisão contrato", candidates("prazo", "multa contrato", "multa rescisão contrato"), top_k=2)
+
+    assert texts(results) == ["multa rescisão contrato", "multa contrato"]
+    assert results[0]["rerank_score"] == results[0]["score"] == 3.0
+    assert results[0]["retrieval_score"] == pytest.approx(0.8)
+
+
+def test_budget_truncates_scoring_in_search_order(make_reranker):
+    reranker = make_reranker(batch_size=2, latency_budget=0.5)
+    docs = candidates("a", "b x", "c", "d x", "e x", "f x")
+
+    results = reranker.rerank("x", docs, top_k=6)
+
+    # Lotes de 0.2 s: o 3º estimado (0.2 s) não cabe nos 0.1 s restantes
+    assert len(reranker.model.pairs) == 4
+    assert texts(results) == ["b x", "d x", "a", "c", "e x", "f x"]
+    assert [r["score"] for r in results[-2:]] == [0.0, 0.0] # Sem score: menor score pontuado
+    assert "rerank_score" not in results[-1]
+    assert reranker.stats()["truncated"] == 1
+
+
+def test_rerank_is_skipped_without_a_free_slot(make_reranker):
+    reranker = make_reranker(max_concurrency=1, latency_budget=0.0)
+    docs = candidates("a", "b x", "c")
+
+    assert reranker._slots.acquire(blocking=False) # Outra requisição ocupa a única vaga
+    try:
+        results = reranker.rerank("x", docs, top_k=2)
+    finally:
+        reranker._slots.release()
+
+    assert texts(results) == ["a", "b x"] and results == docs[:2]
+    assert reranker.model.pairs == [] and reranker.stats()["skipped"] == 1
+
+
+def test_scores_are_cached_by_normalized_pair(make_reranker):
+    reranker = make_reranker()
+    reranker.rerank("multa contratual", candidates("prazo", "multa contratual"), top_k=2)
+
+    # Mesma pergunta e trechos com outros espaços: sem novo forward
+    results = reranker.rerank("  multa   contratual ", candidates("prazo\n", "multa\ncontratual"), top_k=2)
+
+    assert len(reranker.model.pairs) == 2
+    assert texts(results) == ["multa\ncontratual", "prazo\n"]
+    assert reranker.stats()["hits"] == 2
+
+
+def test_score_cache_evicts_least_recently_used(make_reranker):
+    reranker = make_reranker(cache_size=2)
+    reranker.rerank("x", candidates("a", "b"), top_k=2)
+    reranker.rerank("x", candidates("a", "c"), top_k=2) # "a" é reusado; "b" é o mais antigo
+
+    assert reranker.stats()["entries"] == 2
+    reranker.model.pairs.clear()
+    reranker.rerank("x", candidates("a", "b"), top_k=2)
+
+    assert [text for _, text in reranker.model.pairs] == ["b"]
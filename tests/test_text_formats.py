@@ -0,0 +1,57 @@
+from app.document_pipeline.text_formats import (
+    fast_parser_for,
+    paginate,
+    parse_csv,
+    parse_html,
+    parse_json,
+    parse_text,
+)
+
+
+def texts(pages):
+    return [page["text"] for page in pages]
+
+
+def test_paginate_cuts_between_lines_and_on_form_feed():
+    pages = list(paginate(["a" * 6 + "\n", "b" * 6 + "\n", "c\fd\n"], page_chars=10))
+
+    assert texts(pages) == ["a" * 6, "b" * 6 + "\nc", "d"]
+    assert [page["page_number"] for page in pages] == [1, 2, 3]
+
+
+def test_parse_text(tmp_path):
+    path = tmp_path / "nota.txt"
+    path.write_text("\ufeffPrimeira linha\nSegunda linha\n\n", encoding="utf-8")
+
+    assert texts(parse_text(path)) == ["Primeira linha\nSegunda linha"]
+
+
+def test_parse_csv_labels_values_with_header(tmp_path):
+    path = tmp_path / "tabela.csv"
+    path.write_text("nome;cidade;\nAna;Recife;x\nBruno;;\n", encoding="utf-8")
+
+    assert texts(parse_csv(path)) == ["nome: Ana; cidade: Recife; coluna 3: x\nnome: Bruno"]
+
+
+def test_parse_json_flattens_paths(tmp_path):
+    path = tmp_path / "dados.json"
+    path.write_text('{"contrato": {"partes": ["A", "B"], "valor": 10, "obs": ""}}', encoding="utf-8")
+
+    assert texts(parse_json(path)) == ["contrato.partes[0]: A\ncontrato.partes[1]: B\ncontrato.valor: 10"]
+
+
+def test_parse_html_without_closing_head(tmp_path):
+    path = tmp_path / "pagina.html"
+    path.write_text(
+        "<html><head><title>T</title><style>p {color: red}</style>"
+        "<body><p>Hello world</p><script>var x = 1;</script>"
+        "<table><tr><td>a</td><td>b</td></tr></table>",
+        encoding="utf-8"
+    )
+
+    assert texts(parse_html(path)) == ["T\nHello world\n| a | b"]
+
+
+def test_fast_parser_for():
+    assert fast_parser_for("A.HTM") is parse_html
+    assert fast_parser_for("relatorio.pdf") is None
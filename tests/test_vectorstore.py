@@ -0,0 +1,294 @@
+import numpy as np
+import pytest
+
+from app.vectorstore.index import IVFIndex
+from app.vectorstore.quantization import ProductQuantizer, ScalarQuantizer
+from app.vectorstore.store import VectorStore
+
+
+def populate(store, rows=2000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    store.add_documents([
+        {
+            "embedding": rng.normal(size=dim).tolist(),
+            "text": f"chunk {i}",
+            "metadata": {"filename": f"doc{i % 10}.txt", "chunk_hash": f"h{i}"},
+        }
+        for i in range(rows)
+    ])
+    return rng
+
+
+@pytest.mark.parametrize("quantizer", [
+    lambda: ScalarQuantizer(),
+    lambda: ProductQuantizer(num_subvectors=8, min_train_size=500),
+    lambda: ProductQuantizer(num_subvectors=8, min_train_size=5000), # Ainda sem treino
+])
+def test_compact_quantized_store_without_float_vectors(quantizer):
+    store = VectorStore(quantizer=quantizer())
+    rng = populate(store)
+    store.delete_document("doc3.txt")
+
+    target = VectorStore(quantizer=quantizer())
+    assert store.compact_into(target) == 200
+    assert len(target) == 1800 and target.deleted_count == 0
+
+    live = np.flatnonzero(~store._deleted.view())
+    np.testing.assert_array_equal(
+        store.quantizer.reconstruct(live),
+        target.quantizer.reconstruct(np.arange(len(target)))
+    )
+
+    query = rng.normal(size=32)
+    assert (
+        [doc["text"] for doc in store.similarity_search(query, top_k=5)]
+        == [doc["text"] for doc in target.similarity_search(query, top_k=5)]
+    )
+    assert "doc3.txt" not in target.filter_values("filename")
+
+
+def test_persistent_compact_replays_catalog_remap_after_crash(tmp_path, monkeypatch):
+    from app.vectorstore.catalog import DocumentCatalog
+    from app.vectorstore.persistent import PersistentVectorStore
+
+    store = PersistentVectorStore(str(tmp_path))
+    populate(store, rows=100)
+    store.delete_document("doc3.txt")
+    expected = {
+        doc["metadata"]["chunk_hash"]: doc["text"]
+        for _, doc in store.iter_documents()
+    }
+
+    def crash(self, live_rows, generation=None):
+        raise RuntimeError("queda entre o manifesto e o catálogo")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(DocumentCatalog, "remap_rows", crash)
+        with pytest.raises(RuntimeError):
+            store.compact()
+    store.close()
+
+    reopened = PersistentVectorStore(str(tmp_path))
+    assert len(reopened) == 90 and reopened.catalog.generation == 1
+
+    rows = {}
+    for i in range(10):
+        rows.update(reopened.known_chunks(f"doc{i}.txt"))
+    assert {h: reopened._get_document(row)["text"] for h, row in rows.items()} == expected
+
+    # Replay idempotente: reabrir não renumera de novo
+    again = PersistentVectorStore(str(tmp_path))
+    assert again.known_chunks("doc1.txt") == reopened.known_chunks("doc1.txt")
+    assert again.catalog.generation == 1
+    reopened.close()
+    again.close()
+
+
+def test_persistent_ivf_trains_on_sample_and_indexes_in_batches(tmp_path, monkeypatch):
+    from app.vectorstore import persistent
+    from app.vectorstore.persistent import PersistentVectorStore
+
+    store = PersistentVectorStore(str(tmp_path))
+    rng = populate(store, rows=3000)
+    store.close()
+
+    monkeypatch.setattr(persistent, "INDEX_SYNC_BATCH", 500)
+    index = IVFIndex(nlist=16, nprobe=16, min_train_size=1000, max_train_samples=1500)
+    batches = []
+    add = index.add
+    monkeypatch.setattr(index, "add", lambda vectors, ids: (batches.append((len(ids), index.is_trained)), add(vectors, ids)))
+
+    reopened = PersistentVectorStore(str(tmp_path), index=index)
+    reopened.search("chunk", rng.normal(size=32).tolist(), top_k=5)
+
+    # Treino antes do primeiro lote; nenhum lote maior que INDEX_SYNC_BATCH
+    assert batches and all(trained and size <= 500 for size, trained in batches)
+    assert sum(len(rows) for rows in index._lists) == 3000
+    reopened.close()
+
+
+@pytest.mark.parametrize("mode, query", [
+    ("vector", "chunk 7"),
+    ("hybrid", "chunk 7"),
+    ("prefilter", "chunk 7"),
+    ("prefilter", "inexistente"), # Sem candidatos léxicos: cai em similarity_search
+])
+def test_persistent_search_refreshes_once_and_sees_other_writers(tmp_path, monkeypatch, mode, query):
+    from app.vectorstore.lexical import BM25Index
+    from app.vectorstore.persistent import PersistentVectorStore
+
+    reader = PersistentVectorStore(str(tmp_path), lexical_index=BM25Index())
+    writer = PersistentVectorStore(str(tmp_path)) # Outro worker
+    populate(writer, rows=50, dim=4)
+
+    refreshes = []
+    refresh = reader.refresh
+    monkeypatch.setattr(reader, "refresh", lambda: (refreshes.append(1), refresh()))
+
+    results = reader.search(query, [1.0, 0.0, 0.0, 0.0], top_k=3, mode=mode)
+
+    assert len(results) == 3 and len(reader) == 50
+    assert len(refreshes) == 1
+    reader.close()
+    writer.close()
+
+
+def test_replaced_store_is_closed_after_last_reader(tmp_path):
+    from app.core.config import Settings
+    from app.vectorstore.collections import DEFAULT_COLLECTION, CollectionManager
+
+    settings = Settings(OPENAI_API_KEY="test", VECTOR_STORE_BACKEND="disk", VECTOR_DB_PATH=str(tmp_path))
+    collections = CollectionManager(settings)
+    with collections.writer(DEFAULT_COLLECTION) as store:
+        populate(store, rows=100)
+        store.delete_document("doc3.txt")
+
+    with collections.reader(DEFAULT_COLLECTION) as searching:
+        collections.compact(DEFAULT_COLLECTION)
+        with collections.writer(DEFAULT_COLLECTION) as store:
+            store.delete_document("doc4.txt")
+        collections.compact(DEFAULT_COLLECTION) # Fecharia o store da troca anterior
+        collections.evict(DEFAULT_COLLECTION)
+
+        # Ainda aberto: a busca em andamento termina no store antigo
+        assert len(searching.similarity_search(np.ones(32), top_k=3)) == 3
+        assert searching._documents_fd is not None
+
+    assert searching._documents_fd is None
+    assert len(collections.get(DEFAULT_COLLECTION)) == 80
+    collections.close()
+
+
+def test_compaction_releases_replaced_memory_store():
+    import gc
+    import weakref
+
+    from app.core.config import Settings
+    from app.vectorstore.collections import DEFAULT_COLLECTION, CollectionManager
+
+    collections = CollectionManager(Settings(OPENAI_API_KEY="test", VECTOR_STORE_BACKEND="memory"))
+    with collections.writer(DEFAULT_COLLECTION) as store:
+        populate(store, rows=100)
+        store.delete_document("doc3.txt")
+        replaced = weakref.ref(store)
+    del store
+
+    collections.compact(DEFAULT_COLLECTION)
+    gc.collect()
+
+    # Sem leitores: a matriz antiga não fica presa até a próxima compactação
+    assert replaced() is None
+    assert len(collections.get(DEFAULT_COLLECTION)) == 90
+    collections.close()
+
+
+@pytest.mark.parametrize("options", [
+    lambda: {},
+    lambda: {"quantizer": ScalarQuantizer()},
+    lambda: {"quantizer": ProductQuantizer(num_subvectors=8, min_train_size=600)},
+    lambda: {"index": IVFIndex(nlist=8, min_train_size=600)},
+])
+def test_search_concurrent_with_appends(options):
+    import threading
+
+    store = VectorStore(initial_capacity=16, **options())
+    populate(store, rows=50)
+    errors = []
+    done = threading.Event()
+
+    def search():
+        rng = np.random.default_rng(1)
+        while not done.is_set():
+            try:
+                for results in store.similarity_search_many(rng.normal(size=(4, 32)), top_k=10):
+                    assert all(doc["text"].startswith("chunk") for doc in results)
+                store.similarity_search(rng.normal(size=32), top_k=5, filter={"filename": "doc1.txt"})
+            except Exception as e:
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=search) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for seed in range(1, 40):
+        populate(store, rows=37, seed=seed)
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert not errors, errors[0]
+
+
+def test_quantized_memory_store_keeps_only_codes():
+    from app.core.config import Settings
+    from app.vectorstore.factory import build_vector_store
+
+    settings = Settings(OPENAI_API_KEY="test", VECTOR_STORE_BACKEND="memory", VECTOR_QUANTIZATION="sq8", RERANK_FACTOR=4)
+    store = build_vector_store(settings)
+    populate(store, rows=1000)
+
+    assert store.rerank_factor == 0 and len(store.vectors) == 0
+    assert store.memory_bytes == 1000 * 32 + 1000 * 4 # int8 + escala por linha
+    assert len(store.similarity_search(np.ones(32), top_k=5)) == 5
+
+
+class RacyProductQuantizer(ProductQuantizer):
+    """
+    Ao ler os codebooks, dispara o add() que completa o treino (como uma
+    thread escritora faria logo depois), mas devolve o valor lido antes.
+    """
+
+    train_on_read = None
+
+    @property
+    def codebooks(self):
+        value = self.__dict__.get("_codebooks")
+        if self.train_on_read is not None:
+            rows, self.train_on_read = self.train_on_read, None
+            self.add(rows)
+        return value
+
+    @codebooks.setter
+    def codebooks(self, value):
+        self.__dict__["_codebooks"] = value
+
+
+def test_pq_score_during_training_uses_consistent_snapshot():
+    rng = np.random.default_rng(0)
+    rows = rng.normal(size=(300, 16)).astype(np.float32)
+    pq = RacyProductQuantizer(num_subvectors=4, min_train_size=300)
+    pq.add(rows[:299])
+
+    pq.train_on_read = rows[299:]
+    scores = pq.score(rows[:2], np.array([0, 298]))
+
+    assert scores.shape == (2, 2)
+    assert pq.is_trained and len(pq) == 300
+
+
+def test_upsert_rewrites_position_of_reused_chunks():
+    def chunk(chunk_id, text, vector):
+        return {"chunk_id": chunk_id, "text": text, "embedding": vector, "metadata": {"page": chunk_id + 1}}
+
+    store = VectorStore()
+    store.upsert_document("doc.txt", [chunk(0, "alfa", [1.0, 0.0, 0.0]), chunk(1, "beta", [0.0, 1.0, 0.0])])
+
+    # Trecho novo no início: alfa e beta são reaproveitados (sem embedding), mas mudam de posição
+    stats = store.upsert_document("doc.txt", [
+        chunk(0, "novo", [0.0, 0.0, 1.0]),
+        chunk(1, "alfa", None),
+        chunk(2, "beta", None),
+    ])
+
+    assert stats == {"chunks_added": 1, "chunks_reused": 2, "chunks_tombstoned": 0}
+    live = sorted((doc["chunk_id"], doc["metadata"]["page"], doc["text"]) for _, doc in store.iter_documents())
+    assert live == [(0, 1, "novo"), (1, 2, "alfa"), (2, 3, "beta")]
+
+    # O vetor regravado é o original
+    result = store.search("", [1.0, 0.0, 0.0], top_k=1)[0]
+    assert (result["text"], result["chunk_id"]) == ("alfa", 1)
+
+    # Mesma versão de novo: nada a regravar
+    rows = len(store)
+    store.upsert_document("doc.txt", [chunk(0, "novo", [0.0, 0.0, 1.0]), chunk(1, "alfa", None), chunk(2, "beta", None)])
+    assert len(store) == rows